@@ -2,7 +2,8 @@ from dotenv import load_dotenv
 from flask import Flask
 from werkzeug.exceptions import HTTPException
 
-from .extensions import cors, db, limiter, migrate
+from .commands import register_commands
+from .extensions import cache, cors, db, limiter, migrate
 from .routes import register_api_blueprints
 from .routes.response import error
 
@@ -37,6 +38,7 @@ def create_app():
         resources={r"/api/.*": {"origins": _parse_origins(app.config["CORS_ORIGINS"]) }},
         supports_credentials=True,
     )
+    cache.init_app(app)
     limiter.init_app(app)
 
     from . import models  # noqa: F401
@@ -46,6 +48,7 @@ def create_app():
         return {"status": "ok"}
 
     register_api_blueprints(app)
+    register_commands(app)
 
     @app.errorhandler(HTTPException)
     def handle_http_exception(exc: HTTPException):
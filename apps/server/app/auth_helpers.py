@@ -1,10 +1,11 @@
 from functools import wraps
 
-from flask import g, session
+from flask import g, request, session
 
 from .extensions import db
 from .models import Restaurant, RestaurantStaffRole, RestaurantStaffUser, User, UserRoleType
 from .routes.response import error
+from .services.audit import record as record_audit
 
 
 def get_current_user():
@@ -58,6 +59,48 @@ def require_role(*roles):
     return decorator
 
 
+def audited(action: str, entity_type: str, entity: str):
+    """Queue an audit row for every successful call of a mutating admin route.
+
+    ``entity`` names the view argument holding the entity id or, for creates, the key of
+    the response ``data`` holding it (either the id itself or an object with an ``id``).
+    Calls answered with an error status, including rejected ones, are not recorded.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            response = func(*args, **kwargs)
+            body, status = response if isinstance(response, tuple) else (response, None)
+            if (status or body.status_code) >= 400:
+                return response
+            entity_id = kwargs.get(entity)
+            if entity_id is None:
+                data = (body.get_json(silent=True) or {}).get("data") or {}
+                entity_id = data.get(entity)
+                if isinstance(entity_id, dict):
+                    entity_id = entity_id.get("id")
+            if entity_id is None:
+                return response
+            user = get_current_user()
+            record_audit(
+                user.id if user else None,
+                action,
+                entity_type,
+                entity_id,
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "payload": request.get_json(silent=True),
+                },
+            )
+            return response
+
+        return wrapper
+
+    return decorator
+
+
 def _staff_role_rank(role: RestaurantStaffRole) -> int:
     order = {
         RestaurantStaffRole.VIEWER: 0,
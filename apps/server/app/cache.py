@@ -0,0 +1,467 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable
+from urllib.parse import urlparse
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+try:
+    from limits.storage import Storage as _LimitsStorage
+except ImportError:  # pragma: no cover - optional dependency
+    _LimitsStorage = None
+
+
+_MISSING = object()
+
+
+def _expires_at(ttl: float | None) -> float | None:
+    return time.time() + ttl if ttl else None
+
+
+class CacheBackend:
+    """Minimal key/value contract every cache backend implements.
+
+    Reads return the module-level ``_MISSING`` sentinel for absent or expired keys.
+    """
+
+    def get_many(self, keys: list[str]) -> list[Any]:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Any:
+        return self.get_many([key])[0]
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        raise NotImplementedError
+
+    def add(self, key: str, value: Any, ttl: float | None = None) -> bool:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        raise NotImplementedError
+
+    def ttl(self, key: str) -> float | None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU with TTL."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[Any, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: str, now: float) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key: str, value: Any, expires_at: float | None) -> None:
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get_many(self, keys):
+        now = time.time()
+        with self._lock:
+            return [self._lookup(key, now) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, _expires_at(ttl))
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self._lookup(key, time.time()) is not _MISSING:
+                return False
+            self._store(key, value, _expires_at(ttl))
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key, amount=1, ttl=None):
+        now = time.time()
+        with self._lock:
+            current = self._lookup(key, now)
+            if current is _MISSING or not isinstance(current, int):
+                value, expires_at = amount, _expires_at(ttl)
+            else:
+                value, expires_at = current + amount, self._data[key][1]
+            self._store(key, value, expires_at)
+            return value
+
+    def ttl(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None or entry[1] is None:
+            return None
+        return max(0.0, entry[1] - time.time())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SharedMemoryBackend(CacheBackend):
+    """SQLite table on a tmpfs path, shared by every worker process on the host."""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, value BLOB, expires_at REAL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so they are keyed by pid as well as thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _dump(value: Any) -> Any:
+        return value if type(value) is int else pickle.dumps(value)
+
+    @staticmethod
+    def _load(raw: Any) -> Any:
+        return raw if isinstance(raw, int) else pickle.loads(raw)
+
+    def _maybe_purge(self, conn: sqlite3.Connection) -> None:
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY:
+            return
+        conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM cache_entries WHERE key IN ("
+            "SELECT key FROM cache_entries ORDER BY expires_at LIMIT max(0, "
+            "(SELECT count(*) FROM cache_entries) - ?))",
+            (self.max_entries,),
+        )
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        placeholders = ",".join("?" * len(keys))
+        rows = self._connection().execute(
+            f"SELECT key, value FROM cache_entries WHERE key IN ({placeholders}) "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (*keys, time.time()),
+        )
+        found = {key: self._load(value) for key, value in rows}
+        return [found.get(key, _MISSING) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, self._dump(value), _expires_at(ttl)),
+        )
+        self._maybe_purge(conn)
+
+    def add(self, key, value, ttl=None):
+        conn = self._connection()
+        conn.execute(
+            "DELETE FROM cache_entries WHERE key = ? AND expires_at <= ?", (key, time.time())
+        )
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, self._dump(value), _expires_at(ttl)),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def incr(self, key, amount=1, ttl=None):
+        now = time.time()
+        row = self._connection().execute(
+            "INSERT INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            "value = CASE WHEN expires_at <= ? OR typeof(value) != 'integer' "
+            "THEN excluded.value ELSE value + excluded.value END, "
+            "expires_at = CASE WHEN expires_at <= ? OR typeof(value) != 'integer' "
+            "THEN excluded.expires_at ELSE expires_at END "
+            "RETURNING value",
+            (key, amount, _expires_at(ttl), now, now),
+        ).fetchone()
+        return row[0]
+
+    def ttl(self, key):
+        row = self._connection().execute(
+            "SELECT expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache_entries")
+
+
+class RedisBackend(CacheBackend):
+    """Any server that speaks the Redis protocol (Redis, Valkey, KeyDB, ...)."""
+
+    # Increment and expiry in one atomic step: a counter left without a TTL by a worker
+    # dying between two round trips would throttle its key forever.
+    INCR_SCRIPT = """
+    local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+    if tonumber(ARGV[2]) > 0 and redis.call('PTTL', KEYS[1]) == -1 then
+        redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    end
+    return value
+    """
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("The redis package is required for redis:// cache URLs")
+        self._client = redis.Redis.from_url(url)
+        self._incr = self._client.register_script(self.INCR_SCRIPT)
+
+    @staticmethod
+    def _dump(value: Any) -> bytes:
+        return str(value).encode() if type(value) is int else pickle.dumps(value)
+
+    @staticmethod
+    def _load(raw: bytes | None) -> Any:
+        if raw is None:
+            return _MISSING
+        if raw[:1] == b"\x80":
+            return pickle.loads(raw)
+        return int(raw)
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        return [self._load(raw) for raw in self._client.mget(keys)]
+
+    def set(self, key, value, ttl=None):
+        self._client.set(key, self._dump(value), px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        return bool(
+            self._client.set(key, self._dump(value), nx=True, px=int(ttl * 1000) if ttl else None)
+        )
+
+    def delete(self, key):
+        self._client.delete(key)
+
+    def incr(self, key, amount=1, ttl=None):
+        return int(self._incr(keys=[key], args=[amount, int(ttl * 1000) if ttl else 0]))
+
+    def ttl(self, key):
+        remaining = self._client.pttl(key)
+        return remaining / 1000.0 if remaining >= 0 else None
+
+    def clear(self):
+        self._client.flushdb()
+
+
+def backend_from_url(url: str, max_entries: int) -> CacheBackend:
+    parsed = urlparse(url or "memory://")
+    if parsed.scheme == "memory":
+        return MemoryBackend(max_entries=max_entries)
+    if parsed.scheme == "shared":
+        shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        path = parsed.path or os.path.join(shm_dir, "nush-cache.sqlite")
+        return SharedMemoryBackend(path, max_entries=max_entries)
+    if parsed.scheme in {"redis", "rediss", "unix"}:
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported CACHE_URL scheme: {parsed.scheme}")
+
+
+class Cache:
+    """Flask extension wrapping a backend with tags and single-flight loading.
+
+    Tags are versioned: each cached entry records the version of its tags when it was
+    written, and ``delete_tag`` bumps the version so every entry carrying it reads as a miss.
+    """
+
+    LOCK_STRIPES = 64
+
+    def __init__(self):
+        self.backend: CacheBackend = MemoryBackend()
+        self.default_ttl: float = 300
+        self.prefix = "nush:"
+        self._locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+    def init_app(self, app):
+        self.backend = backend_from_url(
+            app.config.get("CACHE_URL", "memory://"), app.config.get("CACHE_MAX_ENTRIES", 10000)
+        )
+        self.default_ttl = app.config.get("CACHE_DEFAULT_TTL", 300)
+        if _LimitsStorage is not None:
+            app.config.setdefault("RATELIMIT_STORAGE_URI", "nush-cache://")
+        app.extensions["cache"] = self
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    def _tag_versions(self, tags: Iterable[str]) -> dict[str, int]:
+        tags = list(tags)
+        if not tags:
+            return {}
+        keys = [self._tag_key(tag) for tag in tags]
+        versions = self.backend.get_many(keys)
+        for index, version in enumerate(versions):
+            if version is _MISSING:
+                # Seeding from the clock means an evicted tag never falls back to a version
+                # that stale entries were written with.
+                self.backend.add(keys[index], time.time_ns())
+                versions[index] = self.backend.get(keys[index])
+        return dict(zip(tags, versions))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        envelope = self.backend.get(self._key(key))
+        if envelope is _MISSING:
+            return default
+        value, tag_versions = envelope
+        if tag_versions and self._tag_versions(tag_versions) != tag_versions:
+            return default
+        return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None, tags: Iterable[str] = ()) -> None:
+        envelope = (value, self._tag_versions(tags))
+        self.backend.set(self._key(key), envelope, ttl if ttl is not None else self.default_ttl)
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(self._key(key))
+
+    def delete_tag(self, *tags: str) -> None:
+        for tag in tags:
+            self.backend.incr(self._tag_key(tag))
+
+    def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        return self.backend.incr(self._key(key), amount, ttl)
+
+    def get_counts(self, keys: Iterable[str]) -> list[int]:
+        """Read ``incr`` counters in one round trip; missing keys count as zero."""
+        values = self.backend.get_many([self._key(key) for key in keys])
+        return [0 if value is _MISSING else value for value in values]
+
+    def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: float | None = None,
+        tags: Iterable[str] = (),
+        lock_timeout: float = 5.0,
+    ) -> Any:
+        """Return the cached value, computing it at most once per key across workers.
+
+        ``None`` results are not cached so missing rows are looked up again next time.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._locks[hash(key) % self.LOCK_STRIPES]:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+            lock_key = self._key(f"lock:{key}")
+            locked = self.backend.add(lock_key, os.getpid(), ttl=lock_timeout)
+            if not locked:
+                deadline = time.monotonic() + lock_timeout
+                delay = 0.005
+                while time.monotonic() < deadline:
+                    time.sleep(delay)
+                    delay = min(delay * 2, 0.1)
+                    value = self.get(key, _MISSING)
+                    if value is not _MISSING:
+                        return value
+            try:
+                value = loader()
+                if value is not None:
+                    self.set(key, value, ttl=ttl, tags=tags)
+                return value
+            finally:
+                # After a timed-out wait the lock still belongs to the worker holding it.
+                if locked:
+                    self.backend.delete(lock_key)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+if _LimitsStorage is not None:
+
+    class CacheRateLimitStorage(_LimitsStorage):
+        """Rate limit counters kept in the app cache so every worker shares them."""
+
+        STORAGE_SCHEME = ["nush-cache"]
+
+        def __init__(self, uri: str | None = None, wrap_exceptions: bool = False, **options):
+            super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+        @property
+        def base_exceptions(self):
+            if redis is None:
+                return (sqlite3.Error, OSError)
+            return (sqlite3.Error, OSError, redis.RedisError)
+
+        @property
+        def _cache(self) -> Cache:
+            from .extensions import cache
+
+            return cache
+
+        def _key(self, key: str) -> str:
+            return f"ratelimit:{key}"
+
+        def incr(self, key, expiry, elastic_expiry=False, amount=1):
+            return self._cache.incr(self._key(key), amount, ttl=expiry)
+
+        def get(self, key):
+            value = self._cache.backend.get(self._cache._key(self._key(key)))
+            return 0 if value is _MISSING else value
+
+        def get_expiry(self, key):
+            remaining = self._cache.backend.ttl(self._cache._key(self._key(key)))
+            return time.time() + (remaining or 0)
+
+        def check(self):
+            return True
+
+        def reset(self):
+            return None
+
+        def clear(self, key):
+            self._cache.delete(self._key(key))
@@ -0,0 +1,226 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from .extensions import db
+from .services.admin_analytics import refresh_views
+from .services.audit import replay_spool
+from .services.courier_locations import downsample_locations, purge_locations
+from .services.dispatch import run_dispatch
+from .services.export_jobs import work_once
+from .services.notifications import work_once as deliver_notifications
+from .services.partitions import PARTITIONED_TABLES, detach_partitions, ensure_partitions
+from .services.payouts import parse_period, run_payouts
+from .services.popularity import recompute
+from .services.sales_rollups import backfill
+
+couriers_cli = AppGroup("couriers", help="Courier maintenance commands.")
+partitions_cli = AppGroup("partitions", help="Time-partitioned table maintenance.")
+dispatch_cli = AppGroup("dispatch", help="Courier dispatch.")
+payouts_cli = AppGroup("payouts", help="Restaurant payouts.")
+sales_cli = AppGroup("sales", help="Restaurant sales rollups.")
+analytics_cli = AppGroup("analytics", help="Admin analytics views.")
+exports_cli = AppGroup("exports", help="Background export jobs.")
+popularity_cli = AppGroup("popularity", help="Restaurant popularity ranking.")
+notifications_cli = AppGroup("notifications", help="Notification delivery.")
+audit_cli = AppGroup("audit", help="Admin audit log.")
+
+
+@couriers_cli.command("compact-locations")
+@click.option("--downsample-after-hours", default=24, show_default=True, type=int)
+@click.option("--bucket-seconds", default=60, show_default=True, type=int)
+@click.option("--retention-days", default=30, show_default=True, type=int)
+def compact_locations(downsample_after_hours: int, bucket_seconds: int, retention_days: int):
+    """Thin old location fixes to one per bucket and drop fixes past retention."""
+    now = datetime.now(tz=timezone.utc)
+    retention_cutoff = now - timedelta(days=retention_days)
+    downsample_cutoff = now - timedelta(hours=downsample_after_hours)
+    # Whole expired days go by dropping their partition; the row purge only covers the rest.
+    dropped = detach_partitions("courier_location_updates", retention_cutoff, drop=True)
+    purged = purge_locations(retention_cutoff)
+    thinned = 0
+    if downsample_cutoff > retention_cutoff:
+        thinned = downsample_locations(retention_cutoff, downsample_cutoff, bucket_seconds)
+    click.echo(f"dropped_partitions={len(dropped)} purged={purged} downsampled={thinned}")
+
+
+@partitions_cli.command("create")
+def create_partitions():
+    """Create partitions for the current period and the configured periods ahead."""
+    created = ensure_partitions()
+    click.echo(f"created={len(created)}")
+    for name in created:
+        click.echo(name)
+
+
+@partitions_cli.command("detach")
+@click.argument("table", type=click.Choice(sorted(PARTITIONED_TABLES)))
+@click.option("--older-than-days", required=True, type=int)
+@click.option("--drop", is_flag=True, help="Drop detached partitions instead of keeping them.")
+def detach_old_partitions(table: str, older_than_days: int, drop: bool):
+    """Detach partitions whose rows are all older than the cutoff."""
+    before = datetime.now(tz=timezone.utc) - timedelta(days=older_than_days)
+    detached = detach_partitions(table, before, drop=drop)
+    click.echo(f"detached={len(detached)}")
+    for name in detached:
+        click.echo(name)
+
+
+@dispatch_cli.command("run")
+@click.option("--once", is_flag=True, help="Run a single round and exit.")
+def dispatch_run(once: bool):
+    """Offer READY delivery tasks to nearby couriers in batches."""
+    interval = current_app.config["DISPATCH_INTERVAL_SECONDS"]
+    while True:
+        started = time.monotonic()
+        try:
+            stats = run_dispatch()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Dispatch round failed")
+            stats = None
+        if stats:
+            click.echo(
+                f"tasks={stats['tasks']} couriers={stats['couriers']} "
+                f"assigned={stats['assigned']} skipped={stats['skipped']}"
+            )
+        if once:
+            return
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+@payouts_cli.command("run")
+@click.option("--period", required=True, help="YYYY-MM, YYYY-Www or YYYY-MM-DD (UTC).")
+@click.option("--workers", type=int, default=None, help="Parallel chunks (PAYOUT_WORKERS).")
+@click.option("--chunk-size", type=int, default=None, help="Restaurants per chunk.")
+def payouts_run(period: str, workers: int | None, chunk_size: int | None):
+    """Create PENDING payouts and transfers for orders completed in the period.
+
+    Safe to re-run: existing payouts and transfers for the period are left alone.
+    """
+    try:
+        start, end = parse_period(period)
+        stats = run_payouts(start, end, workers=workers, chunk_size=chunk_size)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc), param_hint="--period") from exc
+    click.echo(
+        f"restaurants={stats['restaurants']} chunks={stats['chunks']} "
+        f"payouts={stats['payouts']} transfers={stats['transfers']}"
+    )
+
+
+@sales_cli.command("backfill")
+@click.option("--from", "first", required=True, type=click.DateTime(["%Y-%m-%d"]))
+@click.option("--to", "last", required=True, type=click.DateTime(["%Y-%m-%d"]))
+@click.option("--restaurant-id", type=click.UUID, default=None, help="Only this restaurant.")
+def sales_backfill(first, last, restaurant_id):
+    """Rebuild sales rollups for local days FROM..TO (inclusive) from the order tables."""
+    if first > last:
+        raise click.BadParameter("must not be after --to", param_hint="--from")
+    days = backfill(first.date(), last.date(), restaurant_id)
+    click.echo(f"Rebuilt {days} day(s) of sales rollups.")
+
+
+@analytics_cli.command("refresh")
+@click.option("--once", is_flag=True, help="Refresh once and exit.")
+def analytics_refresh(once: bool):
+    """Refresh the admin analytics views every ADMIN_ANALYTICS_REFRESH_SECONDS."""
+    interval = current_app.config["ADMIN_ANALYTICS_REFRESH_SECONDS"]
+    while True:
+        started = time.monotonic()
+        try:
+            durations = refresh_views()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Analytics refresh failed")
+            durations = {}
+        if durations is None:
+            click.echo("Skipped: another refresh is running.")
+        elif durations:
+            click.echo(" ".join(f"{name}={ms}ms" for name, ms in durations.items()))
+        if once:
+            return
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+@exports_cli.command("work")
+@click.option("--once", is_flag=True, help="Run queued jobs until the queue is empty, then exit.")
+def exports_work(once: bool):
+    """Run queued export jobs, polling every EXPORT_WORKER_POLL_SECONDS when idle."""
+    poll = current_app.config["EXPORT_WORKER_POLL_SECONDS"]
+    while True:
+        try:
+            job = work_once()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Export worker failed to claim a job")
+            job = None
+        if job is not None:
+            click.echo(f"job={job.id} status={job.status} rows={job.rows_exported}")
+            continue
+        if once:
+            return
+        time.sleep(poll)
+
+
+@popularity_cli.command("recompute")
+@click.option("--once", is_flag=True, help="Recompute once and exit.")
+@click.option("--restaurant-id", type=click.UUID, default=None, help="Only this restaurant.")
+def popularity_recompute(once: bool, restaurant_id):
+    """Rebuild popularity scores from recent events every POPULARITY_RECOMPUTE_SECONDS."""
+    interval = current_app.config["POPULARITY_RECOMPUTE_SECONDS"]
+    while True:
+        started = time.monotonic()
+        try:
+            count = recompute(restaurant_id)
+            click.echo(f"Recomputed popularity for {count} restaurant(s).")
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Popularity recompute failed")
+        if once:
+            return
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+@notifications_cli.command("work")
+@click.option("--once", is_flag=True, help="Deliver until nothing is due, then exit.")
+def notifications_work(once: bool):
+    """Deliver due notifications in batches, polling every NOTIFICATION_POLL_SECONDS when idle."""
+    poll = current_app.config["NOTIFICATION_POLL_SECONDS"]
+    while True:
+        try:
+            stats = deliver_notifications()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Notification batch failed")
+            stats = None
+        if stats and any(stats.values()):
+            click.echo(" ".join(f"{outcome}={count}" for outcome, count in stats.items()))
+            continue
+        if once:
+            return
+        time.sleep(poll)
+
+
+@audit_cli.command("replay")
+@click.option("--spool-dir", default=None, help="Defaults to AUDIT_SPOOL_DIR.")
+def audit_replay(spool_dir: str | None):
+    """Insert audit rows spilled to disk while the database was unavailable or behind."""
+    replayed = replay_spool(spool_dir or current_app.config["AUDIT_SPOOL_DIR"])
+    click.echo(f"Replayed {replayed} audit rows")
+
+
+def register_commands(app) -> None:
+    app.cli.add_command(couriers_cli)
+    app.cli.add_command(partitions_cli)
+    app.cli.add_command(dispatch_cli)
+    app.cli.add_command(payouts_cli)
+    app.cli.add_command(sales_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(exports_cli)
+    app.cli.add_command(popularity_cli)
+    app.cli.add_command(notifications_cli)
+    app.cli.add_command(audit_cli)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 
 class Config:
@@ -13,3 +14,50 @@ class Config:
     GUEST_CART_COOKIE_NAME = os.getenv("GUEST_CART_COOKIE_NAME", "guest_cart_id")
     STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "")
     STRIPE_API_VERSION = os.getenv("STRIPE_API_VERSION", "")
+    CACHE_URL = os.getenv("CACHE_URL", "memory://")
+    CACHE_DEFAULT_TTL = int(os.getenv("CACHE_DEFAULT_TTL", "300"))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    COUPON_COUNTER_SHARDS = int(os.getenv("COUPON_COUNTER_SHARDS", "4"))
+    AVAILABILITY_TIMEZONE = os.getenv("AVAILABILITY_TIMEZONE", "UTC")
+    PREP_TIME_EMA_ALPHA = float(os.getenv("PREP_TIME_EMA_ALPHA", "0.2"))
+    COURIER_LOCATION_FLUSH_MS = int(os.getenv("COURIER_LOCATION_FLUSH_MS", "500"))
+    COURIER_LOCATION_BATCH_ROWS = int(os.getenv("COURIER_LOCATION_BATCH_ROWS", "2000"))
+    COURIER_LOCATION_TTL = int(os.getenv("COURIER_LOCATION_TTL", "120"))
+    DISPATCH_INTERVAL_SECONDS = float(os.getenv("DISPATCH_INTERVAL_SECONDS", "5"))
+    DISPATCH_BATCH_SIZE = int(os.getenv("DISPATCH_BATCH_SIZE", "500"))
+    DISPATCH_MAX_PICKUP_KM = float(os.getenv("DISPATCH_MAX_PICKUP_KM", "8"))
+    DISPATCH_COURIER_SPEED_KMH = float(os.getenv("DISPATCH_COURIER_SPEED_KMH", "25"))
+    ROUTE_STOP_SERVICE_MINUTES = float(os.getenv("ROUTE_STOP_SERVICE_MINUTES", "3"))
+    DELIVERY_PROMISE_MINUTES = int(os.getenv("DELIVERY_PROMISE_MINUTES", "60"))
+    TRACKING_PUSH_INTERVAL_SECONDS = float(os.getenv("TRACKING_PUSH_INTERVAL_SECONDS", "2"))
+    TRACKING_STREAM_MAX_SECONDS = int(os.getenv("TRACKING_STREAM_MAX_SECONDS", "300"))
+    PAYOUT_CHUNK_SIZE = int(os.getenv("PAYOUT_CHUNK_SIZE", "500"))
+    PAYOUT_WORKERS = int(os.getenv("PAYOUT_WORKERS", "4"))
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+    EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "100000"))
+    EXPORT_STORAGE_URL = os.getenv(
+        "EXPORT_STORAGE_URL", os.path.join(tempfile.gettempdir(), "exports")
+    )
+    EXPORT_WORKER_POLL_SECONDS = float(os.getenv("EXPORT_WORKER_POLL_SECONDS", "5"))
+    EXPORT_JOB_STALE_SECONDS = int(os.getenv("EXPORT_JOB_STALE_SECONDS", "600"))
+    ADMIN_ANALYTICS_REFRESH_SECONDS = int(os.getenv("ADMIN_ANALYTICS_REFRESH_SECONDS", "900"))
+    POPULARITY_HALF_LIFE_HOURS = float(os.getenv("POPULARITY_HALF_LIFE_HOURS", "168"))
+    TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+    POPULARITY_LOOKBACK_DAYS = int(os.getenv("POPULARITY_LOOKBACK_DAYS", "90"))
+    POPULARITY_RECOMPUTE_SECONDS = int(os.getenv("POPULARITY_RECOMPUTE_SECONDS", "3600"))
+    NOTIFICATION_DEFAULT_CHANNEL = os.getenv("NOTIFICATION_DEFAULT_CHANNEL", "log")
+    NOTIFICATION_CHANNEL_CONCURRENCY = int(os.getenv("NOTIFICATION_CHANNEL_CONCURRENCY", "8"))
+    NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "500"))
+    NOTIFICATION_COALESCE_SECONDS = int(os.getenv("NOTIFICATION_COALESCE_SECONDS", "5"))
+    NOTIFICATION_LEASE_SECONDS = int(os.getenv("NOTIFICATION_LEASE_SECONDS", "120"))
+    NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "6"))
+    NOTIFICATION_RETRY_BASE_SECONDS = float(os.getenv("NOTIFICATION_RETRY_BASE_SECONDS", "30"))
+    NOTIFICATION_RETRY_MAX_SECONDS = float(os.getenv("NOTIFICATION_RETRY_MAX_SECONDS", "3600"))
+    NOTIFICATION_POLL_SECONDS = float(os.getenv("NOTIFICATION_POLL_SECONDS", "2"))
+    AUDIT_ENABLED = os.getenv("AUDIT_ENABLED", "true").lower() == "true"
+    AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "1"))
+    AUDIT_BATCH_ROWS = int(os.getenv("AUDIT_BATCH_ROWS", "500"))
+    AUDIT_BUFFER_ROWS = int(os.getenv("AUDIT_BUFFER_ROWS", "10000"))
+    AUDIT_SPOOL_DIR = os.getenv(
+        "AUDIT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "audit-spool")
+    )
@@ -2,6 +2,9 @@ from flask_cors import CORS
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 
+from .cache import Cache
+
+cache = Cache()
 cors = CORS()
 db = SQLAlchemy()
 migrate = Migrate()
@@ -2,9 +2,9 @@ from enum import Enum
 
 import bcrypt
 
-from sqlalchemy import CheckConstraint, Index, UniqueConstraint, func
+from sqlalchemy import CheckConstraint, Index, UniqueConstraint, and_, func
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
-from sqlalchemy.orm import validates
+from sqlalchemy.orm import foreign, validates
 
 from .extensions import db
 from .model_helpers import (
@@ -181,6 +181,7 @@ class AddressType(str, Enum):
 
 class RatingTarget(str, Enum):
     RESTAURANT = "restaurant"
+    MENU_ITEM = "menu_item"
     COURIER = "courier"
 
 
@@ -369,6 +370,17 @@ class Restaurant(BaseModel):
     order_allocations = db.relationship(
         "OrderRestaurantAllocation", back_populates="restaurant", cascade="all, delete-orphan"
     )
+    rating_aggregate = db.relationship(
+        "RatingAggregate",
+        primaryjoin=lambda: and_(
+            foreign(RatingAggregate.target_id) == Restaurant.id,
+            RatingAggregate.target_type == RatingTarget.RESTAURANT,
+        ),
+        uselist=False,
+        viewonly=True,
+        lazy="joined",
+    )
+    counters = db.relationship("RestaurantCounter", uselist=False, viewonly=True, lazy="joined")
 
     def __repr__(self) -> str:
         return f"<Restaurant {self.id} {self.name}>"
@@ -391,6 +403,108 @@ class RestaurantConfiguration(BaseModel):
         return validate_non_negative(value, key)
 
 
+class PrepTimeEstimate(BaseModel):
+    __tablename__ = "prep_time_estimates"
+    __table_args__ = (
+        UniqueConstraint("restaurant_id", "hour_of_week", name="uq_prep_time_estimates_hour"),
+    )
+
+    restaurant_id = db.Column(UUID(as_uuid=True), db.ForeignKey("restaurants.id"), nullable=False, index=True)
+    hour_of_week = db.Column(db.SmallInteger, nullable=False)
+    ema_minutes = db.Column(db.Float, nullable=False)
+    samples = db.Column(db.Integer, nullable=False, default=0)
+
+
+class RestaurantSalesRollup(BaseModel):
+    __tablename__ = "restaurant_sales_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "restaurant_id", "granularity", "bucket_start", name="uq_restaurant_sales_rollups_bucket"
+        ),
+    )
+
+    restaurant_id = db.Column(UUID(as_uuid=True), db.ForeignKey("restaurants.id"), nullable=False)
+    granularity = db.Column(db.String(8), nullable=False)
+    bucket_start = db.Column(db.DateTime(timezone=True), nullable=False)
+    orders_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+    cancelled_count = db.Column(db.Integer, nullable=False, default=0)
+    gross_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    cancelled_cents = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class MenuItemSalesRollup(BaseModel):
+    __tablename__ = "menu_item_sales_rollups"
+    __table_args__ = (
+        UniqueConstraint("restaurant_id", "day", "menu_item_id", name="uq_menu_item_sales_rollups_day"),
+    )
+
+    restaurant_id = db.Column(UUID(as_uuid=True), db.ForeignKey("restaurants.id"), nullable=False)
+    menu_item_id = db.Column(UUID(as_uuid=True), db.ForeignKey("menu_items.id"), nullable=False, index=True)
+    day = db.Column(db.Date, nullable=False)
+    name = db.Column(db.String(120), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    cancelled_quantity = db.Column(db.Integer, nullable=False, default=0)
+    cancelled_cents = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+# Scores are log-scaled against a fixed epoch (see services.popularity); NULL means no
+# recent activity.
+class RestaurantPopularity(BaseModel):
+    __tablename__ = "restaurant_popularity"
+    __table_args__ = (
+        UniqueConstraint("restaurant_id", name="uq_restaurant_popularity_restaurant"),
+    )
+
+    restaurant_id = db.Column(UUID(as_uuid=True), db.ForeignKey("restaurants.id"), nullable=False)
+    popular_score = db.Column(db.Float)
+    trending_score = db.Column(db.Float)
+    recomputed_at = db.Column(db.DateTime(timezone=True))
+
+
+Index(
+    "ix_restaurant_popularity_popular",
+    RestaurantPopularity.popular_score.desc().nulls_last(),
+    RestaurantPopularity.restaurant_id,
+)
+Index(
+    "ix_restaurant_popularity_trending",
+    RestaurantPopularity.trending_score.desc().nulls_last(),
+    RestaurantPopularity.restaurant_id,
+)
+
+
+class AnalyticsRefresh(BaseModel):
+    __tablename__ = "analytics_refreshes"
+
+    view_name = db.Column(db.String(64), nullable=False, unique=True)
+    refreshed_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    duration_ms = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ExportJob(BaseModel):
+    __tablename__ = "export_jobs"
+    __table_args__ = (Index("ix_export_jobs_status_created_at", "status", "created_at"),)
+
+    requested_by_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id"), nullable=False, index=True)
+    dataset = db.Column(db.String(32), nullable=False)
+    format = db.Column(db.String(16), nullable=False)
+    filters = db.Column(JSONB, nullable=False, default=dict)
+    status = db.Column(db.String(16), nullable=False, default="queued")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    rows_exported = db.Column(db.BigInteger, nullable=False, default=0)
+    chunks_written = db.Column(db.Integer, nullable=False, default=0)
+    bytes_written = db.Column(db.BigInteger, nullable=False, default=0)
+    cursor = db.Column(JSONB)
+    manifest = db.Column(JSONB, nullable=False, default=dict)
+    error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime(timezone=True))
+    finished_at = db.Column(db.DateTime(timezone=True))
+
+    requested_by = db.relationship("User")
+
+
 class OrderTypeConfiguration(BaseModel):
     __tablename__ = "order_type_configurations"
 
@@ -599,6 +713,24 @@ class RestaurantLike(BaseModel):
     restaurant = db.relationship("Restaurant", back_populates="likes")
 
 
+# Maintained on write by services.counters, so profile and listing reads never COUNT(*).
+class UserCounter(BaseModel):
+    __tablename__ = "user_counters"
+    __table_args__ = (UniqueConstraint("user_id", name="uq_user_counters_user"),)
+
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id"), nullable=False)
+    orders_count = db.Column(db.Integer, nullable=False, default=0)
+    likes_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class RestaurantCounter(BaseModel):
+    __tablename__ = "restaurant_counters"
+    __table_args__ = (UniqueConstraint("restaurant_id", name="uq_restaurant_counters_restaurant"),)
+
+    restaurant_id = db.Column(UUID(as_uuid=True), db.ForeignKey("restaurants.id"), nullable=False)
+    likes_count = db.Column(db.Integer, nullable=False, default=0)
+
+
 class Cart(BaseModel):
     __tablename__ = "carts"
     __table_args__ = (Index("ix_carts_customer_active", "customer_id", "restaurant_id"),)
@@ -671,6 +803,7 @@ class Order(BaseModel):
         Index("ix_orders_created_at", "created_at"),
         Index("ix_orders_status", "status"),
         Index("ix_orders_restaurant_created_at", "restaurant_id", "created_at"),
+        Index("ix_orders_placed_at", "placed_at"),
     )
 
     customer_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id"), nullable=False, index=True)
@@ -686,14 +819,21 @@ class Order(BaseModel):
     promo_id = db.Column(UUID(as_uuid=True), db.ForeignKey("promotions.id"), index=True)
     membership_id = db.Column(UUID(as_uuid=True), db.ForeignKey("customer_memberships.id"), index=True)
     placed_at = db.Column(db.DateTime(timezone=True))
+    estimated_ready_at = db.Column(db.DateTime(timezone=True))
 
     customer = db.relationship("User", back_populates="orders")
     restaurant = db.relationship("Restaurant", back_populates="orders")
     promo = db.relationship("Promotion")
     membership = db.relationship("CustomerMembership")
     items = db.relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    # History rows are never older than their order; the extra bound lets Postgres skip
+    # older monthly partitions when the history is loaded.
     status_history = db.relationship(
-        "OrderStatusHistory", back_populates="order", cascade="all, delete-orphan"
+        "OrderStatusHistory",
+        primaryjoin="and_(Order.id == OrderStatusHistory.order_id, "
+        "OrderStatusHistory.created_at >= Order.created_at)",
+        back_populates="order",
+        cascade="all, delete-orphan",
     )
     pickup_schedule = db.relationship(
         "PickupSchedule", back_populates="order", uselist=False, cascade="all, delete-orphan"
@@ -779,7 +919,16 @@ class OrderItemOption(BaseModel):
 
 class OrderStatusHistory(BaseModel):
     __tablename__ = "order_status_history"
-    __table_args__ = (Index("ix_order_status_history_order", "order_id"),)
+    __table_args__ = (
+        Index("ix_order_status_history_order", "order_id"),
+        Index("ix_order_status_history_created_brin", "created_at", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # Partitioned by month; the partition key has to be part of the primary key.
+    created_at = db.Column(
+        db.DateTime(timezone=True), primary_key=True, server_default=db.func.now(), nullable=False
+    )
 
     order_id = db.Column(UUID(as_uuid=True), db.ForeignKey("orders.id"), nullable=False, index=True)
     from_status = db.Column(db.Enum(OrderStatus, name="order_status"), nullable=False)
@@ -805,6 +954,17 @@ class PickupSchedule(BaseModel):
     order = db.relationship("Order", back_populates="pickup_schedule")
 
 
+class PickupSlotCounter(BaseModel):
+    __tablename__ = "pickup_slot_counters"
+    __table_args__ = (
+        UniqueConstraint("restaurant_id", "slot_start", name="uq_pickup_slot_counters_slot"),
+    )
+
+    restaurant_id = db.Column(UUID(as_uuid=True), db.ForeignKey("restaurants.id"), nullable=False, index=True)
+    slot_start = db.Column(db.DateTime(timezone=True), nullable=False)
+    reserved = db.Column(db.Integer, nullable=False, default=0)
+
+
 class OrderAdjustment(BaseModel):
     __tablename__ = "order_adjustments"
     __table_args__ = (Index("ix_order_adjustments_order", "order_id"),)
@@ -855,20 +1015,36 @@ class CourierAssignment(BaseModel):
 
 class CourierLocationUpdate(BaseModel):
     __tablename__ = "courier_location_updates"
-    __table_args__ = (Index("ix_courier_location_updates_courier", "courier_id"),)
+    __table_args__ = (
+        Index("ix_courier_location_updates_courier", "courier_id"),
+        Index("ix_courier_location_updates_courier_recorded", "courier_id", "recorded_at"),
+        Index("ix_courier_location_updates_recorded_brin", "recorded_at", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (recorded_at)"},
+    )
 
     courier_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id"), nullable=False, index=True)
     delivery_task_id = db.Column(UUID(as_uuid=True), db.ForeignKey("delivery_tasks.id"), index=True)
     latitude = db.Column(db.Numeric(9, 6), nullable=False)
     longitude = db.Column(db.Numeric(9, 6), nullable=False)
+    # Partitioned by day; the partition key has to be part of the primary key.
     recorded_at = db.Column(
-        db.DateTime(timezone=True), nullable=False, server_default=db.func.now()
+        db.DateTime(timezone=True), primary_key=True, nullable=False, server_default=db.func.now()
     )
 
     courier = db.relationship("User")
     delivery_task = db.relationship("DeliveryTask", back_populates="location_updates")
 
 
+class CourierLatestLocation(BaseModel):
+    __tablename__ = "courier_latest_locations"
+
+    courier_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id"), nullable=False, unique=True, index=True)
+    delivery_task_id = db.Column(UUID(as_uuid=True), db.ForeignKey("delivery_tasks.id"), index=True)
+    latitude = db.Column(db.Numeric(9, 6), nullable=False)
+    longitude = db.Column(db.Numeric(9, 6), nullable=False)
+    recorded_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+
 class RoutePlan(BaseModel):
     __tablename__ = "route_plans"
 
@@ -1059,6 +1235,7 @@ class Payout(BaseModel):
     __tablename__ = "payouts"
     __table_args__ = (
         Index("ix_payouts_status", "status"),
+        UniqueConstraint("restaurant_id", "start_at", "end_at", name="uq_payouts_restaurant_period"),
         CheckConstraint(
             "(restaurant_id IS NOT NULL AND courier_id IS NULL) OR "
             "(restaurant_id IS NULL AND courier_id IS NOT NULL)",
@@ -1132,7 +1309,10 @@ class PromotionCondition(BaseModel):
 
 class PromotionRedemption(BaseModel):
     __tablename__ = "promotion_redemptions"
-    __table_args__ = (Index("ix_promo_redemptions_customer", "customer_id"),)
+    __table_args__ = (
+        Index("ix_promo_redemptions_customer", "customer_id"),
+        Index("ix_promo_redemptions_created_at", "created_at"),
+    )
 
     promotion_id = db.Column(UUID(as_uuid=True), db.ForeignKey("promotions.id"), nullable=False, index=True)
     customer_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id"), nullable=False, index=True)
@@ -1142,6 +1322,8 @@ class PromotionRedemption(BaseModel):
         db.Enum(PromotionRedemptionStatus, name="promotion_redemption_status"), nullable=False
     )
     redeemed_at = db.Column(db.DateTime(timezone=True))
+    coupon_id = db.Column(UUID(as_uuid=True), db.ForeignKey("coupons.id"), index=True)
+    counter_shard = db.Column(db.SmallInteger)
 
     promotion = db.relationship("Promotion", back_populates="redemptions")
     customer = db.relationship("User")
@@ -1169,6 +1351,30 @@ class Coupon(BaseModel):
         return validate_non_negative(value, key)
 
 
+class CouponRedemptionCounter(BaseModel):
+    __tablename__ = "coupon_redemption_counters"
+    __table_args__ = (
+        UniqueConstraint("coupon_id", "shard", name="uq_coupon_redemption_counters_shard"),
+        CheckConstraint("used <= capacity", name="ck_coupon_redemption_counters_capacity"),
+    )
+
+    coupon_id = db.Column(UUID(as_uuid=True), db.ForeignKey("coupons.id"), nullable=False, index=True)
+    shard = db.Column(db.SmallInteger, nullable=False)
+    capacity = db.Column(db.Integer, nullable=False)
+    used = db.Column(db.Integer, nullable=False, default=0)
+
+
+class CouponCustomerRedemption(BaseModel):
+    __tablename__ = "coupon_customer_redemptions"
+    __table_args__ = (
+        UniqueConstraint("coupon_id", "customer_id", name="uq_coupon_customer_redemptions"),
+    )
+
+    coupon_id = db.Column(UUID(as_uuid=True), db.ForeignKey("coupons.id"), nullable=False, index=True)
+    customer_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id"), nullable=False, index=True)
+    used = db.Column(db.Integer, nullable=False, default=0)
+
+
 class MembershipTier(BaseModel):
     __tablename__ = "membership_tiers"
     __table_args__ = (UniqueConstraint("name", name="uq_membership_tiers_name"),)
@@ -1293,7 +1499,12 @@ class MembershipReceipt(BaseModel):
 
 class Rating(BaseModel):
     __tablename__ = "ratings"
-    __table_args__ = (Index("ix_ratings_target", "target_type", "target_id"),)
+    __table_args__ = (
+        Index("ix_ratings_target", "target_type", "target_id"),
+        UniqueConstraint(
+            "rater_id", "order_id", "target_type", "target_id", name="uq_ratings_rater_order_target"
+        ),
+    )
 
     target_type = db.Column(db.Enum(RatingTarget, name="rating_target"), nullable=False)
     target_id = db.Column(UUID(as_uuid=True), nullable=False)
@@ -1315,6 +1526,29 @@ class Rating(BaseModel):
         return value
 
 
+class RatingAggregate(BaseModel):
+    __tablename__ = "rating_aggregates"
+    __table_args__ = (
+        UniqueConstraint("target_type", "target_id", name="uq_rating_aggregates_target"),
+    )
+
+    target_type = db.Column(db.Enum(RatingTarget, name="rating_target"), nullable=False)
+    target_id = db.Column(UUID(as_uuid=True), nullable=False)
+    ratings_count = db.Column(db.Integer, nullable=False, default=0)
+    stars_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    average_stars = db.Column(db.Float, nullable=False, default=0)
+
+
+# Serves "best rated first" listings straight from the index, in either direction.
+Index(
+    "ix_rating_aggregates_rank",
+    RatingAggregate.target_type,
+    RatingAggregate.average_stars.desc(),
+    RatingAggregate.ratings_count.desc(),
+    RatingAggregate.target_id,
+)
+
+
 class SupportTicket(BaseModel):
     __tablename__ = "support_tickets"
     __table_args__ = (Index("ix_support_tickets_status", "status"),)
@@ -1331,20 +1565,48 @@ class SupportTicket(BaseModel):
 
 class Notification(BaseModel):
     __tablename__ = "notifications"
-    __table_args__ = (Index("ix_notifications_user_status", "user_id", "status"),)
+    __table_args__ = (
+        Index("ix_notifications_user_status", "user_id", "status"),
+        Index("ix_notifications_created_brin", "created_at", postgresql_using="brin"),
+        Index(
+            "ix_notifications_pending_due",
+            "next_attempt_at",
+            postgresql_where=db.text("status = 'PENDING'"),
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # Partitioned by month; the partition key has to be part of the primary key.
+    created_at = db.Column(
+        db.DateTime(timezone=True), primary_key=True, server_default=db.func.now(), nullable=False
+    )
 
     user_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id"), nullable=False, index=True)
     type = db.Column(db.String(64), nullable=False)
     payload = db.Column(JSONB, default=dict)
     status = db.Column(db.Enum(NotificationStatus, name="notification_status"), nullable=False)
     sent_at = db.Column(db.DateTime(timezone=True))
+    # Pending notifications of one user sharing a key are delivered as one message.
+    coalesce_key = db.Column(db.String(128))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    last_error = db.Column(db.Text)
 
     user = db.relationship("User", back_populates="notifications")
 
 
 class AuditLog(BaseModel):
     __tablename__ = "audit_logs"
-    __table_args__ = (Index("ix_audit_logs_entity", "entity_type", "entity_id"),)
+    __table_args__ = (
+        Index("ix_audit_logs_entity", "entity_type", "entity_id"),
+        Index("ix_audit_logs_created_brin", "created_at", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # Partitioned by month; the partition key has to be part of the primary key.
+    created_at = db.Column(
+        db.DateTime(timezone=True), primary_key=True, server_default=db.func.now(), nullable=False
+    )
 
     actor_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id"), index=True)
     action = db.Column(db.String(120), nullable=False)
@@ -3,11 +3,13 @@ from flask import Blueprint
 from .admin import admin_bp
 from .auth import auth_bp
 from .carts import carts_bp
+from .courier import courier_bp
 from .memberships import memberships_bp
 from .menus import menus_bp
 from .orders import orders_bp
 from .payments import payments_bp, receipts_bp
 from .promotions import promotions_bp
+from .ratings import ratings_bp
 from .restaurant_admin import restaurant_admin_bp
 from .restaurants import restaurants_bp
 from .me import me_bp
@@ -26,6 +28,8 @@ api_bp.register_blueprint(receipts_bp)
 api_bp.register_blueprint(admin_bp)
 api_bp.register_blueprint(restaurant_admin_bp)
 api_bp.register_blueprint(me_bp)
+api_bp.register_blueprint(courier_bp)
+api_bp.register_blueprint(ratings_bp)
 
 
 @api_bp.get("/health")
@@ -1,15 +1,34 @@
-from flask import Blueprint, request
+from datetime import date, datetime, timedelta, timezone
+import os
 
-from ..auth_helpers import require_role
-from ..extensions import db
-from ..models import MembershipTier, Order, Restaurant, RestaurantStatus, User, UserRoleType, Promotion, PromotionScope, PromotionType
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    redirect,
+    request,
+    send_file,
+    stream_with_context,
+    url_for,
+)
+
+from ..auth_helpers import audited, get_current_user, require_role
+from ..extensions import cache, db
+from ..models import ExportJob, MembershipTier, Order, Restaurant, RestaurantStatus, User, UserRoleType, Promotion, PromotionScope, PromotionType
+from ..services.admin_analytics import overview, unpopulated_views
+from ..services.export_jobs import MANIFEST, create_job, file_key, job_files
+from ..services.export_storage import get_storage
+from ..services.exports import DATASETS, FORMATS, stream_export
+from ..services.promotions import invalidate_promotions
 from .response import error, ok
-from .serializers import restaurant_summary, user_summary, order_summary
+from .serializers import export_job_summary, restaurant_summary, user_summary, order_summary
 from .validators import get_json, parse_enum, parse_pagination
 
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
+ANALYTICS_MAX_DAYS = 366
+
 
 @admin_bp.get("/users")
 @require_role(UserRoleType.ADMIN, UserRoleType.STAFF)
@@ -22,6 +41,7 @@ def list_users():
 
 
 @admin_bp.patch("/users/<uuid:user_id>")
+@audited("user.update", "user", "user_id")
 @require_role(UserRoleType.ADMIN, UserRoleType.STAFF)
 def update_user(user_id):
     payload, err = get_json(request)
@@ -52,6 +72,7 @@ def list_restaurants():
 
 
 @admin_bp.patch("/restaurants/<uuid:restaurant_id>/status")
+@audited("restaurant.status", "restaurant", "restaurant_id")
 @require_role(UserRoleType.ADMIN, UserRoleType.STAFF)
 def update_restaurant_status(restaurant_id):
     payload, err = get_json(request)
@@ -65,6 +86,7 @@ def update_restaurant_status(restaurant_id):
         return error("NOT_FOUND", "Restaurant not found", status=404)
     restaurant.status = status
     db.session.commit()
+    cache.delete_tag(f"restaurant:{restaurant.id}")
     return ok({"restaurant": restaurant_summary(restaurant)})
 
 
@@ -78,6 +100,162 @@ def list_orders():
     return ok({"orders": [order_summary(o) for o in orders], "limit": limit, "offset": offset})
 
 
+@admin_bp.get("/analytics")
+@require_role(UserRoleType.ADMIN, UserRoleType.STAFF)
+def analytics():
+    days = {}
+    for field in ("from", "to"):
+        value = request.args.get(field)
+        if value is None:
+            continue
+        try:
+            days[field] = date.fromisoformat(value)
+        except ValueError:
+            return error("VALIDATION_ERROR", f"{field} must be YYYY-MM-DD", {field: "invalid"})
+    last = days.get("to") or datetime.now(tz=timezone.utc).date()
+    first = days.get("from") or last - timedelta(days=29)
+    if first > last:
+        return error("VALIDATION_ERROR", "from must not be after to", {"from": "invalid"})
+    if (last - first).days >= ANALYTICS_MAX_DAYS:
+        return error(
+            "VALIDATION_ERROR", f"At most {ANALYTICS_MAX_DAYS} days per report", {"from": "range"}
+        )
+    # Reading a view that was never refreshed raises, so answer "not ready" instead of a 500.
+    missing = unpopulated_views()
+    if missing:
+        return error(
+            "ANALYTICS_NOT_READY",
+            "Analytics have not been computed yet; run `flask analytics refresh`",
+            {"views": missing},
+            status=503,
+        )
+    return ok(overview(first, last))
+
+
+def _export_bound(value, field: str):
+    """``from``/``to`` as a UTC datetime; a bare ``to`` date includes that whole day."""
+    if not value:
+        return None, None
+    try:
+        if len(value) == 10:
+            day = date.fromisoformat(value)
+            bound = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+            return (bound + timedelta(days=1) if field == "to" else bound), None
+        bound = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None, error(
+            "VALIDATION_ERROR", f"{field} must be an ISO-8601 date or datetime", {field: "invalid"}
+        )
+    return (bound if bound.tzinfo else bound.replace(tzinfo=timezone.utc)), None
+
+
+def _export_range(values):
+    start, err = _export_bound(values.get("from"), "from")
+    if err:
+        return None, None, err
+    end, err = _export_bound(values.get("to"), "to")
+    if err:
+        return None, None, err
+    if start and end and start >= end:
+        return None, None, error("VALIDATION_ERROR", "from must be before to", {"from": "invalid"})
+    return start, end, None
+
+
+@admin_bp.get(
+    "/exports/<any(orders, users, payouts, redemptions):dataset>"
+    ".<any(csv, ndjson):fmt>"
+)
+@require_role(UserRoleType.ADMIN, UserRoleType.STAFF)
+def export_dataset(dataset, fmt):
+    start, end, err = _export_range(request.args)
+    if err:
+        return err
+    compress = request.args.get("gzip", "").lower() in {"1", "true"}
+    filename = f"{dataset}.{fmt}" + (".gz" if compress else "")
+    chunks = stream_export(
+        dataset, fmt, start, end, current_app.config["EXPORT_BATCH_SIZE"], compress=compress
+    )
+    return Response(
+        stream_with_context(chunks),
+        mimetype="application/gzip" if compress else FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+def _export_job_payload(job) -> dict:
+    summary = export_job_summary(job)
+    summary["files"] = [
+        {**file, "url": url_for("admin.download_export_file", job_id=job.id, name=file["name"])}
+        for file in job_files(job)
+    ]
+    return summary
+
+
+@admin_bp.post("/exports")
+@audited("export.create", "export_job", "job")
+@require_role(UserRoleType.ADMIN, UserRoleType.STAFF)
+def create_export_job():
+    payload, err = get_json(request)
+    if err:
+        return err
+    dataset = payload.get("dataset")
+    if dataset not in DATASETS:
+        return error(
+            "VALIDATION_ERROR",
+            f"dataset must be one of {', '.join(DATASETS)}",
+            {"dataset": "invalid"},
+        )
+    fmt = payload.get("format", "csv")
+    if fmt not in FORMATS:
+        return error(
+            "VALIDATION_ERROR", f"format must be one of {', '.join(FORMATS)}", {"format": "invalid"}
+        )
+    start, end, err = _export_range(payload)
+    if err:
+        return err
+    job = create_job(get_current_user().id, dataset, fmt, start, end)
+    return ok({"job": _export_job_payload(job)}, status=202)
+
+
+@admin_bp.get("/exports/<uuid:job_id>")
+@require_role(UserRoleType.ADMIN, UserRoleType.STAFF)
+def get_export_job(job_id):
+    job = db.session.get(ExportJob, job_id)
+    if not job:
+        return error("NOT_FOUND", "Export job not found", status=404)
+    return ok({"job": _export_job_payload(job)})
+
+
+@admin_bp.get("/exports/<uuid:job_id>/files/<name>")
+@require_role(UserRoleType.ADMIN, UserRoleType.STAFF)
+def download_export_file(job_id, name):
+    job = db.session.get(ExportJob, job_id)
+    if not job or name not in {file["name"] for file in job_files(job)}:
+        return error("NOT_FOUND", "Export file not found", status=404)
+    storage = get_storage()
+    key = file_key(job.id, name)
+    url = storage.url(key, name)
+    if url:
+        return redirect(url)
+    path = storage.path(key)
+    if not os.path.isfile(path):
+        # Listed in the manifest but gone from storage, e.g. cleaned up or never published.
+        return error("NOT_FOUND", "Export file not found", status=404)
+    # conditional=True answers Range requests with 206 partial content.
+    return send_file(
+        path,
+        mimetype="application/json" if name == MANIFEST else "application/gzip",
+        as_attachment=True,
+        download_name=name,
+        conditional=True,
+        max_age=0,
+    )
+
+
 @admin_bp.get("/promotions")
 @require_role(UserRoleType.ADMIN, UserRoleType.STAFF)
 def list_promotions():
@@ -105,6 +283,7 @@ def list_promotions():
 
 
 @admin_bp.post("/promotions")
+@audited("promotion.create", "promotion", "promotion_id")
 @require_role(UserRoleType.ADMIN, UserRoleType.STAFF)
 def create_promotion():
     payload, err = get_json(request)
@@ -136,10 +315,12 @@ def create_promotion():
     )
     db.session.add(promo)
     db.session.commit()
+    invalidate_promotions()
     return ok({"promotion_id": str(promo.id)}, status=201)
 
 
 @admin_bp.patch("/promotions/<uuid:promotion_id>")
+@audited("promotion.update", "promotion", "promotion_id")
 @require_role(UserRoleType.ADMIN, UserRoleType.STAFF)
 def update_promotion(promotion_id):
     payload, err = get_json(request)
@@ -162,10 +343,12 @@ def update_promotion(promotion_id):
         except ValueError:
             return error("VALIDATION_ERROR", "Invalid scope", {"scope": "invalid"})
     db.session.commit()
+    invalidate_promotions()
     return ok({"promotion_id": str(promo.id)})
 
 
 @admin_bp.delete("/promotions/<uuid:promotion_id>")
+@audited("promotion.delete", "promotion", "promotion_id")
 @require_role(UserRoleType.ADMIN, UserRoleType.STAFF)
 def delete_promotion(promotion_id):
     promo = db.session.get(Promotion, promotion_id)
@@ -174,10 +357,12 @@ def delete_promotion(promotion_id):
     promo.is_active = False
     promo.deleted_at = db.func.now()
     db.session.commit()
+    invalidate_promotions()
     return ok({"deleted": True})
 
 
 @admin_bp.post("/memberships/tiers")
+@audited("membership_tier.create", "membership_tier", "tier_id")
 @require_role(UserRoleType.ADMIN, UserRoleType.STAFF)
 def create_membership_tier():
     payload, err = get_json(request)
@@ -195,10 +380,12 @@ def create_membership_tier():
     )
     db.session.add(tier)
     db.session.commit()
+    cache.delete_tag("membership_tiers")
     return ok({"tier_id": str(tier.id)}, status=201)
 
 
 @admin_bp.patch("/memberships/tiers/<uuid:tier_id>")
+@audited("membership_tier.update", "membership_tier", "tier_id")
 @require_role(UserRoleType.ADMIN, UserRoleType.STAFF)
 def update_membership_tier(tier_id):
     payload, err = get_json(request)
@@ -211,4 +398,5 @@ def update_membership_tier(tier_id):
         if field in payload:
             setattr(tier, field, payload[field])
     db.session.commit()
+    cache.delete_tag("membership_tiers")
     return ok({"tier_id": str(tier.id)})
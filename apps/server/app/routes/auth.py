@@ -7,7 +7,8 @@ from sqlalchemy.exc import IntegrityError
 from ..auth_helpers import get_current_user, login_user, logout_user, require_auth
 from ..extensions import db, limiter
 from ..model_helpers import normalize_lower
-from ..models import CustomerProfile, Order, RestaurantLike, User, UserRoleType
+from ..models import CustomerProfile, User, UserRoleType
+from ..services.counters import user_counts
 from .response import error, ok
 from .serializers import user_summary
 from .validators import get_json
@@ -91,8 +92,6 @@ def logout():
 @require_auth
 def me():
     user = get_current_user()
-    orders_count = db.session.query(Order).filter(Order.customer_id == user.id).count()
-    likes_count = db.session.query(RestaurantLike).filter(RestaurantLike.user_id == user.id).count()
     profile = user.customer_profile
     profile_summary = {
         "id": str(profile.id) if profile else None,
@@ -103,6 +102,6 @@ def me():
         {
             "user": user_summary(user),
             "customer_profile": profile_summary,
-            "counts": {"orders": orders_count, "likes": likes_count},
+            "counts": user_counts(user.id),
         }
     )
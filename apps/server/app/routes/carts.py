@@ -1,3 +1,5 @@
+import uuid
+
 from flask import Blueprint, request
 
 from ..auth_helpers import get_current_user
@@ -10,11 +12,17 @@ from ..models import (
     MenuItemOption,
     MenuItemOptionGroup,
     OrderType,
-    Promotion,
     Restaurant,
     RestaurantStatus,
 )
-from ..services.cart_totals import apply_promo, compute_cart_totals
+from ..services.availability import is_item_available
+from ..services.cart_totals import cart_lines, compute_cart_totals, with_discount
+from ..services.promotions import (
+    eligible_promotions,
+    evaluate_promotion,
+    get_promotion,
+    get_promotion_by_code,
+)
 from .guest_cart import read_guest_cart_id, write_guest_cart_id
 from .response import error, ok
 from .serializers import cart_summary
@@ -24,6 +32,24 @@ from .validators import get_json, parse_enum, parse_int, parse_uuid
 carts_bp = Blueprint("carts", __name__, url_prefix="/cart")
 
 
+def _store_totals(cart, totals):
+    cart.subtotal_cents = totals["subtotal_cents"]
+    cart.tax_cents = totals["tax_cents"]
+    cart.fee_cents = totals["fee_cents"]
+    cart.discount_cents = totals["discount_cents"]
+    cart.total_cents = totals["total_cents"]
+
+
+def _reprice_cart(cart):
+    """Re-evaluate the applied promotion against the cart's current lines."""
+    lines = cart_lines(cart)
+    totals = compute_cart_totals(cart, lines)
+    promo = get_promotion(cart.promo_id) if cart.promo_id else None
+    totals = with_discount(totals, evaluate_promotion(promo, lines, totals) if promo else 0)
+    _store_totals(cart, totals)
+    return totals
+
+
 def _get_cart_for_user_or_guest(restaurant_id):
     user = get_current_user()
     if user:
@@ -149,6 +175,10 @@ def add_item():
     menu_item = db.session.get(MenuItem, menu_item_id)
     if not menu_item or not menu_item.is_active or menu_item.restaurant_id != cart.restaurant_id:
         return error("VALIDATION_ERROR", "Menu item unavailable", {"menu_item_id": "invalid"})
+    if not is_item_available(menu_item):
+        return error(
+            "VALIDATION_ERROR", "Menu item unavailable", {"menu_item_id": "unavailable"}
+        )
 
     is_delivery = cart.order_type == OrderType.DELIVERY
     base_price = (
@@ -189,8 +219,8 @@ def add_item():
         )
         db.session.add(cart_option)
 
+    totals = _reprice_cart(cart)
     db.session.commit()
-    totals = compute_cart_totals(cart)
     return ok({"cart": cart_summary(cart, totals)}, status=201)
 
 
@@ -240,8 +270,8 @@ def update_item(item_id):
             )
             db.session.add(cart_option)
 
+    totals = _reprice_cart(cart)
     db.session.commit()
-    totals = compute_cart_totals(cart)
     return ok({"cart": cart_summary(cart, totals)})
 
 
@@ -254,12 +284,42 @@ def delete_item(item_id):
     auth_err = _authorize_cart(cart)
     if auth_err:
         return auth_err
-    db.session.delete(item)
+    cart.items.remove(item)
+    totals = _reprice_cart(cart)
     db.session.commit()
-    totals = compute_cart_totals(cart)
     return ok({"cart": cart_summary(cart, totals)})
 
 
+@carts_bp.get("/<uuid:cart_id>/eligible-promotions")
+def list_eligible_promotions(cart_id):
+    cart = db.session.get(Cart, cart_id)
+    if not cart:
+        return error("NOT_FOUND", "Cart not found", status=404)
+    auth_err = _authorize_cart(cart)
+    if auth_err:
+        return auth_err
+
+    user = get_current_user()
+    lines = cart_lines(cart)
+    totals = compute_cart_totals(cart, lines)
+    ranked = eligible_promotions(lines, totals, user.id if user else None)
+    return ok(
+        {
+            "promotions": [
+                {
+                    "id": promo["id"],
+                    "code": promo["code"],
+                    "name": promo["name"],
+                    "type": promo["type"],
+                    "scope": promo["scope"],
+                    "discount_cents": discount_cents,
+                }
+                for promo, discount_cents in ranked
+            ]
+        }
+    )
+
+
 @carts_bp.post("/apply-promo")
 def apply_promo_code():
     payload, err = get_json(request)
@@ -277,24 +337,18 @@ def apply_promo_code():
     if auth_err:
         return auth_err
 
-    promo = (
-        db.session.query(Promotion)
-        .filter(Promotion.code_normalized == (code or "").strip().lower())
-        .first()
-    )
+    promo = get_promotion_by_code(code)
     if not promo:
         return error("NOT_FOUND", "Promotion not found", status=404)
 
-    discount_cents = apply_promo(cart, promo)
+    lines = cart_lines(cart)
+    totals = compute_cart_totals(cart, lines)
+    discount_cents = evaluate_promotion(promo, lines, totals)
     if discount_cents <= 0:
         return error("VALIDATION_ERROR", "Promotion not applicable", {"code": "invalid"})
-    cart.promo_id = promo.id
-    cart.discount_cents = discount_cents
-    totals = compute_cart_totals(cart)
-    cart.subtotal_cents = totals["subtotal_cents"]
-    cart.tax_cents = totals["tax_cents"]
-    cart.fee_cents = totals["fee_cents"]
-    cart.total_cents = totals["total_cents"]
+    cart.promo_id = uuid.UUID(promo["id"])
+    totals = with_discount(totals, discount_cents)
+    _store_totals(cart, totals)
     db.session.commit()
     return ok({"cart": cart_summary(cart, totals), "discount_cents": discount_cents})
 
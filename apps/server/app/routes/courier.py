@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+
+from flask import Blueprint, request
+
+from ..auth_helpers import get_current_user, require_role
+from ..extensions import db
+from ..models import CourierAssignment, UserRoleType
+from ..services.courier_locations import ingest_fixes
+from ..services.routing import LIVE_ASSIGNMENT_STATUSES
+from .response import error, ok
+from .validators import get_json, parse_uuid
+
+courier_bp = Blueprint("courier", __name__, url_prefix="/courier")
+
+MAX_FIXES_PER_REQUEST = 500
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+def _invalid(field: str, message: str):
+    return None, error("VALIDATION_ERROR", f"{field} {message}", {field: "invalid"})
+
+
+def _parse_fix(fix, index: int, now: datetime):
+    field = f"fixes[{index}]"
+    if not isinstance(fix, dict):
+        return _invalid(field, "must be an object")
+    try:
+        latitude = Decimal(str(fix.get("latitude")))
+        longitude = Decimal(str(fix.get("longitude")))
+    except InvalidOperation:
+        return _invalid(field, "needs numeric coordinates")
+    if not (latitude.is_finite() and longitude.is_finite()):
+        return _invalid(field, "needs numeric coordinates")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return _invalid(field, "coordinates out of range")
+    recorded_at = now
+    if fix.get("recorded_at"):
+        try:
+            recorded_at = datetime.fromisoformat(str(fix["recorded_at"]))
+        except ValueError:
+            return _invalid(field, "recorded_at must be an ISO-8601 datetime")
+        if recorded_at.tzinfo is None:
+            recorded_at = recorded_at.replace(tzinfo=timezone.utc)
+        if recorded_at > now + MAX_CLOCK_SKEW:
+            return _invalid(field, "recorded_at is in the future")
+    delivery_task_id = None
+    if fix.get("delivery_task_id") is not None:
+        delivery_task_id, err = parse_uuid(fix["delivery_task_id"], f"{field}.delivery_task_id")
+        if err:
+            return None, err
+    return {
+        "delivery_task_id": delivery_task_id,
+        "latitude": latitude.quantize(Decimal("0.000001")),
+        "longitude": longitude.quantize(Decimal("0.000001")),
+        "recorded_at": recorded_at,
+    }, None
+
+
+@courier_bp.post("/locations")
+@require_role(UserRoleType.COURIER)
+def post_locations():
+    payload, err = get_json(request)
+    if err:
+        return err
+    fixes = payload.get("fixes")
+    if not isinstance(fixes, list) or not fixes:
+        return error("VALIDATION_ERROR", "fixes must be a non-empty list", {"fixes": "required"})
+    if len(fixes) > MAX_FIXES_PER_REQUEST:
+        return error(
+            "VALIDATION_ERROR",
+            f"At most {MAX_FIXES_PER_REQUEST} fixes per request",
+            {"fixes": f"max_{MAX_FIXES_PER_REQUEST}"},
+        )
+    now = datetime.now(tz=timezone.utc)
+    rows = []
+    for index, fix in enumerate(fixes):
+        row, err = _parse_fix(fix, index, now)
+        if err:
+            return err
+        rows.append(row)
+    user = get_current_user()
+    task_ids = {row["delivery_task_id"] for row in rows if row["delivery_task_id"]}
+    if task_ids:
+        # Fixes are inserted in shared batches, so an unknown task must be refused here.
+        assigned = {
+            task_id
+            for (task_id,) in db.session.query(CourierAssignment.delivery_task_id).filter(
+                CourierAssignment.courier_id == user.id,
+                CourierAssignment.status.in_(LIVE_ASSIGNMENT_STATUSES),
+                CourierAssignment.delivery_task_id.in_(task_ids),
+            )
+        }
+        for index, row in enumerate(rows):
+            if row["delivery_task_id"] and row["delivery_task_id"] not in assigned:
+                field = f"fixes[{index}].delivery_task_id"
+                return error(
+                    "VALIDATION_ERROR",
+                    f"{field} is not a delivery task assigned to you",
+                    {field: "not_assigned"},
+                    status=422,
+                )
+    ingest_fixes(user.id, rows)
+    return ok({"accepted": len(rows)}, status=202)
@@ -26,4 +26,10 @@ def my_likes():
         .offset(offset)
         .all()
     )
-    return ok({"restaurants": [restaurant_summary(r) for r in restaurants], "limit": limit, "offset": offset})
+    return ok(
+        {
+            "restaurants": [restaurant_summary(r, liked=True) for r in restaurants],
+            "limit": limit,
+            "offset": offset,
+        }
+    )
@@ -1,8 +1,9 @@
 from flask import Blueprint, request
 
 from ..auth_helpers import get_current_user, require_auth
-from ..extensions import db
+from ..extensions import cache, db
 from ..models import CustomerMembership, MembershipSource, MembershipStatus, MembershipTier
+from ..services.notifications import notify_membership
 from .response import error, ok
 from .validators import get_json, parse_uuid
 
@@ -12,22 +13,21 @@ memberships_bp = Blueprint("memberships", __name__, url_prefix="/memberships")
 
 @memberships_bp.get("/tiers")
 def list_tiers():
-    tiers = db.session.query(MembershipTier).order_by(MembershipTier.created_at.asc()).all()
-    return ok(
-        {
-            "tiers": [
-                {
-                    "id": str(tier.id),
-                    "name": tier.name,
-                    "description": tier.description,
-                    "discount_percent": tier.discount_percent,
-                    "fee_rules": tier.fee_rules,
-                    "is_active": tier.is_active,
-                }
-                for tier in tiers
-            ]
-        }
-    )
+    def load():
+        tiers = db.session.query(MembershipTier).order_by(MembershipTier.created_at.asc()).all()
+        return [
+            {
+                "id": str(tier.id),
+                "name": tier.name,
+                "description": tier.description,
+                "discount_percent": tier.discount_percent,
+                "fee_rules": tier.fee_rules,
+                "is_active": tier.is_active,
+            }
+            for tier in tiers
+        ]
+
+    return ok({"tiers": cache.get_or_set("membership_tiers", load, tags=["membership_tiers"])})
 
 
 @memberships_bp.post("/subscribe")
@@ -59,6 +59,8 @@ def subscribe():
         source=MembershipSource.PAID,
     )
     db.session.add(membership)
+    db.session.flush()
+    notify_membership(membership, "started")
     db.session.commit()
     return ok({"membership_id": str(membership.id)}, status=201)
 
@@ -75,6 +77,7 @@ def cancel():
     if not membership:
         return error("NOT_FOUND", "Active membership not found", status=404)
     membership.status = MembershipStatus.CANCELLED
+    notify_membership(membership, "cancelled")
     db.session.commit()
     return ok({"membership_id": str(membership.id), "status": membership.status.value})
 
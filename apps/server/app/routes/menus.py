@@ -1,7 +1,8 @@
 from flask import Blueprint
 
-from ..extensions import db
+from ..extensions import cache, db
 from ..models import Menu
+from ..services.availability import filter_menu
 from .response import error, ok
 from .serializers import menu_summary
 
@@ -11,7 +12,11 @@ menus_bp = Blueprint("menus", __name__, url_prefix="/menus")
 
 @menus_bp.get("/<uuid:menu_id>")
 def get_menu(menu_id):
-    menu = db.session.get(Menu, menu_id)
-    if not menu:
+    def load():
+        menu = db.session.get(Menu, menu_id)
+        return menu_summary(menu) if menu else None
+
+    data = cache.get_or_set(f"menu:{menu_id}", load, tags=[f"menu:{menu_id}"])
+    if not data:
         return error("NOT_FOUND", "Menu not found", status=404)
-    return ok({"menu": menu_summary(menu)})
+    return ok({"menu": filter_menu(data)})
@@ -1,12 +1,15 @@
 from datetime import datetime, timezone
+import json
 import secrets
+import time
 
-from flask import Blueprint, current_app, request, session
+from flask import Blueprint, Response, current_app, request, session
 
-from ..auth_helpers import get_current_user, has_restaurant_access, require_auth
+from ..auth_helpers import audited, get_current_user, has_restaurant_access, require_auth
 from ..extensions import db
 from ..models import (
     Cart,
+    CourierAssignment,
     Order,
     OrderItem,
     OrderItemOption,
@@ -16,7 +19,6 @@ from ..models import (
     OrderType,
     PickupSchedule,
     RestaurantStaffRole,
-    Promotion,
     PromotionRedemption,
     PromotionRedemptionStatus,
     PaymentIntentRecord,
@@ -24,8 +26,21 @@ from ..models import (
     OrderReceipt,
     ChargeStatus,
 )
-from ..services.cart_totals import apply_promo, compute_cart_totals
+from ..services.admission import check_admission, preparing_changed, record_order
+from ..services.availability import unavailable_cart_items
+from ..services.cart_totals import cart_lines, compute_cart_totals, with_discount
+from ..services.counters import bump_user
+from ..services.courier_locations import latest_location
+from ..services.notifications import notify_order_status, notify_receipt
+from ..services.pickup_slots import assign_pickup_slot, release_pickup_slot
+from ..services.popularity import record_order_placed
+from ..services.prep_times import estimated_ready_at, record_prep_time
+from ..services.promotions import evaluate_promotion, get_promotion
+from ..services.redemptions import release_redemption, reserve_redemption
+from ..services.routing import ACTIVE_TASK_STATUSES, LIVE_ASSIGNMENT_STATUSES
+from ..services.sales_rollups import record_order_event
 from ..services.stripe_client import create_payment_intent
+from ..services.tracking import get_hub
 from .guest_cart import read_guest_cart_id
 from .response import error, ok
 from .serializers import order_summary
@@ -34,6 +49,8 @@ from .validators import get_json, parse_enum, parse_pagination, parse_uuid
 
 orders_bp = Blueprint("orders", __name__, url_prefix="")
 
+TRACKING_HEARTBEAT_SECONDS = 15
+
 
 def _load_cart_for_user(cart_id, user):
     cart = db.session.get(Cart, cart_id)
@@ -52,6 +69,21 @@ def _load_cart_for_user(cart_id, user):
     return cart, None
 
 
+def _busy(decision):
+    response, status = error(
+        "RESTAURANT_BUSY",
+        "Restaurant is temporarily busy",
+        {
+            "reason": decision["reason"],
+            "retry_after_seconds": decision["retry_after_seconds"],
+            "estimated_wait_minutes": decision["estimated_wait_minutes"],
+        },
+        status=503,
+    )
+    response.headers["Retry-After"] = str(decision["retry_after_seconds"])
+    return response, status
+
+
 @orders_bp.post("/checkout/validate")
 @require_auth
 def checkout_validate():
@@ -66,8 +98,16 @@ def checkout_validate():
         return err
     if not cart.items:
         return error("VALIDATION_ERROR", "Cart is empty", {"cart_id": "empty"})
+    unavailable = unavailable_cart_items(cart)
+    if unavailable:
+        return error(
+            "VALIDATION_ERROR", "Some items are unavailable", {"menu_item_ids": unavailable}
+        )
+    admission = check_admission(cart.restaurant_id)
+    if not admission["admitted"]:
+        return _busy(admission)
     totals = compute_cart_totals(cart)
-    return ok({"totals": totals})
+    return ok({"totals": totals, "estimated_wait_minutes": admission["estimated_wait_minutes"]})
 
 
 @orders_bp.post("/checkout/create-intent")
@@ -85,6 +125,9 @@ def checkout_create_intent():
         return err
     if not cart.items:
         return error("VALIDATION_ERROR", "Cart is empty", {"cart_id": "empty"})
+    admission = check_admission(cart.restaurant_id)
+    if not admission["admitted"]:
+        return _busy(admission)
 
     totals = compute_cart_totals(cart)
     order = Order(
@@ -102,6 +145,7 @@ def checkout_create_intent():
     )
     db.session.add(order)
     db.session.flush()
+    bump_user(user.id, orders=1)
 
     for cart_item in cart.items:
         order_item = OrderItem(
@@ -158,6 +202,7 @@ def checkout_create_intent():
     )
     db.session.add(intent)
     db.session.commit()
+    record_order(order.restaurant_id)
     session["pending_order_id"] = str(order.id)
     return ok({"client_secret": intent.client_secret, "order_id": str(order.id)})
 
@@ -177,11 +222,37 @@ def checkout_confirm():
         return err
     if not cart.items:
         return error("VALIDATION_ERROR", "Cart is empty", {"cart_id": "empty"})
+    unavailable = unavailable_cart_items(cart)
+    if unavailable:
+        return error(
+            "VALIDATION_ERROR", "Some items are unavailable", {"menu_item_ids": unavailable}
+        )
+
+    pending_order_id = session.get("pending_order_id")
+    if not (pending_order_id and db.session.get(Order, pending_order_id)):
+        # No order from create-intent: this confirm places a new one, so it is admitted here.
+        admission = check_admission(cart.restaurant_id)
+        if not admission["admitted"]:
+            return _busy(admission)
+
+    lines = cart_lines(cart)
+    totals = compute_cart_totals(cart, lines)
+    promo = get_promotion(cart.promo_id) if cart.promo_id else None
+    # The order and its redemption record must carry the same, freshly evaluated discount.
+    totals = with_discount(totals, evaluate_promotion(promo, lines, totals) if promo else 0)
+    counter_shard = None
+    if promo:
+        counter_shard, limit = reserve_redemption(promo, user.id)
+        if limit:
+            db.session.rollback()
+            return error(
+                "CONFLICT", "Promotion redemption limit reached", {"code": limit}, status=409
+            )
 
-    totals = compute_cart_totals(cart)
     order_id = session.pop("pending_order_id", None)
     order = db.session.get(Order, order_id) if order_id else None
-    if not order:
+    is_new_order = order is None
+    if is_new_order:
         order = Order(
             customer_id=user.id,
             restaurant_id=cart.restaurant_id,
@@ -197,6 +268,7 @@ def checkout_confirm():
         )
         db.session.add(order)
         db.session.flush()
+        bump_user(user.id, orders=1)
     else:
         order.status = OrderStatus.CONFIRMED
         order.subtotal_cents = totals["subtotal_cents"]
@@ -206,6 +278,7 @@ def checkout_confirm():
         order.total_cents = totals["total_cents"]
 
     order.placed_at = datetime.now(tz=timezone.utc)
+    order.estimated_ready_at = estimated_ready_at(order, order.placed_at)
 
     order.items.clear()
     for cart_item in cart.items:
@@ -272,8 +345,32 @@ def checkout_confirm():
             end_dt = datetime.fromisoformat(end) if end else now
         except ValueError:
             return error("VALIDATION_ERROR", "pickup_window must be ISO-8601 datetimes", {"pickup_window": "invalid"})
+        if start_dt.tzinfo is None:
+            start_dt = start_dt.replace(tzinfo=timezone.utc)
+        if end_dt.tzinfo is None:
+            end_dt = end_dt.replace(tzinfo=timezone.utc)
         if end_dt < start_dt:
             return error("VALIDATION_ERROR", "pickup_window end must be after start", {"pickup_window": "invalid"})
+        if order.pickup_schedule:
+            release_pickup_slot(order.restaurant_id, order.pickup_schedule.requested_start)
+        slot, reason, next_available = assign_pickup_slot(
+            order.restaurant_id,
+            start_dt,
+            now,
+            allow_reassign=pickup_window.get("allow_reassign", True) is not False,
+        )
+        if not slot:
+            db.session.rollback()
+            return error(
+                "CONFLICT",
+                "Pickup slot unavailable",
+                {
+                    "pickup_window": reason,
+                    "next_available": next_available.isoformat() if next_available else None,
+                },
+                status=409,
+            )
+        start_dt, end_dt = slot
         if order.pickup_schedule:
             order.pickup_schedule.requested_start = start_dt
             order.pickup_schedule.requested_end = end_dt
@@ -286,20 +383,19 @@ def checkout_confirm():
             )
             db.session.add(schedule)
 
-    if cart.promo_id:
-        promo = db.session.get(Promotion, cart.promo_id)
-        if promo:
-            discount = apply_promo(cart, promo)
-            db.session.add(
-                PromotionRedemption(
-                    promotion_id=promo.id,
-                    customer_id=user.id,
-                    order_id=order.id,
-                    discount_cents=discount,
-                    status=PromotionRedemptionStatus.APPLIED,
-                    redeemed_at=datetime.now(tz=timezone.utc),
-                )
+    if promo:
+        db.session.add(
+            PromotionRedemption(
+                promotion_id=promo["id"],
+                customer_id=user.id,
+                order_id=order.id,
+                discount_cents=totals["discount_cents"],
+                status=PromotionRedemptionStatus.APPLIED,
+                redeemed_at=datetime.now(tz=timezone.utc),
+                coupon_id=promo["coupon_id"],
+                counter_shard=counter_shard,
             )
+        )
 
     intent = (
         db.session.query(PaymentIntentRecord)
@@ -318,6 +414,7 @@ def checkout_confirm():
             provider="mock",
         )
         db.session.add(receipt)
+        notify_receipt(receipt)
 
     cart.items.clear()
     cart.promo_id = None
@@ -327,7 +424,12 @@ def checkout_confirm():
     cart.fee_cents = 0
     cart.total_cents = 0
 
+    record_order_event(order, OrderStatus.CONFIRMED)
+    record_order_placed(order)
+    notify_order_status(order)
     db.session.commit()
+    if is_new_order:
+        record_order(order.restaurant_id)
     return ok({"order": order_summary(order)})
 
 
@@ -363,6 +465,65 @@ def get_order(order_id):
     return ok({"order": order_summary(order)})
 
 
+@orders_bp.get("/orders/<uuid:order_id>/tracking/stream")
+@require_auth
+def stream_order_tracking(order_id):
+    user = get_current_user()
+    order = db.session.get(Order, order_id)
+    if not order:
+        return error("NOT_FOUND", "Order not found", status=404)
+    if order.customer_id != user.id and not has_restaurant_access(
+        user, order.restaurant_id, RestaurantStaffRole.VIEWER
+    ):
+        return error("FORBIDDEN", "Order access denied", status=403)
+    task = order.delivery_task
+    if not task:
+        return error("NOT_FOUND", "Order has no delivery", status=404)
+    if task.status not in ACTIVE_TASK_STATUSES:
+        return error(
+            "CONFLICT", "Delivery is not in progress", {"status": task.status.value}, status=409
+        )
+    assignment = (
+        db.session.query(CourierAssignment)
+        .filter(
+            CourierAssignment.delivery_task_id == task.id,
+            CourierAssignment.status.in_(LIVE_ASSIGNMENT_STATUSES),
+        )
+        .order_by(CourierAssignment.created_at.desc())
+        .first()
+    )
+    if not assignment:
+        return error("CONFLICT", "No courier assigned yet", {"courier": "unassigned"}, status=409)
+
+    task_id = task.id
+    courier_id = assignment.courier_id
+    initial = latest_location(courier_id)
+    hub = get_hub()
+    max_seconds = current_app.config["TRACKING_STREAM_MAX_SECONDS"]
+
+    # The generator runs after the request context is gone, so it only touches the hub.
+    def events():
+        subscription = hub.subscribe(task_id, courier_id, initial)
+        deadline = time.monotonic() + max_seconds
+        try:
+            yield "retry: 3000\n\n"
+            while time.monotonic() < deadline:
+                position = subscription.wait(TRACKING_HEARTBEAT_SECONDS)
+                if position is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                payload = dict(position, delivery_task_id=str(task_id))
+                yield f"event: position\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            subscription.close()
+
+    return Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @orders_bp.post("/orders/<uuid:order_id>/cancel")
 @require_auth
 def cancel_order(order_id):
@@ -385,11 +546,24 @@ def cancel_order(order_id):
             note="Customer cancelled",
         )
     )
+    redemptions = (
+        db.session.query(PromotionRedemption)
+        .filter_by(order_id=order.id, status=PromotionRedemptionStatus.APPLIED)
+        .all()
+    )
+    for redemption in redemptions:
+        release_redemption(redemption)
+        redemption.status = PromotionRedemptionStatus.VOIDED
+    if order.pickup_schedule:
+        release_pickup_slot(order.restaurant_id, order.pickup_schedule.requested_start)
+    record_order_event(order, OrderStatus.CANCELLED)
+    notify_order_status(order)
     db.session.commit()
     return ok({"order": order_summary(order)})
 
 
 @orders_bp.post("/restaurant-admin/orders/<uuid:order_id>/status")
+@audited("order.status", "order", "order_id")
 @require_auth
 def update_order_status(order_id):
     payload, err = get_json(request)
@@ -422,6 +596,13 @@ def update_order_status(order_id):
             note="Restaurant update",
         )
     )
+    previous_status = order.status
     order.status = to_status
+    if to_status == OrderStatus.READY and order.placed_at:
+        record_prep_time(order.restaurant_id, order.placed_at, datetime.now(tz=timezone.utc))
+    record_order_event(order, to_status)
+    notify_order_status(order)
     db.session.commit()
+    if OrderStatus.PREPARING in (previous_status, to_status):
+        preparing_changed(order.restaurant_id)
     return ok({"order": order_summary(order)})
@@ -2,8 +2,9 @@ from flask import Blueprint, request
 
 from ..extensions import db
 from ..model_helpers import normalize_lower
-from ..models import Cart, Promotion
-from ..services.cart_totals import apply_promo
+from ..models import Cart
+from ..services.cart_totals import cart_lines, compute_cart_totals
+from ..services.promotions import evaluate_promotion, get_promotion_by_code
 from .response import error, ok
 from .validators import get_json, parse_uuid
 
@@ -19,7 +20,7 @@ def validate_promo():
     code = normalize_lower(payload.get("code"))
     if not code:
         return error("VALIDATION_ERROR", "code is required", {"code": "required"})
-    promo = db.session.query(Promotion).filter_by(code_normalized=code).first()
+    promo = get_promotion_by_code(code)
     if not promo:
         return error("NOT_FOUND", "Promotion not found", status=404)
     cart_id = payload.get("cart_id")
@@ -31,6 +32,7 @@ def validate_promo():
         cart = db.session.get(Cart, cart_uuid)
         if not cart:
             return error("NOT_FOUND", "Cart not found", status=404)
-        discount = apply_promo(cart, promo)
-    valid = discount > 0 or promo.is_active
+        lines = cart_lines(cart)
+        discount = evaluate_promotion(promo, lines, compute_cart_totals(cart, lines))
+    valid = discount > 0 or promo["is_active"]
     return ok({"valid": valid, "discount_cents": discount})
@@ -0,0 +1,103 @@
+from flask import Blueprint, request
+
+from ..auth_helpers import get_current_user, require_auth
+from ..extensions import db
+from ..models import Order, Rating, RatingTarget, UserRoleType
+from ..services.ratings import (
+    MAX_STARS,
+    RATEABLE_STATUSES,
+    add_rating,
+    get_aggregate,
+    rateable_targets,
+    remove_rating,
+)
+from .response import error, ok
+from .serializers import rating_aggregate_summary, rating_summary
+from .validators import get_json, parse_enum, parse_int, parse_pagination, parse_uuid
+
+ratings_bp = Blueprint("ratings", __name__, url_prefix="/ratings")
+
+
+@ratings_bp.post("")
+@require_auth
+def create_rating():
+    payload, err = get_json(request)
+    if err:
+        return err
+    target_type, err = parse_enum(payload.get("target_type"), RatingTarget, "target_type")
+    if err:
+        return err
+    target_id, err = parse_uuid(payload.get("target_id"), "target_id")
+    if err:
+        return err
+    order_id, err = parse_uuid(payload.get("order_id"), "order_id")
+    if err:
+        return err
+    stars, err = parse_int(payload.get("stars"), "stars", minimum=1)
+    if err:
+        return err
+    if stars > MAX_STARS:
+        return error(
+            "VALIDATION_ERROR", f"stars must be <= {MAX_STARS}", {"stars": f"max_{MAX_STARS}"}
+        )
+    tags = payload.get("tags") or []
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        return error("VALIDATION_ERROR", "tags must be a list of strings", {"tags": "invalid"})
+
+    user = get_current_user()
+    order = db.session.get(Order, order_id)
+    if not order or order.customer_id != user.id:
+        return error("NOT_FOUND", "Order not found", status=404)
+    if order.status not in RATEABLE_STATUSES:
+        return error("VALIDATION_ERROR", "Order is not completed", {"order_id": "not_completed"})
+    if (target_type, target_id) not in rateable_targets(order):
+        return error(
+            "VALIDATION_ERROR", "Target is not part of this order", {"target_id": "invalid"}
+        )
+
+    rating_id = add_rating(
+        user.id, order.id, target_type, target_id, stars, payload.get("comment"), tags
+    )
+    if rating_id is None:
+        return error("CONFLICT", "Target already rated for this order", status=409)
+    return ok({"rating": rating_summary(db.session.get(Rating, rating_id))}, status=201)
+
+
+@ratings_bp.delete("/<uuid:rating_id>")
+@require_auth
+def delete_rating(rating_id):
+    user = get_current_user()
+    rating = db.session.get(Rating, rating_id)
+    if not rating:
+        return error("NOT_FOUND", "Rating not found", status=404)
+    if rating.rater_id != user.id and user.role != UserRoleType.ADMIN:
+        return error("FORBIDDEN", "Not your rating", status=403)
+    if not remove_rating(rating.id):
+        return error("NOT_FOUND", "Rating not found", status=404)
+    return ok({"deleted": True})
+
+
+@ratings_bp.get("/<any(restaurant, menu_item, courier):target_type>/<uuid:target_id>")
+def list_ratings(target_type, target_id):
+    target_type = RatingTarget(target_type)
+    limit, offset, err = parse_pagination(request.args)
+    if err:
+        return err
+    ratings = (
+        db.session.query(Rating)
+        .filter(Rating.target_type == target_type, Rating.target_id == target_id)
+        .order_by(Rating.created_at.desc())
+        .limit(limit)
+        .offset(offset)
+        .all()
+    )
+    return ok(
+        {
+            "target_type": target_type.value,
+            "target_id": str(target_id),
+            "rating": rating_aggregate_summary(get_aggregate(target_type, target_id)),
+            "ratings": [rating_summary(rating) for rating in ratings],
+            "limit": limit,
+            "offset": offset,
+        }
+    )
@@ -1,7 +1,9 @@
+from datetime import date, timedelta
+
 from flask import Blueprint, request
 
-from ..auth_helpers import get_current_user, require_auth, require_restaurant_access
-from ..extensions import db
+from ..auth_helpers import audited, get_current_user, require_auth, require_restaurant_access
+from ..extensions import cache, db
 from ..model_helpers import normalize_lower
 from ..models import (
     Menu,
@@ -14,9 +16,13 @@ from ..models import (
     RestaurantConfiguration,
     RestaurantStaffRole,
     RestaurantStaffUser,
+    RatingTarget,
     RestaurantStatus,
     User,
 )
+from ..services.popularity import ensure_popularity
+from ..services.ratings import ensure_aggregate
+from ..services.sales_rollups import DAY, GRANULARITIES, HOUR, local_today, sales_report
 from .response import error, ok
 from .serializers import menu_category_summary, menu_item_summary, menu_summary, restaurant_summary
 from .validators import get_json
@@ -24,6 +30,15 @@ from .validators import get_json
 
 restaurant_admin_bp = Blueprint("restaurant_admin", __name__, url_prefix="/restaurant-admin")
 
+ANALYTICS_MAX_DAYS = {HOUR: 31, DAY: 366}
+
+
+def _invalidate_menu(restaurant_id, menu_id=None):
+    tags = [f"restaurant:{restaurant_id}"]
+    if menu_id:
+        tags.append(f"menu:{menu_id}")
+    cache.delete_tag(*tags)
+
 
 @restaurant_admin_bp.get("/restaurants")
 @require_auth
@@ -41,6 +56,7 @@ def list_managed_restaurants():
 
 
 @restaurant_admin_bp.post("/restaurants")
+@audited("restaurant.create", "restaurant", "restaurant")
 @require_auth
 def create_restaurant():
     payload, err = get_json(request)
@@ -67,11 +83,14 @@ def create_restaurant():
     db.session.flush()
     db.session.add(RestaurantConfiguration(restaurant_id=restaurant.id))
     db.session.add(OrderTypeConfiguration(restaurant_id=restaurant.id))
+    ensure_aggregate(RatingTarget.RESTAURANT, restaurant.id)
+    ensure_popularity(restaurant.id)
     db.session.commit()
     return ok({"restaurant": restaurant_summary(restaurant)}, status=201)
 
 
 @restaurant_admin_bp.patch("/restaurants/<uuid:restaurant_id>")
+@audited("restaurant.update", "restaurant", "restaurant_id")
 @require_auth
 def update_restaurant(restaurant_id):
     access = require_restaurant_access("restaurant_id", RestaurantStaffRole.MANAGER)
@@ -88,12 +107,14 @@ def update_restaurant(restaurant_id):
             if field in payload:
                 setattr(restaurant, field, payload[field])
         db.session.commit()
+        _invalidate_menu(restaurant.id)
         return ok({"restaurant": restaurant_summary(restaurant)})
 
     return _update(restaurant_id=restaurant_id)
 
 
 @restaurant_admin_bp.post("/restaurants/<uuid:restaurant_id>/staff")
+@audited("restaurant_staff.create", "restaurant_staff", "staff_id")
 @require_auth
 def add_staff(restaurant_id):
     access = require_restaurant_access("restaurant_id", RestaurantStaffRole.OWNER)
@@ -122,7 +143,45 @@ def add_staff(restaurant_id):
     return _add(restaurant_id=restaurant_id)
 
 
+@restaurant_admin_bp.get("/restaurants/<uuid:restaurant_id>/analytics")
+@require_auth
+def restaurant_analytics(restaurant_id):
+    access = require_restaurant_access("restaurant_id", RestaurantStaffRole.VIEWER)
+
+    @access
+    def _analytics(restaurant_id):
+        granularity = request.args.get("granularity", DAY)
+        if granularity not in GRANULARITIES:
+            return error(
+                "VALIDATION_ERROR", "granularity must be hour or day", {"granularity": "invalid"}
+            )
+        days = {}
+        for field in ("from", "to"):
+            value = request.args.get(field)
+            if value is None:
+                continue
+            try:
+                days[field] = date.fromisoformat(value)
+            except ValueError:
+                return error("VALIDATION_ERROR", f"{field} must be YYYY-MM-DD", {field: "invalid"})
+        last = days.get("to") or local_today()
+        first = days.get("from") or last - timedelta(days=6)
+        if first > last:
+            return error("VALIDATION_ERROR", "from must not be after to", {"from": "invalid"})
+        max_days = ANALYTICS_MAX_DAYS[granularity]
+        if (last - first).days >= max_days:
+            return error(
+                "VALIDATION_ERROR",
+                f"At most {max_days} days per {granularity} report",
+                {"from": "range"},
+            )
+        return ok(sales_report(restaurant_id, first, last, granularity))
+
+    return _analytics(restaurant_id=restaurant_id)
+
+
 @restaurant_admin_bp.post("/restaurants/<uuid:restaurant_id>/menus")
+@audited("menu.create", "menu", "menu")
 @require_auth
 def create_menu(restaurant_id):
     access = require_restaurant_access("restaurant_id", RestaurantStaffRole.MENU_EDITOR)
@@ -138,12 +197,14 @@ def create_menu(restaurant_id):
         menu = Menu(restaurant_id=restaurant_id, name=name, is_active=payload.get("is_active", True))
         db.session.add(menu)
         db.session.commit()
+        _invalidate_menu(restaurant_id, menu.id)
         return ok({"menu": menu_summary(menu)}, status=201)
 
     return _create(restaurant_id=restaurant_id)
 
 
 @restaurant_admin_bp.post("/menus/<uuid:menu_id>/categories")
+@audited("menu_category.create", "menu_category", "category")
 @require_auth
 def create_category(menu_id):
     payload, err = get_json(request)
@@ -168,12 +229,14 @@ def create_category(menu_id):
         )
         db.session.add(category)
         db.session.commit()
+        _invalidate_menu(menu.restaurant_id, menu.id)
         return ok({"category": menu_category_summary(category)}, status=201)
 
     return _create(restaurant_id=menu.restaurant_id)
 
 
 @restaurant_admin_bp.post("/menus/<uuid:menu_id>/items")
+@audited("menu_item.create", "menu_item", "item")
 @require_auth
 def create_item(menu_id):
     payload, err = get_json(request)
@@ -207,12 +270,14 @@ def create_item(menu_id):
         )
         db.session.add(item)
         db.session.commit()
+        _invalidate_menu(menu.restaurant_id, menu.id)
         return ok({"item": menu_item_summary(item)}, status=201)
 
     return _create(restaurant_id=menu.restaurant_id)
 
 
 @restaurant_admin_bp.patch("/items/<uuid:item_id>")
+@audited("menu_item.update", "menu_item", "item_id")
 @require_auth
 def update_item(item_id):
     payload, err = get_json(request)
@@ -239,12 +304,14 @@ def update_item(item_id):
             if field in payload:
                 setattr(item, field, payload[field])
         db.session.commit()
+        _invalidate_menu(item.restaurant_id, item.menu_id)
         return ok({"item": menu_item_summary(item)})
 
     return _update(restaurant_id=item.restaurant_id)
 
 
 @restaurant_admin_bp.post("/items/<uuid:item_id>/option-groups")
+@audited("option_group.create", "option_group", "option_group_id")
 @require_auth
 def create_option_group(item_id):
     payload, err = get_json(request)
@@ -269,12 +336,14 @@ def create_option_group(item_id):
         )
         db.session.add(group)
         db.session.commit()
+        _invalidate_menu(item.restaurant_id, item.menu_id)
         return ok({"option_group_id": str(group.id)}, status=201)
 
     return _create(restaurant_id=item.restaurant_id)
 
 
 @restaurant_admin_bp.post("/option-groups/<uuid:group_id>/options")
+@audited("option.create", "option", "option_id")
 @require_auth
 def create_option(group_id):
     payload, err = get_json(request)
@@ -297,6 +366,7 @@ def create_option(group_id):
         )
         db.session.add(option)
         db.session.commit()
+        _invalidate_menu(menu_item.restaurant_id, menu_item.menu_id)
         return ok({"option_id": str(option.id)}, status=201)
 
     menu_item = db.session.get(MenuItem, group.menu_item_id)
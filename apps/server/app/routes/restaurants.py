@@ -1,9 +1,23 @@
+from datetime import date, datetime, timezone
+
 from flask import Blueprint, request
 from sqlalchemy import or_
+from sqlalchemy.orm import contains_eager
 
 from ..auth_helpers import get_current_user, require_auth
-from ..extensions import db, limiter
-from ..models import Menu, Restaurant, RestaurantLike, RestaurantStatus
+from ..extensions import cache, db, limiter
+from ..models import (
+    Menu,
+    RatingAggregate,
+    Restaurant,
+    RestaurantPopularity,
+    RestaurantStatus,
+)
+from ..services.availability import filter_menu
+from ..services.likes import like, liked_restaurant_ids, unlike
+from ..services.pickup_slots import list_pickup_slots, local_date, slot_settings
+from ..services.popularity import SCORES
+from ..services.prep_times import estimate_prep_minutes
 from .response import error, ok
 from .serializers import address_summary, menu_summary, restaurant_summary
 from .validators import parse_pagination
@@ -33,25 +47,51 @@ def list_restaurants():
     sort = request.args.get("sort", "created_at")
     order = request.args.get("order", "desc")
     sort_map = {"created_at": Restaurant.created_at, "name": Restaurant.name}
-    if sort not in sort_map:
+    if sort == "rating":
+        # Every restaurant has an aggregate row, so the inner join walks
+        # ix_rating_aggregates_rank in order instead of sorting all restaurants.
+        query = query.join(Restaurant.rating_aggregate).options(
+            contains_eager(Restaurant.rating_aggregate)
+        )
+        columns = [RatingAggregate.average_stars, RatingAggregate.ratings_count]
+        key = RatingAggregate.target_id
+        if order == "desc":
+            query = query.order_by(*[column.desc() for column in columns], key)
+        else:
+            query = query.order_by(*columns, key.desc())
+    elif sort in SCORES:
+        # Likewise every restaurant has a popularity row; NULL (no recent activity) sorts last.
+        score = RestaurantPopularity.__table__.c[SCORES[sort]]
+        key = RestaurantPopularity.restaurant_id
+        query = query.join(RestaurantPopularity, key == Restaurant.id)
+        if order == "desc":
+            query = query.order_by(score.desc().nulls_last(), key)
+        else:
+            query = query.order_by(score.asc().nulls_first(), key.desc())
+    elif sort in sort_map:
+        sort_column = sort_map[sort]
+        if order == "desc":
+            sort_column = sort_column.desc()
+        query = query.order_by(sort_column)
+    else:
         return error("VALIDATION_ERROR", "Invalid sort", {"sort": "invalid"})
-    sort_column = sort_map[sort]
-    if order == "desc":
-        sort_column = sort_column.desc()
-    query = query.order_by(sort_column)
 
     limit, offset, err = parse_pagination(request.args)
     if err:
         return err
     results = query.limit(limit).offset(offset).all()
-    return ok({"restaurants": [restaurant_summary(r) for r in results], "limit": limit, "offset": offset})
+    user = get_current_user()
+    liked = liked_restaurant_ids(user.id, [r.id for r in results]) if user else None
+    restaurants = [
+        restaurant_summary(r, liked=None if liked is None else r.id in liked) for r in results
+    ]
+    return ok({"restaurants": restaurants, "limit": limit, "offset": offset})
 
 
-@restaurants_bp.get("/<uuid:restaurant_id>")
-def get_restaurant(restaurant_id):
+def _restaurant_detail(restaurant_id):
     restaurant = db.session.get(Restaurant, restaurant_id)
     if not restaurant:
-        return error("NOT_FOUND", "Restaurant not found", status=404)
+        return None
     data = restaurant_summary(restaurant)
     data["address"] = address_summary(restaurant.address)
     data["configuration"] = restaurant.configuration and {
@@ -67,20 +107,41 @@ def get_restaurant(restaurant_id):
         "prep_time_pickup_minutes": restaurant.order_type_configuration.prep_time_pickup_minutes,
         "pickup_hours": restaurant.order_type_configuration.pickup_hours,
     }
-    return ok(data)
+    return data
 
 
-@restaurants_bp.get("/<uuid:restaurant_id>/menu")
-def get_menu(restaurant_id):
+def _active_menu(restaurant_id):
     menu = (
         db.session.query(Menu)
         .filter(Menu.restaurant_id == restaurant_id, Menu.is_active.is_(True))
         .order_by(Menu.created_at.desc())
         .first()
     )
-    if not menu:
+    return menu_summary(menu) if menu else None
+
+
+@restaurants_bp.get("/<uuid:restaurant_id>")
+def get_restaurant(restaurant_id):
+    data = cache.get_or_set(
+        f"restaurant:{restaurant_id}:detail",
+        lambda: _restaurant_detail(restaurant_id),
+        tags=[f"restaurant:{restaurant_id}"],
+    )
+    if not data:
+        return error("NOT_FOUND", "Restaurant not found", status=404)
+    return ok(dict(data, prep_time_estimate=estimate_prep_minutes(restaurant_id)))
+
+
+@restaurants_bp.get("/<uuid:restaurant_id>/menu")
+def get_menu(restaurant_id):
+    data = cache.get_or_set(
+        f"restaurant:{restaurant_id}:menu",
+        lambda: _active_menu(restaurant_id),
+        tags=[f"restaurant:{restaurant_id}"],
+    )
+    if not data:
         return error("NOT_FOUND", "Active menu not found", status=404)
-    return ok(menu_summary(menu))
+    return ok(filter_menu(data))
 
 
 @restaurants_bp.post("/<uuid:restaurant_id>/like")
@@ -90,16 +151,8 @@ def like_restaurant(restaurant_id):
     restaurant = db.session.get(Restaurant, restaurant_id)
     if not restaurant:
         return error("NOT_FOUND", "Restaurant not found", status=404)
-    existing = (
-        db.session.query(RestaurantLike)
-        .filter_by(user_id=user.id, restaurant_id=restaurant.id)
-        .first()
-    )
-    if existing:
+    if not like(user.id, restaurant.id):
         return ok({"liked": True})
-    like = RestaurantLike(user_id=user.id, restaurant_id=restaurant.id)
-    db.session.add(like)
-    db.session.commit()
     return ok({"liked": True}, status=201)
 
 
@@ -107,12 +160,30 @@ def like_restaurant(restaurant_id):
 @require_auth
 def unlike_restaurant(restaurant_id):
     user = get_current_user()
-    like = (
-        db.session.query(RestaurantLike)
-        .filter_by(user_id=user.id, restaurant_id=restaurant_id)
-        .first()
-    )
-    if like:
-        db.session.delete(like)
-        db.session.commit()
+    unlike(user.id, restaurant_id)
     return ok({"liked": False})
+
+
+@restaurants_bp.get("/<uuid:restaurant_id>/pickup-slots")
+def get_pickup_slots(restaurant_id):
+    settings = slot_settings(restaurant_id)
+    if not settings:
+        return error("NOT_FOUND", "Restaurant not found", status=404)
+    now = datetime.now(tz=timezone.utc)
+    day = local_date(now)
+    if request.args.get("date"):
+        try:
+            day = date.fromisoformat(request.args["date"])
+        except ValueError:
+            return error("VALIDATION_ERROR", "date must be YYYY-MM-DD", {"date": "invalid"})
+    slots = []
+    if settings["supports_pickup"]:
+        slots = list_pickup_slots(restaurant_id, settings, day, now)
+    return ok(
+        {
+            "restaurant_id": str(restaurant_id),
+            "date": day.isoformat(),
+            "slot_minutes": settings["slot_minutes"],
+            "slots": slots,
+        }
+    )
@@ -17,14 +17,39 @@ def user_summary(user) -> dict[str, Any]:
     }
 
 
-def restaurant_summary(restaurant) -> dict[str, Any]:
-    return {
+def restaurant_summary(restaurant, liked: bool | None = None) -> dict[str, Any]:
+    data = {
         "id": str(restaurant.id),
         "name": restaurant.name,
         "status": restaurant.status.value if restaurant.status else None,
         "cuisines": restaurant.cuisines or [],
         "phone": restaurant.phone,
         "email": restaurant.email,
+        "rating": rating_aggregate_summary(restaurant.rating_aggregate),
+        "likes_count": restaurant.counters.likes_count if restaurant.counters else 0,
+    }
+    if liked is not None:
+        data["liked"] = liked
+    return data
+
+
+def rating_aggregate_summary(aggregate) -> dict[str, Any]:
+    if not aggregate or not aggregate.ratings_count:
+        return {"average": None, "count": 0}
+    return {"average": round(aggregate.average_stars, 2), "count": aggregate.ratings_count}
+
+
+def rating_summary(rating) -> dict[str, Any]:
+    return {
+        "id": str(rating.id),
+        "target_type": rating.target_type.value,
+        "target_id": str(rating.target_id),
+        "order_id": str(rating.order_id) if rating.order_id else None,
+        "rater_id": str(rating.rater_id),
+        "stars": rating.stars,
+        "comment": rating.comment,
+        "tags": rating.tags or [],
+        "created_at": _iso(rating.created_at),
     }
 
 
@@ -154,6 +179,7 @@ def order_summary(order) -> dict[str, Any]:
         "discount_cents": order.discount_cents,
         "total_cents": order.total_cents,
         "placed_at": _iso(order.placed_at),
+        "estimated_ready_at": _iso(order.estimated_ready_at),
         "items": [
             {
                 "id": str(item.id),
@@ -177,3 +203,21 @@ def order_summary(order) -> dict[str, Any]:
             for item in order.items
         ],
     }
+
+
+def export_job_summary(job) -> dict[str, Any]:
+    return {
+        "id": str(job.id),
+        "dataset": job.dataset,
+        "format": job.format,
+        "filters": job.filters or {},
+        "status": job.status,
+        "attempts": job.attempts,
+        "rows_exported": job.rows_exported,
+        "chunks_written": job.chunks_written,
+        "bytes_written": job.bytes_written,
+        "error": job.error,
+        "created_at": _iso(job.created_at),
+        "started_at": _iso(job.started_at),
+        "finished_at": _iso(job.finished_at),
+    }
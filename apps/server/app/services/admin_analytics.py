@@ -0,0 +1,225 @@
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import column, func, select, table, text
+from sqlalchemy.dialects.postgresql import insert
+
+from ..extensions import db
+from ..models import AnalyticsRefresh, MembershipSource, OrderStatus, UserRoleType
+
+# Enum columns read back from the views as their stored names.
+daily_orders = table(
+    "admin_daily_orders",
+    column("day"),
+    column("status"),
+    column("orders_count"),
+    column("total_cents"),
+    column("discount_cents"),
+)
+daily_signups = table("admin_daily_signups", column("day"), column("role"), column("users_count"))
+daily_promo_costs = table(
+    "admin_daily_promo_costs",
+    column("day"),
+    column("promotion_id"),
+    column("redemptions_count"),
+    column("discount_cents"),
+)
+daily_memberships = table(
+    "admin_daily_memberships",
+    column("day"),
+    column("tier_id"),
+    column("source"),
+    column("started_count"),
+    column("active_count"),
+)
+
+VIEWS = (daily_orders, daily_signups, daily_promo_costs, daily_memberships)
+GMV_STATUSES = (
+    OrderStatus.CONFIRMED,
+    OrderStatus.PREPARING,
+    OrderStatus.READY,
+    OrderStatus.COMPLETED,
+)
+_REFRESH_LOCK = 0x616E6C74  # "anlt"
+
+
+def populated_views() -> dict[str, bool]:
+    """Whether each analytics view holds data; they are created empty until the first refresh."""
+    return dict(
+        db.session.execute(
+            text(
+                "SELECT matviewname, ispopulated FROM pg_matviews "
+                "WHERE matviewname = ANY(:names)"
+            ),
+            {"names": [view.name for view in VIEWS]},
+        ).all()
+    )
+
+
+def unpopulated_views() -> list[str]:
+    populated = populated_views()
+    return [view.name for view in VIEWS if not populated.get(view.name)]
+
+
+def refresh_views() -> dict | None:
+    """Refresh every analytics view in one transaction; returns ``{view: duration_ms}``.
+
+    Populated views refresh CONCURRENTLY so admin reads never wait on them. Returns
+    ``None`` when another refresher holds the lock.
+    """
+    locked = db.session.execute(select(func.pg_try_advisory_xact_lock(_REFRESH_LOCK))).scalar()
+    if not locked:
+        db.session.rollback()
+        return None
+    populated = populated_views()
+    durations = {}
+    for view in VIEWS:
+        mode = "CONCURRENTLY " if populated.get(view.name) else ""
+        started = time.monotonic()
+        db.session.execute(text(f"REFRESH MATERIALIZED VIEW {mode}{view.name}"))
+        durations[view.name] = int((time.monotonic() - started) * 1000)
+    stmt = insert(AnalyticsRefresh.__table__).values(
+        [
+            {
+                "id": uuid.uuid4(),
+                "view_name": name,
+                "refreshed_at": func.now(),
+                "duration_ms": duration,
+            }
+            for name, duration in durations.items()
+        ]
+    )
+    db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["view_name"],
+            set_={
+                "refreshed_at": stmt.excluded.refreshed_at,
+                "duration_ms": stmt.excluded.duration_ms,
+                "updated_at": func.now(),
+            },
+        )
+    )
+    db.session.commit()
+    return durations
+
+
+def refresh_times() -> dict[str, datetime]:
+    return dict(
+        db.session.query(AnalyticsRefresh.view_name, AnalyticsRefresh.refreshed_at).all()
+    )
+
+
+def _in_range(view, first: date, last: date):
+    return view.c.day >= first, view.c.day <= last
+
+
+def _day_range(first: date, last: date) -> list[date]:
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+def overview(first: date, last: date) -> dict:
+    """Platform metrics for UTC days ``first`` to ``last``, read from the analytics views only."""
+    gmv_names = [status.name for status in GMV_STATUSES]
+    order_rows = db.session.execute(
+        select(
+            daily_orders.c.day,
+            daily_orders.c.status,
+            daily_orders.c.orders_count,
+            daily_orders.c.total_cents,
+            daily_orders.c.discount_cents,
+        ).where(*_in_range(daily_orders, first, last))
+    ).all()
+    orders_by_status: dict = {}
+    gmv_by_day: dict = {}
+    for day, status, count, total_cents, _ in order_rows:
+        orders_by_status[status] = orders_by_status.get(status, 0) + count
+        if status in gmv_names:
+            gmv_by_day[day] = gmv_by_day.get(day, 0) + int(total_cents or 0)
+
+    signup_rows = db.session.execute(
+        select(daily_signups.c.day, daily_signups.c.role, daily_signups.c.users_count).where(
+            *_in_range(daily_signups, first, last)
+        )
+    ).all()
+    signups_by_day: dict = {}
+    new_customers = 0
+    for day, role, count in signup_rows:
+        signups_by_day[day] = signups_by_day.get(day, 0) + count
+        if role == UserRoleType.CUSTOMER.name:
+            new_customers += count
+
+    promo_rows = db.session.execute(
+        select(
+            daily_promo_costs.c.promotion_id,
+            func.sum(daily_promo_costs.c.redemptions_count),
+            func.sum(daily_promo_costs.c.discount_cents),
+        )
+        .where(*_in_range(daily_promo_costs, first, last))
+        .group_by(daily_promo_costs.c.promotion_id)
+        .order_by(func.sum(daily_promo_costs.c.discount_cents).desc())
+    ).all()
+
+    started = dict(
+        db.session.execute(
+            select(daily_memberships.c.source, func.sum(daily_memberships.c.started_count))
+            .where(*_in_range(daily_memberships, first, last))
+            .group_by(daily_memberships.c.source)
+        ).all()
+    )
+    active_members = db.session.execute(select(func.sum(daily_memberships.c.active_count))).scalar()
+    customers = db.session.execute(
+        select(func.sum(daily_signups.c.users_count)).where(
+            daily_signups.c.role == UserRoleType.CUSTOMER.name
+        )
+    ).scalar()
+    paid_started = int(started.get(MembershipSource.PAID.name) or 0)
+
+    refreshed = refresh_times()
+    view_times = {view.name: refreshed.get(view.name) for view in VIEWS}
+    known = [at for at in view_times.values() if at is not None]
+    return {
+        "from": first.isoformat(),
+        "to": last.isoformat(),
+        "timezone": "UTC",
+        "refreshed_at": min(known).isoformat() if len(known) == len(VIEWS) else None,
+        "views": {name: at.isoformat() if at else None for name, at in view_times.items()},
+        "gmv": {
+            "total_cents": sum(gmv_by_day.values()),
+            "days": [
+                {"day": day.isoformat(), "total_cents": gmv_by_day.get(day, 0)}
+                for day in _day_range(first, last)
+            ],
+        },
+        "orders_by_status": {
+            OrderStatus[name].value: int(count) for name, count in orders_by_status.items()
+        },
+        "new_users": [
+            {"day": day.isoformat(), "count": int(signups_by_day.get(day, 0))}
+            for day in _day_range(first, last)
+        ],
+        "promo_cost": {
+            "total_cents": sum(int(cents or 0) for _, _, cents in promo_rows),
+            "redemptions": sum(int(count) for _, count, _ in promo_rows),
+            "promotions": [
+                {
+                    "promotion_id": str(promotion_id),
+                    "redemptions": int(count),
+                    "discount_cents": int(cents or 0),
+                }
+                for promotion_id, count, cents in promo_rows
+            ],
+        },
+        "membership_conversion": {
+            "new_customers": int(new_customers),
+            "paid_memberships_started": paid_started,
+            "earned_memberships_started": int(started.get(MembershipSource.EARNED.name) or 0),
+            "period_rate": round(paid_started / new_customers, 4) if new_customers else None,
+            "active_members": int(active_members or 0),
+            "customers": int(customers or 0),
+            "member_share": (
+                round(int(active_members or 0) / int(customers), 4) if customers else None
+            ),
+        },
+        "generated_at": datetime.now(tz=timezone.utc).isoformat(),
+    }
@@ -0,0 +1,123 @@
+import math
+import time
+
+from ..extensions import cache, db
+from ..models import Order, OrderStatus, Restaurant
+
+DEFAULT_WINDOW_MINUTES = 5
+PREPARING_TTL = 15
+
+ORDER_RATE = "order_rate"
+KITCHEN_LOAD = "kitchen_load"
+
+
+def admission_settings(restaurant_id) -> dict:
+    """Throttle limits from ``RestaurantConfiguration.throttles``.
+
+    ``max_orders_per_window`` caps orders per ``order_window_minutes`` (default 5) and
+    ``max_preparing_orders`` caps orders in PREPARING. Missing keys disable that check.
+    """
+
+    def load():
+        restaurant = db.session.get(Restaurant, restaurant_id)
+        config = restaurant.configuration if restaurant else None
+        throttles = (config.throttles if config else None) or {}
+        return {
+            "max_orders": throttles.get("max_orders_per_window"),
+            "window_seconds": int(throttles.get("order_window_minutes") or DEFAULT_WINDOW_MINUTES)
+            * 60,
+            "max_preparing": throttles.get("max_preparing_orders"),
+            "prep_minutes": (config.prep_time_minutes if config else 0) or 0,
+        }
+
+    return cache.get_or_set(
+        f"restaurant:{restaurant_id}:admission", load, tags=[f"restaurant:{restaurant_id}"]
+    )
+
+
+def _window_key(restaurant_id, index: int) -> str:
+    return f"admission:{restaurant_id}:orders:{index}"
+
+
+def _sliding_count(restaurant_id, window_seconds: int, now: float) -> tuple[float, int, int, float]:
+    """Estimate orders in the trailing window from the current and previous fixed windows."""
+    index = int(now // window_seconds)
+    elapsed = (now % window_seconds) / window_seconds
+    current, previous = cache.get_counts(
+        [_window_key(restaurant_id, index), _window_key(restaurant_id, index - 1)]
+    )
+    return previous * (1 - elapsed) + current, current, previous, elapsed
+
+
+def _preparing_key(restaurant_id) -> str:
+    return f"admission:{restaurant_id}:preparing"
+
+
+def preparing_count(restaurant_id) -> int:
+    return cache.get_or_set(
+        _preparing_key(restaurant_id),
+        lambda: db.session.query(Order)
+        .filter(Order.restaurant_id == restaurant_id, Order.status == OrderStatus.PREPARING)
+        .count(),
+        ttl=PREPARING_TTL,
+    )
+
+
+def estimated_wait_minutes(settings: dict, preparing: int) -> int:
+    prep_minutes = settings["prep_minutes"]
+    max_preparing = settings["max_preparing"]
+    if not max_preparing:
+        return prep_minutes
+    return prep_minutes * (1 + preparing // max_preparing)
+
+
+def check_admission(restaurant_id, now: float | None = None) -> dict:
+    """Decide whether the restaurant can take another order right now.
+
+    Returns ``{"admitted": bool, "estimated_wait_minutes": int}`` plus ``reason`` and
+    ``retry_after_seconds`` when the order should be turned away.
+    """
+    now = now if now is not None else time.time()
+    settings = admission_settings(restaurant_id)
+    preparing = preparing_count(restaurant_id) if settings["max_preparing"] else 0
+    decision = {
+        "admitted": True,
+        "estimated_wait_minutes": estimated_wait_minutes(settings, preparing),
+    }
+
+    max_orders = settings["max_orders"]
+    if max_orders:
+        window = settings["window_seconds"]
+        count, current, previous, elapsed = _sliding_count(restaurant_id, window, now)
+        if count >= max_orders:
+            room = max_orders - current
+            if room <= 0 or not previous:
+                retry_after = window * (1 - elapsed)
+            else:
+                # Wait until the previous window's weight decays enough to leave room.
+                retry_after = window * (1 - room / previous) - window * elapsed
+            decision.update(
+                admitted=False,
+                reason=ORDER_RATE,
+                retry_after_seconds=max(1, math.ceil(retry_after)),
+            )
+            return decision
+
+    max_preparing = settings["max_preparing"]
+    if max_preparing and preparing >= max_preparing:
+        decision.update(
+            admitted=False,
+            reason=KITCHEN_LOAD,
+            retry_after_seconds=max(60, decision["estimated_wait_minutes"] * 60 // 2),
+        )
+    return decision
+
+
+def record_order(restaurant_id, now: float | None = None) -> None:
+    now = now if now is not None else time.time()
+    window = admission_settings(restaurant_id)["window_seconds"]
+    cache.incr(_window_key(restaurant_id, int(now // window)), ttl=window * 2)
+
+
+def preparing_changed(restaurant_id) -> None:
+    cache.delete(_preparing_key(restaurant_id))
@@ -0,0 +1,201 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import current_app, request
+from sqlalchemy.dialects.postgresql import insert
+
+from ..extensions import db
+from ..models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT_LENGTH = 255
+
+
+class AuditBuffer:
+    """Per-process queue of audit rows written in multi-row batches by a background thread.
+
+    ``add`` only appends under a lock, so auditing costs a request next to nothing and never
+    touches its transaction. Rows go to ``writer`` every ``interval`` seconds, or sooner
+    once ``batch_rows`` are waiting. Audit rows must not be lost, so instead of dropping
+    them the buffer hands them to ``spill`` when the writer fails or when ``max_rows`` are
+    already queued (the database has fallen behind); spilled rows are replayed later.
+    """
+
+    def __init__(self, writer, spill, interval: float, batch_rows: int, max_rows: int):
+        self._writer = writer
+        self._spill = spill
+        self._interval = interval
+        self._batch_rows = batch_rows
+        self._max_rows = max_rows
+        self._rows: list[dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    def _ensure_thread(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        if self._pid != pid:
+            # A forked worker must not write rows its parent already owns.
+            self._rows = []
+        self._pid = pid
+        self._thread = threading.Thread(target=self._run, name="audit-buffer", daemon=True)
+        self._thread.start()
+
+    def add(self, row: dict) -> None:
+        overflow = None
+        with self._lock:
+            self._ensure_thread()
+            if len(self._rows) >= self._max_rows:
+                overflow, self._rows = self._rows, []
+            self._rows.append(row)
+            full = len(self._rows) >= self._batch_rows
+        if overflow:
+            logger.warning("Audit buffer full; spilling %s rows", len(overflow))
+            self._spill(overflow)
+        if full:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    rows = self._rows[: self._batch_rows]
+                    del self._rows[: self._batch_rows]
+                if not rows:
+                    return written
+                try:
+                    self._writer(rows)
+                except Exception:
+                    logger.exception("Failed to write %s audit rows; spilling them", len(rows))
+                    self._spill(rows)
+                    return written
+                written += len(rows)
+
+
+def _encode(row: dict) -> dict:
+    return {
+        **row,
+        "id": str(row["id"]),
+        "created_at": row["created_at"].isoformat(),
+        "actor_id": str(row["actor_id"]) if row["actor_id"] else None,
+        "entity_id": str(row["entity_id"]),
+    }
+
+
+def _decode(row: dict) -> dict:
+    return {
+        **row,
+        "id": uuid.UUID(row["id"]),
+        "created_at": datetime.fromisoformat(row["created_at"]),
+        "actor_id": uuid.UUID(row["actor_id"]) if row["actor_id"] else None,
+        "entity_id": uuid.UUID(row["entity_id"]),
+    }
+
+
+def spill_rows(directory: str, rows: list[dict]) -> str:
+    """Append-only fallback: write ``rows`` to a new JSON-lines file and fsync it.
+
+    Files appear under their final name only once complete, so ``replay_spool`` never
+    reads a half-written one.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = f"audit-{os.getpid()}-{time.time_ns()}"
+    partial = os.path.join(directory, name + ".tmp")
+    with open(partial, "w", encoding="utf-8") as handle:
+        for row in rows:
+            handle.write(json.dumps(_encode(row)) + "\n")
+        handle.flush()
+        os.fsync(handle.fileno())
+    path = os.path.join(directory, name + ".jsonl")
+    os.replace(partial, path)
+    return path
+
+
+def write_rows(rows: list[dict]) -> None:
+    # One executemany per batch, sent as multi-row INSERTs. Rows keep the id they were
+    # queued with, so replaying a spill file that was partly written is harmless.
+    with db.engine.begin() as connection:
+        connection.execute(insert(AuditLog.__table__).on_conflict_do_nothing(), rows)
+
+
+def replay_spool(directory: str, batch_rows: int = 1000) -> int:
+    """Insert spilled rows and delete each file once its rows are committed."""
+    replayed = 0
+    for path in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+        with open(path, encoding="utf-8") as handle:
+            rows = [_decode(json.loads(line)) for line in handle if line.strip()]
+        for start in range(0, len(rows), batch_rows):
+            write_rows(rows[start : start + batch_rows])
+        os.remove(path)
+        replayed += len(rows)
+    return replayed
+
+
+_buffer: AuditBuffer | None = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer() -> AuditBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                app = current_app._get_current_object()
+                spool = app.config["AUDIT_SPOOL_DIR"]
+
+                def writer(rows):
+                    with app.app_context():
+                        write_rows(rows)
+
+                _buffer = AuditBuffer(
+                    writer,
+                    lambda rows: spill_rows(spool, rows),
+                    app.config["AUDIT_FLUSH_SECONDS"],
+                    app.config["AUDIT_BATCH_ROWS"],
+                    app.config["AUDIT_BUFFER_ROWS"],
+                )
+                atexit.register(_buffer.flush)
+    return _buffer
+
+
+def record(actor_id, action: str, entity_type: str, entity_id, metadata: dict | None = None):
+    """Queue an audit row for the current request; it is written after the response."""
+    if not current_app.config["AUDIT_ENABLED"]:
+        return
+    user_agent = request.headers.get("User-Agent")
+    get_buffer().add(
+        {
+            "id": uuid.uuid4(),
+            "created_at": datetime.now(tz=timezone.utc),
+            "actor_id": actor_id,
+            "action": action,
+            "entity_type": entity_type,
+            "entity_id": uuid.UUID(str(entity_id)),
+            "metadata": metadata or {},
+            "ip_address": request.remote_addr,
+            "user_agent": user_agent[:USER_AGENT_LENGTH] if user_agent else None,
+        }
+    )
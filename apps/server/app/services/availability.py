@@ -0,0 +1,225 @@
+import uuid
+from bisect import bisect_right
+from datetime import date, datetime, time, timezone
+from zoneinfo import ZoneInfo
+
+from flask import current_app
+from sqlalchemy import or_
+
+from ..extensions import cache, db
+from ..models import AvailabilityRule, MenuCategory, MenuItem
+
+BUCKET_SECONDS = 15 * 60
+_MINUTES_PER_DAY = 24 * 60
+_MAX_DAY_TABLES = 4096
+
+_tables: dict[str, tuple[str, "AvailabilityTable"]] = {}
+
+
+def _minutes(value: time | None, default: int) -> int:
+    return value.hour * 60 + value.minute if value else default
+
+
+def _ordinal(value: date | None) -> int | None:
+    return value.toordinal() if value else None
+
+
+def rule_row(rule: AvailabilityRule) -> tuple:
+    """Flatten a rule into a picklable ``(subject, day, start, end, start_date, end_date)`` row."""
+    if rule.menu_item_id:
+        subject = f"item:{rule.menu_item_id}"
+    else:
+        subject = f"category:{rule.menu_category_id}"
+    return (
+        subject,
+        rule.day_of_week,
+        _minutes(rule.start_time, 0),
+        _minutes(rule.end_time, _MINUTES_PER_DAY),
+        _ordinal(rule.start_date),
+        _ordinal(rule.end_date),
+    )
+
+
+class AvailabilityTable:
+    """Per-weekday interval tables for a menu's item and category availability rules.
+
+    ``day_of_week`` follows ``date.weekday()`` (Monday is 0) and ``None`` means every day.
+    Windows ending at or before their start run past midnight into the next day. An item
+    with rules of its own ignores its category's rules; with neither it is always available.
+    """
+
+    def __init__(self, rows=()):
+        self._segments: dict[str, list[list[tuple]]] = {}
+        self._days: dict[tuple[str, int], tuple[list[int], list[int]]] = {}
+        for subject, day_of_week, start, end, start_date, end_date in rows:
+            weekdays = range(7) if day_of_week is None else (day_of_week,)
+            for weekday in weekdays:
+                if start < end:
+                    self._add(subject, weekday, start, end, start_date, end_date)
+                    continue
+                if start == end and start in (0, _MINUTES_PER_DAY):
+                    self._add(subject, weekday, 0, _MINUTES_PER_DAY, start_date, end_date)
+                    continue
+                self._add(subject, weekday, start, _MINUTES_PER_DAY, start_date, end_date)
+                # The overnight tail belongs to the previous day's date window.
+                self._add(
+                    subject,
+                    (weekday + 1) % 7,
+                    0,
+                    end,
+                    start_date + 1 if start_date is not None else None,
+                    end_date + 1 if end_date is not None else None,
+                )
+
+    def _add(self, subject, weekday, start, end, start_date, end_date):
+        days = self._segments.setdefault(subject, [[] for _ in range(7)])
+        days[weekday].append((start, end, start_date, end_date))
+
+    def has_rules(self, subject: str) -> bool:
+        return subject in self._segments
+
+    def _day_table(self, subject: str, day: date) -> tuple[list[int], list[int]]:
+        key = (subject, day.toordinal())
+        table = self._days.get(key)
+        if table is not None:
+            return table
+        ordinal = day.toordinal()
+        segments = sorted(
+            (start, end)
+            for start, end, start_date, end_date in self._segments[subject][day.weekday()]
+            if (start_date is None or start_date <= ordinal)
+            and (end_date is None or ordinal <= end_date)
+        )
+        starts: list[int] = []
+        ends: list[int] = []
+        for start, end in segments:
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        if len(self._days) >= _MAX_DAY_TABLES:
+            self._days.clear()
+        self._days[key] = table = (starts, ends)
+        return table
+
+    def is_open(self, subject: str, local_time: datetime) -> bool:
+        starts, ends = self._day_table(subject, local_time.date())
+        minute = local_time.hour * 60 + local_time.minute
+        index = bisect_right(starts, minute) - 1
+        return index >= 0 and minute < ends[index]
+
+    def item_open(self, menu_item_id: str, category_id: str | None, local_time: datetime) -> bool:
+        subject = f"item:{menu_item_id}"
+        if self.has_rules(subject):
+            return self.is_open(subject, local_time)
+        subject = f"category:{category_id}"
+        if category_id and self.has_rules(subject):
+            return self.is_open(subject, local_time)
+        return True
+
+
+def _load_rules(menu_id) -> dict:
+    rules = (
+        db.session.query(AvailabilityRule)
+        .filter(
+            AvailabilityRule.is_active.is_(True),
+            or_(
+                AvailabilityRule.menu_item_id.in_(
+                    db.select(MenuItem.id).where(MenuItem.menu_id == menu_id)
+                ),
+                AvailabilityRule.menu_category_id.in_(
+                    db.select(MenuCategory.id).where(MenuCategory.menu_id == menu_id)
+                ),
+            ),
+        )
+        .all()
+    )
+    return {"version": uuid.uuid4().hex, "rules": [rule_row(rule) for rule in rules]}
+
+
+def get_availability_table(menu_id) -> AvailabilityTable:
+    data = cache.get_or_set(
+        f"availability:rules:{menu_id}", lambda: _load_rules(menu_id), tags=[f"menu:{menu_id}"]
+    )
+    key = str(menu_id)
+    current = _tables.get(key)
+    if current is not None and current[0] == data["version"]:
+        return current[1]
+    table = AvailabilityTable(data["rules"])
+    _tables[key] = (data["version"], table)
+    return table
+
+
+def _local(at: datetime) -> datetime:
+    return at.astimezone(ZoneInfo(current_app.config["AVAILABILITY_TIMEZONE"]))
+
+
+def is_item_available(menu_item: MenuItem, at: datetime | None = None) -> bool:
+    at = at or datetime.now(tz=timezone.utc)
+    if not menu_item.is_active or menu_item.deleted_at is not None:
+        return False
+    if menu_item.out_of_stock_until and menu_item.out_of_stock_until > at:
+        return False
+    return get_availability_table(menu_item.menu_id).item_open(
+        str(menu_item.id),
+        str(menu_item.category_id) if menu_item.category_id else None,
+        _local(at),
+    )
+
+
+def unavailable_cart_items(cart, at: datetime | None = None) -> list[str]:
+    menu_item_ids = {item.menu_item_id for item in cart.items if item.menu_item_id}
+    if not menu_item_ids:
+        return []
+    menu_items = db.session.query(MenuItem).filter(MenuItem.id.in_(menu_item_ids)).all()
+    found = {menu_item.id for menu_item in menu_items}
+    unavailable = [str(menu_item_id) for menu_item_id in menu_item_ids - found]
+    unavailable.extend(
+        str(menu_item.id) for menu_item in menu_items if not is_item_available(menu_item, at)
+    )
+    return sorted(unavailable)
+
+
+def _unavailable_menu_items(menu: dict, bucket: int) -> list[str]:
+    at = datetime.fromtimestamp(bucket * BUCKET_SECONDS, tz=timezone.utc)
+    local_time = _local(at)
+    table = get_availability_table(menu["id"])
+    unavailable = []
+    for category in menu["categories"]:
+        for item in category["items"]:
+            out_of_stock_until = item.get("out_of_stock_until")
+            if out_of_stock_until and datetime.fromisoformat(out_of_stock_until) > at:
+                unavailable.append(item["id"])
+            elif not table.item_open(item["id"], category["id"], local_time):
+                unavailable.append(item["id"])
+    return unavailable
+
+
+def filter_menu(menu: dict, at: datetime | None = None) -> dict:
+    """Drop items that are unavailable at ``at`` from a serialized menu.
+
+    The unavailable set is cached per menu and 15-minute bucket and evaluated at the
+    bucket's start; cart adds and checkout use the exact time instead.
+    """
+    at = at or datetime.now(tz=timezone.utc)
+    bucket = int(at.timestamp()) // BUCKET_SECONDS
+    unavailable = cache.get_or_set(
+        f"availability:{menu['id']}:{bucket}",
+        lambda: _unavailable_menu_items(menu, bucket),
+        ttl=BUCKET_SECONDS * 2,
+        tags=[f"menu:{menu['id']}"],
+    )
+    if not unavailable:
+        return menu
+    unavailable = set(unavailable)
+    return dict(
+        menu,
+        categories=[
+            dict(
+                category,
+                items=[item for item in category["items"] if item["id"] not in unavailable],
+            )
+            for category in menu["categories"]
+        ],
+    )
@@ -1,6 +1,73 @@
-from datetime import datetime, timezone
-
-from ..models import AdjustmentType, Promotion, PromotionScope, PromotionType
+from array import array
+
+from ..extensions import db
+from ..models import AdjustmentType, MenuItem
+
+
+class CartLines:
+    """Column-oriented view of a cart's lines used to price many promotions at once.
+
+    Line ``i`` is ``(menu_item_ids[i], category_ids[i], unit_prices[i], quantities[i])``;
+    unit prices include option deltas. ``by_item``/``by_category`` map ids to line indexes
+    so scoped promotions only touch the lines they target.
+    """
+
+    __slots__ = (
+        "restaurant_id",
+        "menu_item_ids",
+        "category_ids",
+        "unit_prices",
+        "quantities",
+        "by_item",
+        "by_category",
+        "subtotal_cents",
+    )
+
+    def __init__(self, restaurant_id=None, rows=()):
+        self.restaurant_id = restaurant_id
+        self.menu_item_ids = []
+        self.category_ids = []
+        self.unit_prices = array("q")
+        self.quantities = array("q")
+        self.by_item = {}
+        self.by_category = {}
+        self.subtotal_cents = 0
+        for menu_item_id, category_id, unit_price, quantity in rows:
+            index = len(self.menu_item_ids)
+            self.menu_item_ids.append(menu_item_id)
+            self.category_ids.append(category_id)
+            self.unit_prices.append(unit_price)
+            self.quantities.append(quantity)
+            self.by_item.setdefault(menu_item_id, []).append(index)
+            self.by_category.setdefault(category_id, []).append(index)
+            self.subtotal_cents += unit_price * quantity
+
+    def __len__(self):
+        return len(self.menu_item_ids)
+
+    def line_total(self, index: int) -> int:
+        return self.unit_prices[index] * self.quantities[index]
+
+
+def cart_lines(cart) -> CartLines:
+    items = list(cart.items)
+    menu_item_ids = {item.menu_item_id for item in items if item.menu_item_id}
+    categories = {}
+    if menu_item_ids:
+        categories = {
+            str(menu_item_id): str(category_id) if category_id else None
+            for menu_item_id, category_id in db.session.query(MenuItem.id, MenuItem.category_id)
+            .filter(MenuItem.id.in_(menu_item_ids))
+            .all()
+        }
+    rows = []
+    for item in items:
+        menu_item_id = str(item.menu_item_id) if item.menu_item_id else None
+        unit_price = (item.base_price_cents or 0) + sum(
+            option.price_delta_cents or 0 for option in item.options
+        )
+        rows.append((menu_item_id, categories.get(menu_item_id), unit_price, item.quantity or 0))
+    return CartLines(str(cart.restaurant_id) if cart.restaurant_id else None, rows)
 
 
 def _tax_from_settings(subtotal_cents: int, tax_settings: dict) -> int:
@@ -29,8 +96,8 @@ def _compute_subtotal(cart) -> int:
     return subtotal_cents
 
 
-def compute_cart_totals(cart) -> dict:
-    subtotal_cents = _compute_subtotal(cart)
+def compute_cart_totals(cart, lines: CartLines | None = None) -> dict:
+    subtotal_cents = lines.subtotal_cents if lines is not None else _compute_subtotal(cart)
 
     restaurant = cart.restaurant
     tax_cents = _tax_from_settings(subtotal_cents, restaurant.configuration.tax_settings if restaurant else {})
@@ -46,31 +113,12 @@ def compute_cart_totals(cart) -> dict:
     }
 
 
-def apply_promo(cart, promo: Promotion) -> int:
-    now = datetime.now(tz=timezone.utc)
-    if not promo.is_active:
-        return 0
-    if promo.scope != PromotionScope.ORDER:
-        return 0
-    if promo.starts_at and promo.starts_at > now:
-        return 0
-    if promo.ends_at and promo.ends_at < now:
-        return 0
-
-    subtotal = _compute_subtotal(cart)
-    if subtotal < (promo.min_order_cents or 0):
-        return 0
-
-    if promo.type == PromotionType.PERCENT:
-        percent = promo.rules.get("percent", 0)
-        return int(subtotal * (percent / 100.0))
-    if promo.type == PromotionType.FIXED:
-        return min(subtotal, promo.rules.get("amount_cents", 0))
-    if promo.type == PromotionType.FREE_DELIVERY:
-        return totals["fee_cents"]
-    if promo.type == PromotionType.BOGO:
-        return promo.rules.get("discount_cents", 0)
-    return 0
+def with_discount(totals: dict, discount_cents: int) -> dict:
+    totals = dict(totals, discount_cents=discount_cents)
+    totals["total_cents"] = max(
+        0, totals["subtotal_cents"] + totals["tax_cents"] + totals["fee_cents"] - discount_cents
+    )
+    return totals
 
 
 def promo_adjustment(discount_cents: int) -> dict:
@@ -0,0 +1,44 @@
+import uuid
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from ..extensions import db
+from ..models import RestaurantCounter, UserCounter
+
+
+def _bump(model, constraint: str, key: dict, deltas: dict) -> None:
+    table = model.__table__
+    stmt = insert(table).values(id=uuid.uuid4(), **key, **deltas)
+    set_ = {column: table.c[column] + stmt.excluded[column] for column in deltas}
+    set_["updated_at"] = func.now()
+    db.session.execute(stmt.on_conflict_do_update(constraint=constraint, set_=set_))
+
+
+def bump_user(user_id, orders: int = 0, likes: int = 0) -> None:
+    """Adjust a user's counters in the caller's transaction, creating the row if needed."""
+    _bump(
+        UserCounter,
+        "uq_user_counters_user",
+        {"user_id": user_id},
+        {"orders_count": orders, "likes_count": likes},
+    )
+
+
+def bump_restaurant_likes(restaurant_id, delta: int) -> None:
+    _bump(
+        RestaurantCounter,
+        "uq_restaurant_counters_restaurant",
+        {"restaurant_id": restaurant_id},
+        {"likes_count": delta},
+    )
+
+
+def user_counts(user_id) -> dict[str, int]:
+    row = (
+        db.session.query(UserCounter.orders_count, UserCounter.likes_count)
+        .filter(UserCounter.user_id == user_id)
+        .first()
+    )
+    orders, likes = row or (0, 0)
+    return {"orders": orders, "likes": likes}
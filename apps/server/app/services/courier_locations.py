@@ -0,0 +1,272 @@
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from ..extensions import cache, db
+from ..models import CourierLatestLocation, CourierLocationUpdate
+
+logger = logging.getLogger(__name__)
+
+# Errors a retry cannot fix, e.g. a fix pointing at a delivery task that no longer exists.
+PERMANENT_ERRORS = (IntegrityError, DataError)
+
+
+class LocationBuffer:
+    """Per-process buffer of location fixes flushed by a background thread.
+
+    Fixes are handed to ``writer`` in one batch every ``interval`` seconds, or sooner once
+    ``max_rows`` are waiting. If the writer keeps failing, the oldest fixes are dropped
+    beyond ``4 * max_rows`` so a database outage cannot exhaust memory. A batch rejected
+    with one of ``PERMANENT_ERRORS`` is retried a fix at a time and the rejected fixes are
+    dropped, so one bad row cannot block everyone else's.
+    """
+
+    def __init__(self, writer, interval: float, max_rows: int):
+        self._writer = writer
+        self._interval = interval
+        self._max_rows = max_rows
+        self._rows: list[dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    def _ensure_thread(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        if self._pid != pid:
+            # A forked worker must not flush fixes its parent already owns.
+            self._rows = []
+        self._pid = pid
+        self._thread = threading.Thread(target=self._run, name="location-buffer", daemon=True)
+        self._thread.start()
+
+    def add(self, rows: list[dict]) -> None:
+        with self._lock:
+            self._ensure_thread()
+            self._rows.extend(rows)
+            overflow = len(self._rows) - self._max_rows * 4
+            if overflow > 0:
+                logger.warning("Dropping %s buffered courier fixes", overflow)
+                del self._rows[:overflow]
+            full = len(self._rows) >= self._max_rows
+        if full:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            try:
+                self._writer(rows)
+            except PERMANENT_ERRORS:
+                logger.warning("%s courier fixes rejected; writing them one by one", len(rows))
+                return self._write_singly(rows)
+            except Exception:
+                logger.exception("Failed to flush %s courier fixes", len(rows))
+                with self._lock:
+                    self._rows[:0] = rows
+                return 0
+            return len(rows)
+
+    def _write_singly(self, rows: list[dict]) -> int:
+        written = 0
+        for index, row in enumerate(rows):
+            try:
+                self._writer([row])
+            except PERMANENT_ERRORS:
+                logger.exception("Dropping courier fix rejected by the database")
+                continue
+            except Exception:
+                logger.exception("Failed to flush %s courier fixes", len(rows) - index)
+                with self._lock:
+                    self._rows[:0] = rows[index:]
+                return written
+            written += 1
+        return written
+
+
+def _latest_per_courier(rows: list[dict]) -> list[dict]:
+    latest: dict = {}
+    for row in rows:
+        current = latest.get(row["courier_id"])
+        if current is None or row["recorded_at"] > current["recorded_at"]:
+            latest[row["courier_id"]] = row
+    return list(latest.values())
+
+
+def write_fixes(rows: list[dict]) -> None:
+    """Insert a batch of fixes and advance each courier's row in the latest-position table."""
+    hot = CourierLatestLocation.__table__
+    upsert = insert(hot)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[hot.c.courier_id],
+        set_={
+            "delivery_task_id": upsert.excluded.delivery_task_id,
+            "latitude": upsert.excluded.latitude,
+            "longitude": upsert.excluded.longitude,
+            "recorded_at": upsert.excluded.recorded_at,
+            "updated_at": db.func.now(),
+        },
+        where=hot.c.recorded_at < upsert.excluded.recorded_at,
+    )
+    with db.engine.begin() as connection:
+        connection.execute(insert(CourierLocationUpdate.__table__), rows)
+        connection.execute(upsert, _latest_per_courier(rows))
+
+
+_buffer: LocationBuffer | None = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer() -> LocationBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                app = current_app._get_current_object()
+
+                def writer(rows):
+                    with app.app_context():
+                        write_fixes(rows)
+
+                _buffer = LocationBuffer(
+                    writer,
+                    app.config["COURIER_LOCATION_FLUSH_MS"] / 1000,
+                    app.config["COURIER_LOCATION_BATCH_ROWS"],
+                )
+                atexit.register(_buffer.flush)
+    return _buffer
+
+
+def _location_key(courier_id) -> str:
+    return f"courier:{courier_id}:location"
+
+
+def ingest_fixes(courier_id, fixes: list[dict]) -> None:
+    """Buffer fixes for the batched writer and publish the newest one for live reads."""
+    rows = [dict(fix, courier_id=courier_id) for fix in fixes]
+    get_buffer().add(rows)
+    newest = max(rows, key=lambda row: row["recorded_at"])
+    # Cached timestamps are compared as strings, which only orders correctly in one offset.
+    recorded_at = newest["recorded_at"].astimezone(timezone.utc).isoformat()
+    current = cache.get(_location_key(courier_id))
+    if current is None or current["recorded_at"] < recorded_at:
+        cache.set(
+            _location_key(courier_id),
+            {
+                "courier_id": str(courier_id),
+                "delivery_task_id": str(newest["delivery_task_id"])
+                if newest.get("delivery_task_id")
+                else None,
+                "latitude": float(newest["latitude"]),
+                "longitude": float(newest["longitude"]),
+                "recorded_at": recorded_at,
+            },
+            ttl=current_app.config["COURIER_LOCATION_TTL"],
+        )
+
+
+def cached_location(courier_id) -> dict | None:
+    """Newest fix from the cache only; safe to call outside an app context."""
+    return cache.get(_location_key(courier_id))
+
+
+def latest_location(courier_id) -> dict | None:
+    location = cached_location(courier_id)
+    if location is not None:
+        return location
+    row = db.session.query(CourierLatestLocation).filter_by(courier_id=courier_id).first()
+    if not row:
+        return None
+    return {
+        "courier_id": str(row.courier_id),
+        "delivery_task_id": str(row.delivery_task_id) if row.delivery_task_id else None,
+        "latitude": float(row.latitude),
+        "longitude": float(row.longitude),
+        "recorded_at": row.recorded_at.astimezone(timezone.utc).isoformat(),
+    }
+
+
+_DOWNSAMPLE_SQL = text(
+    """
+    DELETE FROM courier_location_updates AS fix
+    USING (
+        SELECT id, row_number() OVER (
+            PARTITION BY courier_id, floor(extract(epoch FROM recorded_at) / :bucket_seconds)
+            ORDER BY recorded_at
+        ) AS position
+        FROM courier_location_updates
+        WHERE recorded_at >= :start AND recorded_at < :end
+    ) AS ranked
+    WHERE fix.id = ranked.id
+      AND ranked.position > 1
+      AND fix.recorded_at >= :start
+      AND fix.recorded_at < :end
+    """
+)
+
+
+def downsample_locations(
+    start: datetime, end: datetime, bucket_seconds: int, step: timedelta = timedelta(hours=1)
+) -> int:
+    """Keep the first fix per courier per ``bucket_seconds`` between ``start`` and ``end``.
+
+    Work is committed one ``step`` at a time to keep transactions and locks short.
+    """
+    removed = 0
+    cursor = start
+    while cursor < end:
+        window_end = min(cursor + step, end)
+        result = db.session.execute(
+            _DOWNSAMPLE_SQL,
+            {"start": cursor, "end": window_end, "bucket_seconds": bucket_seconds},
+        )
+        db.session.commit()
+        removed += result.rowcount or 0
+        cursor = window_end
+    return removed
+
+
+def purge_locations(before: datetime, batch_size: int = 10000) -> int:
+    removed = 0
+    while True:
+        result = db.session.execute(
+            text(
+                """
+                DELETE FROM courier_location_updates
+                WHERE recorded_at < :before
+                  AND (id, recorded_at) IN (
+                    SELECT id, recorded_at FROM courier_location_updates
+                    WHERE recorded_at < :before
+                    LIMIT :batch_size
+                )
+                """
+            ),
+            {"before": before, "batch_size": batch_size},
+        )
+        db.session.commit()
+        removed += result.rowcount or 0
+        if not result.rowcount or result.rowcount < batch_size:
+            return removed
@@ -0,0 +1,283 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.orm import aliased
+
+from ..extensions import db
+from ..models import (
+    Address,
+    CourierAssignment,
+    CourierAssignmentStatus,
+    CourierLatestLocation,
+    CourierProfile,
+    DeliveryTask,
+    DeliveryTaskStatus,
+    Order,
+    OrderStatus,
+)
+from .geo import SpatialGrid, haversine_km
+from .routing import ACTIVE_TASK_STATUSES, LIVE_ASSIGNMENT_STATUSES, plan_routes
+
+# Components up to this many tasks or couriers are solved exactly; larger ones greedily.
+HUNGARIAN_MAX = 80
+_INFEASIBLE = 1e9
+_DISPATCH_LOCK = 0x64697370  # "disp"
+
+
+def hungarian(costs: list[list[float]]) -> dict[int, int]:
+    """Minimum-cost assignment of every row to a distinct column (rows <= columns)."""
+    n, m = len(costs), len(costs[0])
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    owner = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for row in range(1, n + 1):
+        owner[0] = row
+        col = 0
+        min_slack = [math.inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[col] = True
+            current_row = owner[col]
+            delta = math.inf
+            next_col = 0
+            row_costs = costs[current_row - 1]
+            for j in range(1, m + 1):
+                if used[j]:
+                    continue
+                slack = row_costs[j - 1] - u[current_row] - v[j]
+                if slack < min_slack[j]:
+                    min_slack[j] = slack
+                    way[j] = col
+                if min_slack[j] < delta:
+                    delta = min_slack[j]
+                    next_col = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[owner[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_slack[j] -= delta
+            col = next_col
+            if owner[col] == 0:
+                break
+        while col:
+            previous = way[col]
+            owner[col] = owner[previous]
+            col = previous
+    return {owner[j] - 1: j - 1 for j in range(1, m + 1) if owner[j]}
+
+
+def _solve_exact(task_ids, courier_ids, edges) -> list[tuple]:
+    transpose = len(task_ids) > len(courier_ids)
+    rows, cols = (courier_ids, task_ids) if transpose else (task_ids, courier_ids)
+    row_index = {key: index for index, key in enumerate(rows)}
+    col_index = {key: index for index, key in enumerate(cols)}
+    costs = [[_INFEASIBLE] * len(cols) for _ in rows]
+    for task_id, courier_id, km in edges:
+        row, col = (courier_id, task_id) if transpose else (task_id, courier_id)
+        costs[row_index[row]][col_index[col]] = km
+    matches = []
+    for row, col in hungarian(costs).items():
+        km = costs[row][col]
+        if km >= _INFEASIBLE:
+            continue
+        if transpose:
+            matches.append((cols[col], rows[row], km))
+        else:
+            matches.append((rows[row], cols[col], km))
+    return matches
+
+
+def _solve_greedy(edges) -> list[tuple]:
+    taken_tasks, taken_couriers, matches = set(), set(), []
+    for task_id, courier_id, km in sorted(edges, key=lambda edge: edge[2]):
+        if task_id in taken_tasks or courier_id in taken_couriers:
+            continue
+        taken_tasks.add(task_id)
+        taken_couriers.add(courier_id)
+        matches.append((task_id, courier_id, km))
+    return matches
+
+
+def _components(edges) -> list[list[tuple]]:
+    parent: dict = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for task_id, courier_id, _ in edges:
+        parent[find(("task", task_id))] = find(("courier", courier_id))
+    grouped: dict = {}
+    for edge in edges:
+        grouped.setdefault(find(("task", edge[0])), []).append(edge)
+    return list(grouped.values())
+
+
+def match(tasks: list[dict], couriers: list[dict], radius_km: float) -> list[tuple]:
+    """Pair tasks with couriers by pickup distance; returns ``(task_id, courier_id, km)``.
+
+    Each courier takes at most one task per round. A spatial grid limits candidates
+    to couriers within ``radius_km`` of the pickup, and every connected group of
+    candidates is solved on its own.
+    """
+    if not tasks or not couriers:
+        return []
+    grid = SpatialGrid(radius_km, sum(task["lat"] for task in tasks) / len(tasks))
+    for courier in couriers:
+        grid.insert(courier["id"], courier["lat"], courier["lng"])
+    edges = [
+        (task["id"], courier_id, km)
+        for task in tasks
+        for courier_id, km in grid.near(task["lat"], task["lng"], radius_km)
+    ]
+    matches = []
+    for component in _components(edges):
+        task_ids = list(dict.fromkeys(edge[0] for edge in component))
+        courier_ids = list(dict.fromkeys(edge[1] for edge in component))
+        if len(task_ids) == 1 or len(courier_ids) == 1:
+            matches.extend(_solve_greedy(component))
+        elif max(len(task_ids), len(courier_ids)) <= HUNGARIAN_MAX:
+            matches.extend(_solve_exact(task_ids, courier_ids, component))
+        else:
+            matches.extend(_solve_greedy(component))
+    return matches
+
+
+def open_tasks(limit: int) -> list[dict]:
+    """Unassigned delivery tasks whose order is READY, oldest first."""
+    pickup = aliased(Address)
+    dropoff = aliased(Address)
+    rows = (
+        db.session.query(
+            DeliveryTask.id,
+            pickup.latitude,
+            pickup.longitude,
+            dropoff.latitude,
+            dropoff.longitude,
+        )
+        .join(Order, Order.id == DeliveryTask.order_id)
+        .join(pickup, pickup.id == DeliveryTask.pickup_address_id)
+        .outerjoin(dropoff, dropoff.id == DeliveryTask.dropoff_address_id)
+        .filter(
+            DeliveryTask.status == DeliveryTaskStatus.PENDING,
+            Order.status == OrderStatus.READY,
+            pickup.latitude.isnot(None),
+            pickup.longitude.isnot(None),
+        )
+        .order_by(DeliveryTask.created_at)
+        .limit(limit)
+        .all()
+    )
+    tasks = []
+    for task_id, lat, lng, drop_lat, drop_lng in rows:
+        delivery_km = 0.0
+        if drop_lat is not None and drop_lng is not None:
+            delivery_km = haversine_km(float(lat), float(lng), float(drop_lat), float(drop_lng))
+        tasks.append(
+            {"id": task_id, "lat": float(lat), "lng": float(lng), "delivery_km": delivery_km}
+        )
+    return tasks
+
+
+def available_couriers(seen_since: datetime) -> list[dict]:
+    """Online couriers with a fresh position and room for another task."""
+    active = (
+        select(CourierAssignment.courier_id, func.count().label("active"))
+        .join(DeliveryTask, DeliveryTask.id == CourierAssignment.delivery_task_id)
+        .where(
+            DeliveryTask.status.in_(ACTIVE_TASK_STATUSES),
+            CourierAssignment.status.in_(LIVE_ASSIGNMENT_STATUSES),
+        )
+        .group_by(CourierAssignment.courier_id)
+        .subquery()
+    )
+    rows = (
+        db.session.query(
+            CourierLatestLocation.courier_id,
+            CourierLatestLocation.latitude,
+            CourierLatestLocation.longitude,
+        )
+        .join(CourierProfile, CourierProfile.user_id == CourierLatestLocation.courier_id)
+        .outerjoin(active, active.c.courier_id == CourierLatestLocation.courier_id)
+        .filter(
+            CourierProfile.is_online.is_(True),
+            CourierLatestLocation.recorded_at >= seen_since,
+            func.coalesce(CourierProfile.capacity, 1) > func.coalesce(active.c.active, 0),
+        )
+        .all()
+    )
+    return [
+        {"id": courier_id, "lat": float(lat), "lng": float(lng)} for courier_id, lat, lng in rows
+    ]
+
+
+def _write_assignments(matches: list[tuple], tasks: dict, now: datetime) -> list:
+    speed = current_app.config["DISPATCH_COURIER_SPEED_KMH"]
+    etas = {
+        task_id: now + timedelta(hours=(km + tasks[task_id]["delivery_km"]) / speed)
+        for task_id, _, km in matches
+    }
+    claimed = set(
+        db.session.execute(
+            update(DeliveryTask)
+            .where(
+                DeliveryTask.id.in_(list(etas)),
+                DeliveryTask.status == DeliveryTaskStatus.PENDING,
+            )
+            .values(
+                status=DeliveryTaskStatus.ASSIGNED,
+                eta=case(etas, value=DeliveryTask.id),
+                updated_at=func.now(),
+            )
+            .returning(DeliveryTask.id)
+            .execution_options(synchronize_session=False)
+        ).scalars()
+    )
+    rows = [
+        {
+            "delivery_task_id": task_id,
+            "courier_id": courier_id,
+            "status": CourierAssignmentStatus.OFFERED,
+        }
+        for task_id, courier_id, _ in matches
+        if task_id in claimed
+    ]
+    if rows:
+        db.session.execute(insert(CourierAssignment), rows)
+    return [row["courier_id"] for row in rows]
+
+
+def run_dispatch(now: datetime | None = None) -> dict:
+    """One batch round: match open tasks to couriers and offer them in bulk.
+
+    A transaction-level advisory lock keeps concurrent dispatchers from offering
+    the same couriers twice; a round that cannot take it is skipped.
+    """
+    now = now or datetime.now(tz=timezone.utc)
+    config = current_app.config
+    locked = db.session.execute(select(func.pg_try_advisory_xact_lock(_DISPATCH_LOCK))).scalar()
+    if not locked:
+        db.session.rollback()
+        return {"skipped": True, "tasks": 0, "couriers": 0, "assigned": 0}
+    tasks = open_tasks(config["DISPATCH_BATCH_SIZE"])
+    couriers = []
+    assigned = 0
+    if tasks:
+        couriers = available_couriers(now - timedelta(seconds=config["COURIER_LOCATION_TTL"]))
+        matches = match(tasks, couriers, config["DISPATCH_MAX_PICKUP_KM"])
+        if matches:
+            couriers_offered = _write_assignments(
+                matches, {task["id"]: task for task in tasks}, now
+            )
+            # Offers stack onto a courier's earlier tasks, so their route is re-planned.
+            plan_routes(couriers_offered, now)
+            assigned = len(couriers_offered)
+    db.session.commit()
+    return {"skipped": False, "tasks": len(tasks), "couriers": len(couriers), "assigned": assigned}
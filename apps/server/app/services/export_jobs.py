@@ -0,0 +1,244 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, func, or_, update
+
+from ..extensions import db
+from ..models import ExportJob
+from .export_storage import get_storage
+from .exports import encode_batches, export_statement, gzip_chunks, header
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+MANIFEST = "manifest.json"
+# A job that keeps dying mid-run (e.g. the worker is OOM-killed) is given up on.
+MAX_ATTEMPTS = 3
+
+
+class JobReclaimed(Exception):
+    """Another worker reclaimed the job, so this one must stop without writing to it."""
+
+
+def _iso(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+def _parse(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+def create_job(user_id, dataset: str, fmt: str, start: datetime | None, end: datetime | None):
+    job = ExportJob(
+        requested_by_id=user_id,
+        dataset=dataset,
+        format=fmt,
+        filters={"from": _iso(start), "to": _iso(end)},
+        status=QUEUED,
+        manifest={},
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def file_key(job_id, name: str) -> str:
+    return f"{job_id}/{name}"
+
+
+def job_files(job: ExportJob) -> list[dict]:
+    files = list(job.manifest.get("chunks", []))
+    if job.status == COMPLETED:
+        files.append({"name": MANIFEST})
+    return files
+
+
+def claim_job(now: datetime | None = None) -> ExportJob | None:
+    """Take the oldest queued job, or a running one whose worker stopped heartbeating."""
+    now = now or datetime.now(tz=timezone.utc)
+    stale = now - timedelta(seconds=current_app.config["EXPORT_JOB_STALE_SECONDS"])
+    job = (
+        db.session.query(ExportJob)
+        .filter(
+            or_(
+                ExportJob.status == QUEUED,
+                and_(ExportJob.status == RUNNING, ExportJob.updated_at < stale),
+            )
+        )
+        .order_by(ExportJob.created_at)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.session.rollback()
+        return None
+    if job.attempts >= MAX_ATTEMPTS:
+        job.status = FAILED
+        job.error = f"Gave up after {job.attempts} attempts"
+        job.finished_at = now
+        db.session.commit()
+        return None
+    job.status = RUNNING
+    job.attempts += 1
+    job.started_at = job.started_at or now
+    db.session.commit()
+    return job
+
+
+def heartbeat(job: ExportJob) -> None:
+    """Bump ``updated_at`` so the running job is not reclaimed as stale.
+
+    It uses its own connection, leaving the session's open export cursor alone. ``attempts``
+    changes on every claim, so a worker whose job was reclaimed gets ``JobReclaimed``.
+    """
+    table = ExportJob.__table__
+    with db.engine.begin() as connection:
+        result = connection.execute(
+            update(table)
+            .where(
+                table.c.id == job.id,
+                table.c.status == RUNNING,
+                table.c.attempts == job.attempts,
+            )
+            .values(updated_at=func.now())
+        )
+    if result.rowcount != 1:
+        raise JobReclaimed(job.id)
+
+
+def write_chunk(job: ExportJob, storage, index: int, after: tuple | None):
+    """Export the next ``EXPORT_CHUNK_ROWS`` rows after ``after`` into one gzip file.
+
+    Returns ``(chunk, last_key)``, or ``None`` when no rows are left. A chunk rewritten
+    after a crash gets the same name and contents, so resuming is safe.
+    """
+    config = current_app.config
+    stmt = (
+        export_statement(
+            job.dataset, _parse(job.filters.get("from")), _parse(job.filters.get("to")), after
+        )
+        .limit(config["EXPORT_CHUNK_ROWS"])
+        .execution_options(yield_per=config["EXPORT_BATCH_SIZE"])
+    )
+    seen = {"rows": 0, "last": None}
+    # Beat well inside the stale window; a chunk can take far longer than the window.
+    interval = config["EXPORT_JOB_STALE_SECONDS"] / 3
+    beat = {"at": time.monotonic()}
+
+    def batches(result):
+        for rows in result.partitions():
+            seen["rows"] += len(rows)
+            seen["last"] = rows[-1]
+            yield rows
+            if time.monotonic() - beat["at"] >= interval:
+                heartbeat(job)
+                beat["at"] = time.monotonic()
+
+    digest = hashlib.sha256()
+    size = 0
+    handle, staged = tempfile.mkstemp(dir=storage.staging_dir(), suffix=".part")
+    try:
+        result = db.session.execute(stmt)
+        with os.fdopen(handle, "wb") as out:
+            encoded = encode_batches(batches(result), job.format, header(job.dataset))
+            for data in gzip_chunks(text.encode("utf-8") for text in encoded):
+                out.write(data)
+                digest.update(data)
+                size += len(data)
+        result.close()
+        db.session.commit()
+        if not seen["rows"]:
+            os.remove(staged)
+            return None
+        name = f"part-{index:05d}.{job.format}.gz"
+        # Only the worker that still holds the claim may publish the chunk.
+        heartbeat(job)
+        storage.save(staged, file_key(job.id, name))
+    except BaseException:
+        if os.path.exists(staged):
+            os.remove(staged)
+        raise
+    chunk = {"name": name, "rows": seen["rows"], "bytes": size, "sha256": digest.hexdigest()}
+    return chunk, (seen["last"][0], seen["last"][1])
+
+
+def _write_manifest(job: ExportJob, storage, manifest: dict) -> None:
+    handle, staged = tempfile.mkstemp(dir=storage.staging_dir(), suffix=".json")
+    with os.fdopen(handle, "w") as out:
+        json.dump(manifest, out, indent=2)
+    storage.save(staged, file_key(job.id, MANIFEST))
+
+
+def run_job(job: ExportJob, storage=None) -> ExportJob:
+    """Export chunk by chunk, committing progress after each so a reclaimed job resumes."""
+    storage = storage or get_storage()
+    chunk_rows = current_app.config["EXPORT_CHUNK_ROWS"]
+    after = None
+    if job.cursor:
+        after = (_parse(job.cursor["at"]), uuid.UUID(job.cursor["id"]))
+    while True:
+        written = write_chunk(job, storage, job.chunks_written + 1, after)
+        if written is None:
+            break
+        chunk, after = written
+        job.chunks_written += 1
+        job.rows_exported += chunk["rows"]
+        job.bytes_written += chunk["bytes"]
+        job.cursor = {"at": after[0].isoformat(), "id": str(after[1])}
+        job.manifest = {"chunks": [*job.manifest.get("chunks", []), chunk]}
+        db.session.commit()
+        if chunk["rows"] < chunk_rows:
+            break
+    finished = datetime.now(tz=timezone.utc)
+    manifest = {
+        "job_id": str(job.id),
+        "dataset": job.dataset,
+        "format": job.format,
+        "compression": "gzip",
+        "columns": header(job.dataset),
+        "filters": job.filters,
+        "rows": job.rows_exported,
+        "chunks": job.manifest.get("chunks", []),
+        "completed_at": finished.isoformat(),
+    }
+    heartbeat(job)
+    _write_manifest(job, storage, manifest)
+    job.manifest = manifest
+    job.status = COMPLETED
+    job.finished_at = finished
+    db.session.commit()
+    return job
+
+
+def work_once() -> ExportJob | None:
+    """Claim and run one job; returns it, or ``None`` when the queue is empty."""
+    job = claim_job()
+    if job is None:
+        return None
+    job_id = job.id
+    try:
+        return run_job(job)
+    except JobReclaimed:
+        logger.warning("Export job %s was reclaimed by another worker; stopping", job_id)
+        db.session.rollback()
+        return db.session.get(ExportJob, job_id)
+    except Exception as exc:
+        logger.exception("Export job %s failed", job_id)
+        db.session.rollback()
+        job = db.session.get(ExportJob, job_id)
+        job.status = FAILED
+        job.error = str(exc)[:1000]
+        job.finished_at = datetime.now(tz=timezone.utc)
+        db.session.commit()
+        return job
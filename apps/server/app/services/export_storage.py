@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+from urllib.parse import urlparse
+
+from flask import current_app
+
+try:
+    import boto3
+except ImportError:  # pragma: no cover - optional dependency
+    boto3 = None
+
+
+class LocalStorage:
+    """Export files under a local directory, served by the app itself."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def staging_dir(self) -> str:
+        # Same filesystem as the exports, so finished files are renamed into place.
+        path = os.path.join(self.root, ".staging")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def save(self, source: str, key: str) -> None:
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(source, target)
+
+    def url(self, key: str, filename: str) -> str | None:
+        return None
+
+
+class S3Storage:
+    """Export files in an S3 bucket; downloads redirect to presigned URLs, which honour Range."""
+
+    def __init__(self, bucket: str, prefix: str = ""):
+        if boto3 is None:
+            raise RuntimeError("boto3 is required for s3:// export storage")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client("s3")
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def path(self, key: str) -> str | None:
+        return None
+
+    def staging_dir(self) -> str:
+        return tempfile.gettempdir()
+
+    def save(self, source: str, key: str) -> None:
+        self.client.upload_file(source, self.bucket, self._key(key))
+        os.remove(source)
+
+    def url(self, key: str, filename: str) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(key),
+                "ResponseContentDisposition": f'attachment; filename="{filename}"',
+            },
+            ExpiresIn=3600,
+        )
+
+
+def get_storage():
+    """Storage for ``EXPORT_STORAGE_URL``: ``s3://bucket/prefix`` or a local directory."""
+    location = current_app.config["EXPORT_STORAGE_URL"]
+    parsed = urlparse(location)
+    if parsed.scheme == "s3":
+        return S3Storage(parsed.netloc, parsed.path)
+    if parsed.scheme == "file":
+        return LocalStorage(parsed.path)
+    return LocalStorage(location)
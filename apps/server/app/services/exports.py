@@ -0,0 +1,168 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from enum import Enum
+from typing import Iterator
+from uuid import UUID
+
+from sqlalchemy import select, tuple_
+
+from ..extensions import db
+from ..models import Order, Payout, PromotionRedemption, User
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# Export columns per dataset; the first entry is the timestamp the date filters apply to.
+DATASETS = {
+    "orders": (
+        Order.created_at,
+        Order.id,
+        Order.placed_at,
+        Order.status,
+        Order.order_type,
+        Order.restaurant_id,
+        Order.customer_id,
+        Order.currency,
+        Order.subtotal_cents,
+        Order.tax_cents,
+        Order.fee_cents,
+        Order.discount_cents,
+        Order.total_cents,
+        Order.promo_id,
+        Order.membership_id,
+    ),
+    "users": (
+        User.created_at,
+        User.id,
+        User.name,
+        User.email,
+        User.phone,
+        User.role,
+        User.is_active,
+        User.last_login_at,
+    ),
+    "payouts": (
+        Payout.created_at,
+        Payout.id,
+        Payout.restaurant_id,
+        Payout.courier_id,
+        Payout.start_at,
+        Payout.end_at,
+        Payout.total_amount_cents,
+        Payout.status,
+        Payout.stripe_payout_id,
+    ),
+    "redemptions": (
+        PromotionRedemption.created_at,
+        PromotionRedemption.id,
+        PromotionRedemption.redeemed_at,
+        PromotionRedemption.promotion_id,
+        PromotionRedemption.coupon_id,
+        PromotionRedemption.customer_id,
+        PromotionRedemption.order_id,
+        PromotionRedemption.discount_cents,
+        PromotionRedemption.status,
+    ),
+}
+
+# Spreadsheet apps evaluate cells starting with these as formulas.
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def header(dataset: str) -> list[str]:
+    return [column.key for column in DATASETS[dataset]]
+
+
+def export_statement(
+    dataset: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    after: tuple | None = None,
+):
+    """Rows ordered by ``(timestamp, id)``; ``after`` resumes past such a key."""
+    columns = DATASETS[dataset]
+    stamp, key = columns[0], columns[1]
+    stmt = select(*columns).order_by(stamp, key)
+    if after is not None:
+        stmt = stmt.where(tuple_(stamp, key) > tuple_(*after))
+    if start is not None:
+        stmt = stmt.where(stamp >= start)
+    if end is not None:
+        stmt = stmt.where(stamp < end)
+    return stmt
+
+
+def _plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _csv_cell(value):
+    value = _plain(value)
+    if value is None:
+        return ""
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def encode_batches(batches, fmt: str, columns: list[str]) -> Iterator[str]:
+    """One text chunk per batch of rows, led by the CSV header row."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for rows in batches:
+            writer.writerows([_csv_cell(value) for value in row] for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    else:
+        for rows in batches:
+            yield "".join(
+                json.dumps(dict(zip(columns, map(_plain, row))), separators=(",", ":")) + "\n"
+                for row in rows
+            )
+
+
+def gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(
+    dataset: str,
+    fmt: str,
+    start: datetime | None,
+    end: datetime | None,
+    batch_size: int,
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """Encoded export in chunks of ``batch_size`` rows.
+
+    Rows come from a server-side cursor, so only one batch is held in memory at a time.
+    """
+    result = db.session.execute(
+        export_statement(dataset, start, end).execution_options(yield_per=batch_size)
+    )
+    try:
+        chunks = (
+            text.encode("utf-8")
+            for text in encode_batches(result.partitions(), fmt, header(dataset))
+        )
+        yield from gzip_chunks(chunks) if compress else chunks
+    finally:
+        result.close()
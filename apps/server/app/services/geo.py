@@ -0,0 +1,67 @@
+import math
+from collections import defaultdict
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_matrix_km(points: list[tuple[float, float]]) -> list[list[float]]:
+    """Pairwise haversine distances for ``(lat, lng)`` points, vectorized when NumPy is present."""
+    if np is None:
+        return [[haversine_km(*a, *b) for b in points] for a in points]
+    coords = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+    lat = coords[:, 0][:, None]
+    lng = coords[:, 1][:, None]
+    a = (
+        np.sin((lat.T - lat) / 2) ** 2
+        + np.cos(lat) * np.cos(lat.T) * np.sin((lng.T - lng) / 2) ** 2
+    )
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))).tolist()
+
+
+class SpatialGrid:
+    """Uniform lat/lng grid for radius lookups over points that share one area.
+
+    Cells are ``cell_km`` tall; their width in degrees is scaled by the cosine of
+    ``reference_lat`` so cells stay roughly square inside a city.
+    """
+
+    def __init__(self, cell_km: float, reference_lat: float = 0.0):
+        self._lat_step = cell_km / KM_PER_DEGREE
+        self._lng_step = self._lat_step / max(math.cos(math.radians(reference_lat)), 0.01)
+        self._cells: dict[tuple[int, int], list] = defaultdict(list)
+
+    def _cell(self, lat: float, lng: float) -> tuple[int, int]:
+        return int(math.floor(lat / self._lat_step)), int(math.floor(lng / self._lng_step))
+
+    def insert(self, key, lat: float, lng: float) -> None:
+        self._cells[self._cell(lat, lng)].append((key, lat, lng))
+
+    def near(self, lat: float, lng: float, radius_km: float) -> list[tuple[object, float]]:
+        """``(key, distance_km)`` for every point within ``radius_km``."""
+        row, col = self._cell(lat, lng)
+        reach_rows = int(math.ceil(radius_km / KM_PER_DEGREE / self._lat_step))
+        km_per_lng_degree = KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+        reach_cols = int(math.ceil(radius_km / km_per_lng_degree / self._lng_step))
+        found = []
+        for d_row in range(-reach_rows, reach_rows + 1):
+            for d_col in range(-reach_cols, reach_cols + 1):
+                for key, point_lat, point_lng in self._cells.get((row + d_row, col + d_col), ()):
+                    distance = haversine_km(lat, lng, point_lat, point_lng)
+                    if distance <= radius_km:
+                        found.append((key, distance))
+        return found
@@ -0,0 +1,57 @@
+import uuid
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+
+from ..extensions import db
+from ..models import RestaurantLike
+from .counters import bump_restaurant_likes, bump_user
+from .popularity import record_like
+
+
+def like(user_id, restaurant_id) -> bool:
+    """Like a restaurant; ``False`` if it was already liked. Counters move only on change."""
+    table = RestaurantLike.__table__
+    created = db.session.execute(
+        insert(table)
+        .values(id=uuid.uuid4(), user_id=user_id, restaurant_id=restaurant_id)
+        .on_conflict_do_nothing(constraint="uq_restaurant_likes")
+        .returning(table.c.id)
+    ).scalar()
+    if created is None:
+        db.session.rollback()
+        return False
+    bump_user(user_id, likes=1)
+    bump_restaurant_likes(restaurant_id, 1)
+    record_like(restaurant_id)
+    db.session.commit()
+    # The cached restaurant detail keeps its old like count until it expires; busting the
+    # restaurant tag on every like would throw away the cached menu as well.
+    return True
+
+
+def unlike(user_id, restaurant_id) -> bool:
+    table = RestaurantLike.__table__
+    removed = db.session.execute(
+        delete(table)
+        .where(table.c.user_id == user_id, table.c.restaurant_id == restaurant_id)
+        .returning(table.c.id)
+    ).scalar()
+    if removed is None:
+        db.session.rollback()
+        return False
+    bump_user(user_id, likes=-1)
+    bump_restaurant_likes(restaurant_id, -1)
+    db.session.commit()
+    return True
+
+
+def liked_restaurant_ids(user_id, restaurant_ids) -> set:
+    """Which of ``restaurant_ids`` the user likes, in one probe of ``uq_restaurant_likes``."""
+    restaurant_ids = list(restaurant_ids)
+    if user_id is None or not restaurant_ids:
+        return set()
+    rows = db.session.query(RestaurantLike.restaurant_id).filter(
+        RestaurantLike.user_id == user_id, RestaurantLike.restaurant_id.in_(restaurant_ids)
+    )
+    return {restaurant_id for (restaurant_id,) in rows}
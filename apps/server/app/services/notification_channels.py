@@ -0,0 +1,64 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryError(Exception):
+    """A channel could not deliver a message; ``retryable=False`` gives up immediately."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class Channel:
+    """A delivery transport. ``concurrency`` caps how many sends run at once."""
+
+    name = ""
+
+    def __init__(self, concurrency: int = 1):
+        self.concurrency = max(1, concurrency)
+
+    def send(self, message: dict) -> None:
+        raise NotImplementedError
+
+
+class LogChannel(Channel):
+    name = "log"
+
+    def send(self, message: dict) -> None:
+        logger.info(
+            "Notification to %s: %s — %s", message["user_id"], message["title"], message["body"]
+        )
+
+
+class FakeChannel(Channel):
+    """Records messages in memory; ``failures`` makes the next N sends raise."""
+
+    name = "fake"
+
+    def __init__(self, concurrency: int = 1, failures: int = 0, retryable: bool = True):
+        super().__init__(concurrency)
+        self.sent: list[dict] = []
+        self.failures = failures
+        self.retryable = retryable
+
+    def send(self, message: dict) -> None:
+        if self.failures > 0:
+            self.failures -= 1
+            raise DeliveryError("fake transport failure", retryable=self.retryable)
+        self.sent.append(message)
+
+
+def get_channels(app) -> dict[str, Channel]:
+    channels = app.extensions.get("notification_channels")
+    if channels is None:
+        channels = {
+            LogChannel.name: LogChannel(app.config["NOTIFICATION_CHANNEL_CONCURRENCY"]),
+        }
+        app.extensions["notification_channels"] = channels
+    return channels
+
+
+def register_channel(app, channel: Channel) -> None:
+    get_channels(app)[channel.name] = channel
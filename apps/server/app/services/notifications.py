@@ -0,0 +1,267 @@
+import logging
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import select, tuple_, update
+
+from ..extensions import db
+from ..models import CustomerProfile, Notification, NotificationStatus
+from .notification_channels import DeliveryError, get_channels
+
+logger = logging.getLogger(__name__)
+
+ORDER_STATUS = "order_status"
+RECEIPT = "receipt"
+MEMBERSHIP = "membership"
+
+# Within a coalesced message, lines are listed in this order.
+TYPE_ORDER = (ORDER_STATUS, RECEIPT, MEMBERSHIP)
+
+
+def enqueue(user_id, type_: str, payload: dict, coalesce_key: str | None = None) -> None:
+    """Queue a notification in the caller's transaction; the worker sends it.
+
+    Delivery waits ``NOTIFICATION_COALESCE_SECONDS`` so a burst of updates for the same
+    key (e.g. an order moving through several statuses) goes out as one message.
+    """
+    now = datetime.now(tz=timezone.utc)
+    db.session.add(
+        Notification(
+            id=uuid.uuid4(),
+            created_at=now,
+            user_id=user_id,
+            type=type_,
+            payload=payload,
+            status=NotificationStatus.PENDING,
+            coalesce_key=coalesce_key,
+            next_attempt_at=now
+            + timedelta(seconds=current_app.config["NOTIFICATION_COALESCE_SECONDS"]),
+        )
+    )
+
+
+def notify_order_status(order) -> None:
+    enqueue(
+        order.customer_id,
+        ORDER_STATUS,
+        {"order_id": str(order.id), "status": order.status.value},
+        f"order:{order.id}",
+    )
+
+
+def notify_receipt(receipt) -> None:
+    enqueue(
+        receipt.customer_id,
+        RECEIPT,
+        {
+            "order_id": str(receipt.order_id),
+            "amount_cents": receipt.amount_cents,
+            "currency": receipt.currency,
+        },
+        f"order:{receipt.order_id}",
+    )
+
+
+def notify_membership(membership, event: str) -> None:
+    enqueue(
+        membership.customer_id,
+        MEMBERSHIP,
+        {"membership_id": str(membership.id), "event": event},
+        f"membership:{membership.id}",
+    )
+
+
+def _line(type_: str, payload: dict) -> str:
+    if type_ == ORDER_STATUS:
+        return f"Your order is {payload['status'].replace('_', ' ')}."
+    if type_ == RECEIPT:
+        return f"Receipt: {payload['amount_cents'] / 100:.2f} {payload['currency']}."
+    if type_ == MEMBERSHIP:
+        return f"Your membership was {payload['event']}."
+    return type_.replace("_", " ").capitalize() + "."
+
+
+def _type_rank(type_: str) -> int:
+    return TYPE_ORDER.index(type_) if type_ in TYPE_ORDER else len(TYPE_ORDER)
+
+
+def claim(now: datetime, batch_size: int) -> list:
+    """Lease due notifications for up to ``batch_size`` due rows' users.
+
+    All of those users' due rows are taken (through ``ix_notifications_user_status``) so
+    they can be coalesced. Leased rows are pushed ``NOTIFICATION_LEASE_SECONDS`` into the
+    future and committed, so delivery happens outside any transaction and a crashed
+    worker's rows come back on their own.
+    """
+    table = Notification.__table__
+    pending = table.c.status == NotificationStatus.PENDING
+    user_ids = set(
+        db.session.execute(
+            select(table.c.user_id)
+            .where(pending, table.c.next_attempt_at <= now)
+            .order_by(table.c.next_attempt_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars()
+    )
+    if not user_ids:
+        db.session.rollback()
+        return []
+    due = (
+        select(table.c.created_at, table.c.id)
+        .where(table.c.user_id.in_(user_ids), pending, table.c.next_attempt_at <= now)
+        .with_for_update(skip_locked=True)
+    )
+    lease = timedelta(seconds=current_app.config["NOTIFICATION_LEASE_SECONDS"])
+    rows = db.session.execute(
+        update(table)
+        .where(tuple_(table.c.created_at, table.c.id).in_(due))
+        .values(attempts=table.c.attempts + 1, next_attempt_at=now + lease)
+        .returning(
+            table.c.created_at,
+            table.c.id,
+            table.c.user_id,
+            table.c.type,
+            table.c.payload,
+            table.c.coalesce_key,
+            table.c.attempts,
+        )
+    ).all()
+    db.session.commit()
+    return rows
+
+
+def coalesce(rows) -> list[dict]:
+    """One message per user and coalesce key; the latest payload of each type wins."""
+    groups: dict = {}
+    for row in sorted(rows, key=lambda row: row.created_at):
+        key = (row.user_id, row.coalesce_key or str(row.id))
+        group = groups.setdefault(
+            key,
+            {"user_id": row.user_id, "key": key[1], "rows": [], "latest": {}, "attempts": 0},
+        )
+        group["rows"].append((row.created_at, row.id))
+        group["latest"][row.type] = row.payload or {}
+        group["attempts"] = max(group["attempts"], row.attempts)
+    messages = []
+    for group in groups.values():
+        latest = group.pop("latest")
+        types = sorted(latest, key=_type_rank)
+        group.update(
+            {
+                "types": types,
+                "title": _line(types[0], latest[types[0]]),
+                "body": " ".join(_line(type_, latest[type_]) for type_ in types),
+                "data": {type_: latest[type_] for type_ in types},
+            }
+        )
+        messages.append(group)
+    return messages
+
+
+def channel_names(user_ids) -> dict:
+    """Each user's preferred channel, falling back to ``NOTIFICATION_DEFAULT_CHANNEL``."""
+    default = current_app.config["NOTIFICATION_DEFAULT_CHANNEL"]
+    names = dict.fromkeys(user_ids, default)
+    if names:
+        profiles = db.session.query(
+            CustomerProfile.user_id, CustomerProfile.notification_prefs
+        ).filter(CustomerProfile.user_id.in_(list(names)))
+        for user_id, prefs in profiles:
+            names[user_id] = (prefs or {}).get("channel") or default
+    # Nothing may hold a transaction open while messages are being sent.
+    db.session.rollback()
+    return names
+
+
+def deliver(messages: list[dict], channels: dict, names: dict) -> list:
+    """Send every message on its user's channel; returns the error (or None) per message.
+
+    Sends run on a shared pool, each channel capped at its own ``concurrency``, so one
+    slow transport cannot take the others' slots.
+    """
+    limits = {
+        name: threading.BoundedSemaphore(channel.concurrency) for name, channel in channels.items()
+    }
+
+    def send(message):
+        name = names.get(message["user_id"])
+        channel = channels.get(name)
+        if channel is None:
+            return DeliveryError(f"Unknown notification channel: {name}", retryable=False)
+        payload = {key: message[key] for key in ("key", "types", "title", "body", "data")}
+        payload["user_id"] = str(message["user_id"])
+        with limits[name]:
+            try:
+                channel.send(payload)
+            except Exception as exc:  # transports raise anything; all of it is a failed send
+                return exc
+        return None
+
+    if not messages:
+        return []
+    workers = sum(channel.concurrency for channel in channels.values())
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(send, messages))
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, in seconds, after ``attempts`` failed sends."""
+    config = current_app.config
+    delay = min(
+        config["NOTIFICATION_RETRY_MAX_SECONDS"],
+        config["NOTIFICATION_RETRY_BASE_SECONDS"] * 2 ** max(0, attempts - 1),
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+
+def record_results(messages: list[dict], errors: list, now: datetime) -> dict:
+    """Mark sent messages' rows SENT; reschedule failed ones with backoff or give up."""
+    table = Notification.__table__
+    max_attempts = current_app.config["NOTIFICATION_MAX_ATTEMPTS"]
+    stats = {"sent": 0, "retried": 0, "failed": 0}
+    sent = []
+    for message, exc in zip(messages, errors):
+        if exc is None:
+            sent.extend(message["rows"])
+            stats["sent"] += 1
+            continue
+        retryable = getattr(exc, "retryable", True)
+        keys = tuple_(table.c.created_at, table.c.id).in_(message["rows"])
+        if retryable and message["attempts"] < max_attempts:
+            values = {
+                "next_attempt_at": now + timedelta(seconds=retry_delay(message["attempts"])),
+                "last_error": str(exc)[:1000],
+            }
+            stats["retried"] += 1
+        else:
+            values = {"status": NotificationStatus.FAILED, "last_error": str(exc)[:1000]}
+            stats["failed"] += 1
+        db.session.execute(update(table).where(keys).values(**values))
+    if sent:
+        db.session.execute(
+            update(table)
+            .where(tuple_(table.c.created_at, table.c.id).in_(sent))
+            .values(status=NotificationStatus.SENT, sent_at=now, last_error=None)
+        )
+    db.session.commit()
+    return stats
+
+
+def work_once(now: datetime | None = None) -> dict:
+    """Claim, coalesce and deliver one batch; returns counts of messages by outcome."""
+    now = now or datetime.now(tz=timezone.utc)
+    rows = claim(now, current_app.config["NOTIFICATION_BATCH_SIZE"])
+    if not rows:
+        return {"sent": 0, "retried": 0, "failed": 0}
+    messages = coalesce(rows)
+    names = channel_names({message["user_id"] for message in messages})
+    errors = deliver(messages, get_channels(current_app), names)
+    for message, exc in zip(messages, errors):
+        if exc is not None:
+            logger.warning("Notification %s failed: %s", message["key"], exc)
+    return record_results(messages, errors, datetime.now(tz=timezone.utc))
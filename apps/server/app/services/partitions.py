@@ -0,0 +1,137 @@
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from ..extensions import db
+
+logger = logging.getLogger(__name__)
+
+DAY = "day"
+MONTH = "month"
+
+# table -> partition key, partition width, partitions to keep ready ahead of time
+PARTITIONED_TABLES = {
+    "courier_location_updates": {"column": "recorded_at", "period": DAY, "ahead": 7},
+    "order_status_history": {"column": "created_at", "period": MONTH, "ahead": 2},
+    "audit_logs": {"column": "created_at", "period": MONTH, "ahead": 2},
+    "notifications": {"column": "created_at", "period": MONTH, "ahead": 2},
+}
+
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def period_start(at: datetime, period: str) -> datetime:
+    at = at.astimezone(timezone.utc)
+    if period == DAY:
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return at.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_period(start: datetime, period: str) -> datetime:
+    if period == DAY:
+        return start + timedelta(days=1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_name(table: str, start: datetime, period: str) -> str:
+    return f"{table}_p{start:%Y%m%d}" if period == DAY else f"{table}_p{start:%Y%m}"
+
+
+def planned_partitions(table: str, now: datetime) -> list[tuple[str, datetime, datetime]]:
+    """``(name, start, end)`` for the current period and the configured periods ahead."""
+    spec = PARTITIONED_TABLES[table]
+    start = period_start(now, spec["period"])
+    partitions = []
+    for _ in range(spec["ahead"] + 1):
+        end = next_period(start, spec["period"])
+        partitions.append((partition_name(table, start, spec["period"]), start, end))
+        start = end
+    return partitions
+
+
+def missing_partitions(
+    table: str, partitions: list[tuple[str, datetime | None]], now: datetime
+) -> list[tuple[str, datetime, datetime]]:
+    """Planned partitions that start at or after the end of the highest existing range."""
+    bounds = [upper for _, upper in partitions if upper is not None]
+    covered_until = max(bounds) if bounds else None
+    return [
+        partition
+        for partition in planned_partitions(table, now)
+        if covered_until is None or partition[1] >= covered_until
+    ]
+
+
+def ensure_partitions(now: datetime | None = None) -> list[str]:
+    """Create any missing partitions from the current period up to each table's horizon.
+
+    Runs ahead of time so the DEFAULT partition stays empty; attaching a range whose rows
+    already landed in DEFAULT fails and has to be fixed by hand.
+    """
+    now = now or datetime.now(tz=timezone.utc)
+    created = []
+    for table in PARTITIONED_TABLES:
+        for name, start, end in missing_partitions(table, list_partitions(table), now):
+            db.session.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+            )
+            created.append(name)
+        db.session.commit()
+    return created
+
+
+def list_partitions(table: str) -> list[tuple[str, datetime | None]]:
+    """Attached partitions with their exclusive upper bound (``None`` for DEFAULT/MAXVALUE)."""
+    rows = db.session.execute(
+        text(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table
+            ORDER BY child.relname
+            """
+        ),
+        {"table": table},
+    ).all()
+    return [(name, upper_bound(bound)) for name, bound in rows]
+
+
+def upper_bound(bound: str) -> datetime | None:
+    match = _UPPER_BOUND.search(bound or "")
+    if not match:
+        return None
+    return datetime.fromisoformat(match.group(1)).astimezone(timezone.utc)
+
+
+def expired_partitions(
+    partitions: list[tuple[str, datetime | None]], before: datetime
+) -> list[str]:
+    return [name for name, upper in partitions if upper is not None and upper <= before]
+
+
+def detach_partitions(table: str, before: datetime, drop: bool = False) -> list[str]:
+    """Detach partitions whose rows are all older than ``before``, optionally dropping them.
+
+    Detaching is a catalog change, so retention never runs a bulk DELETE or leaves
+    dead tuples behind for vacuum.
+    """
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"{table} is not a partitioned table")
+    detached = []
+    for name in expired_partitions(list_partitions(table), before):
+        db.session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        if drop:
+            db.session.execute(text(f"DROP TABLE {name}"))
+        db.session.commit()
+        logger.info("Detached partition %s%s", name, " and dropped it" if drop else "")
+        detached.append(name)
+    return detached
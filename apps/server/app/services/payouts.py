@@ -0,0 +1,195 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, cast, exists, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+
+from ..extensions import db
+from ..models import (
+    Order,
+    OrderRestaurantAllocation,
+    OrderStatus,
+    OrderStatusHistory,
+    Payout,
+    PayoutStatus,
+    Restaurant,
+    TransferRecord,
+    TransferStatus,
+    TransferType,
+)
+
+_MONTH = re.compile(r"^(\d{4})-(\d{2})$")
+_WEEK = re.compile(r"^(\d{4})-W(\d{2})$")
+
+
+def parse_period(value: str) -> tuple[datetime, datetime]:
+    """``YYYY-MM``, ``YYYY-Www`` (ISO week) or ``YYYY-MM-DD`` as a UTC ``[start, end)`` range."""
+    value = value.strip()
+    if match := _MONTH.match(value):
+        start = date(int(match.group(1)), int(match.group(2)), 1)
+        end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    elif match := _WEEK.match(value):
+        start = date.fromisocalendar(int(match.group(1)), int(match.group(2)), 1)
+        end = start + timedelta(days=7)
+    else:
+        start = date.fromisoformat(value)
+        end = start + timedelta(days=1)
+    return (
+        datetime.combine(start, time(), tzinfo=timezone.utc),
+        datetime.combine(end, time(), tzinfo=timezone.utc),
+    )
+
+
+def _enum_literal(column, value):
+    # INSERT ... SELECT does not coerce text to a Postgres enum, so cast explicitly.
+    return cast(literal(value.name), column.type)
+
+
+def _eligible(start: datetime, end: datetime):
+    """Allocations of orders completed inside the period, for restaurants that can be paid."""
+    completed_in_period = exists().where(
+        OrderStatusHistory.order_id == OrderRestaurantAllocation.order_id,
+        OrderStatusHistory.to_status == OrderStatus.COMPLETED,
+        OrderStatusHistory.created_at >= start,
+        OrderStatusHistory.created_at < end,
+    )
+    return and_(
+        Order.status == OrderStatus.COMPLETED,
+        Restaurant.stripe_account_id.isnot(None),
+        completed_in_period,
+    )
+
+
+def _allocations(start: datetime, end: datetime):
+    return (
+        select(OrderRestaurantAllocation)
+        .join(Order, Order.id == OrderRestaurantAllocation.order_id)
+        .join(Restaurant, Restaurant.id == OrderRestaurantAllocation.restaurant_id)
+        .where(_eligible(start, end))
+    )
+
+
+def payable_restaurant_ids(start: datetime, end: datetime) -> list:
+    stmt = (
+        _allocations(start, end)
+        .with_only_columns(OrderRestaurantAllocation.restaurant_id)
+        .distinct()
+        .order_by(OrderRestaurantAllocation.restaurant_id)
+    )
+    return list(db.session.execute(stmt).scalars())
+
+
+def payouts_statement(start: datetime, end: datetime, restaurant_ids: list):
+    """One grouped INSERT ... SELECT creating a PENDING payout per restaurant."""
+    totals = (
+        _allocations(start, end)
+        .with_only_columns(
+            func.gen_random_uuid(),
+            literal(start),
+            literal(end),
+            func.sum(OrderRestaurantAllocation.payout_cents),
+            _enum_literal(Payout.status, PayoutStatus.PENDING),
+            OrderRestaurantAllocation.restaurant_id,
+        )
+        .where(OrderRestaurantAllocation.restaurant_id.in_(restaurant_ids))
+        .group_by(OrderRestaurantAllocation.restaurant_id)
+    )
+    return (
+        insert(Payout.__table__)
+        .from_select(
+            ["id", "start_at", "end_at", "total_amount_cents", "status", "restaurant_id"], totals
+        )
+        .on_conflict_do_nothing(constraint="uq_payouts_restaurant_period")
+    )
+
+
+def transfers_statement(start: datetime, end: datetime, restaurant_ids: list):
+    """One INSERT ... SELECT creating a transfer per allocation, linked to its payout."""
+    rows = (
+        _allocations(start, end)
+        .join(
+            Payout,
+            and_(
+                Payout.restaurant_id == OrderRestaurantAllocation.restaurant_id,
+                Payout.start_at == start,
+                Payout.end_at == end,
+            ),
+        )
+        .with_only_columns(
+            func.gen_random_uuid(),
+            # Placeholder until the Stripe transfer is created; unique like the real id.
+            literal("pending_") + cast(OrderRestaurantAllocation.id, db.String),
+            OrderRestaurantAllocation.order_id,
+            OrderRestaurantAllocation.restaurant_id,
+            Restaurant.stripe_account_id,
+            Payout.id,
+            OrderRestaurantAllocation.payout_cents,
+            literal("USD"),
+            _enum_literal(TransferRecord.transfer_type, TransferType.RESTAURANT_PAYOUT),
+            _enum_literal(TransferRecord.status, TransferStatus.PENDING),
+        )
+        .where(OrderRestaurantAllocation.restaurant_id.in_(restaurant_ids))
+    )
+    return (
+        insert(TransferRecord.__table__)
+        .from_select(
+            [
+                "id",
+                "stripe_transfer_id",
+                "order_id",
+                "restaurant_id",
+                "destination_stripe_account_id",
+                "payout_id",
+                "amount_cents",
+                "currency",
+                "transfer_type",
+                "status",
+            ],
+            rows,
+        )
+        .on_conflict_do_nothing(constraint="uq_transfer_order_type_destination")
+    )
+
+
+def run_chunk(start: datetime, end: datetime, restaurant_ids: list) -> tuple[int, int]:
+    """Create payouts then transfers for a chunk of restaurants in one transaction.
+
+    Both inserts skip rows that already exist, so re-running a chunk after a crash
+    only fills in what is missing.
+    """
+    payouts = db.session.execute(payouts_statement(start, end, restaurant_ids)).rowcount
+    transfers = db.session.execute(transfers_statement(start, end, restaurant_ids)).rowcount
+    db.session.commit()
+    return payouts, transfers
+
+
+def chunked(items: list, size: int) -> list[list]:
+    return [items[index : index + size] for index in range(0, len(items), size)]
+
+
+def run_payouts(
+    start: datetime, end: datetime, workers: int | None = None, chunk_size: int | None = None
+) -> dict:
+    """Compute restaurant payouts for ``[start, end)``, chunks of restaurants in parallel."""
+    if end > datetime.now(tz=timezone.utc):
+        raise ValueError("Payout period has not ended yet")
+    config = current_app.config
+    workers = workers or config["PAYOUT_WORKERS"]
+    chunks = chunked(payable_restaurant_ids(start, end), chunk_size or config["PAYOUT_CHUNK_SIZE"])
+    db.session.remove()
+    app = current_app._get_current_object()
+
+    def work(restaurant_ids):
+        with app.app_context():
+            return run_chunk(start, end, restaurant_ids)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(work, chunks))
+    return {
+        "restaurants": sum(len(chunk) for chunk in chunks),
+        "chunks": len(chunks),
+        "payouts": sum(payouts for payouts, _ in results),
+        "transfers": sum(transfers for _, transfers in results),
+    }
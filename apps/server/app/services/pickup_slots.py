@@ -0,0 +1,200 @@
+import uuid
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from flask import current_app
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert
+
+from ..extensions import cache, db
+from ..models import PickupSlotCounter, Restaurant
+
+DEFAULT_SLOT_MINUTES = 15
+_MINUTES_PER_DAY = 24 * 60
+_DAY_KEYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+SLOT_FULL = "full"
+OUTSIDE_HOURS = "outside_pickup_hours"
+PICKUP_UNSUPPORTED = "pickup_unsupported"
+
+
+def _tz() -> ZoneInfo:
+    return ZoneInfo(current_app.config["AVAILABILITY_TIMEZONE"])
+
+
+def local_date(at: datetime) -> date:
+    return at.astimezone(_tz()).date()
+
+
+def _parse_minutes(value) -> int:
+    hours, minutes = str(value).split(":", 1)
+    return int(hours) * 60 + int(minutes)
+
+
+def pickup_windows(pickup_hours: dict, weekday: int) -> list[tuple[int, int]]:
+    """Return the day's pickup windows as ``(start_minute, end_minute)`` pairs.
+
+    ``pickup_hours`` maps ``"mon"``..``"sun"`` (or ``"0"``..``"6"``) to ``[["11:00", "14:00"]]``
+    or ``[{"start": "11:00", "end": "14:00"}]``. An empty config means open all day.
+    """
+    if not pickup_hours:
+        return [(0, _MINUTES_PER_DAY)]
+    windows = pickup_hours.get(_DAY_KEYS[weekday], pickup_hours.get(str(weekday))) or []
+    parsed = []
+    for window in windows:
+        if isinstance(window, dict):
+            window = (window.get("start"), window.get("end"))
+        try:
+            start, end = (_parse_minutes(value) for value in window)
+        except (TypeError, ValueError):
+            continue
+        parsed.append((start, end if end > start else _MINUTES_PER_DAY))
+    return sorted(parsed)
+
+
+def slot_settings(restaurant_id) -> dict | None:
+    """Pickup hours, prep time and per-slot capacity from the restaurant's configuration.
+
+    ``throttles`` may set ``pickup_slot_minutes`` and ``max_orders_per_slot``; without a
+    capacity slots are unlimited but still counted.
+    """
+
+    def load():
+        restaurant = db.session.get(Restaurant, restaurant_id)
+        if not restaurant:
+            return None
+        config = restaurant.configuration
+        order_types = restaurant.order_type_configuration
+        throttles = (config.throttles if config else None) or {}
+        prep_minutes = (order_types.prep_time_pickup_minutes if order_types else 0) or (
+            config.prep_time_minutes if config else 0
+        )
+        return {
+            "supports_pickup": order_types.supports_pickup if order_types else True,
+            "pickup_hours": (order_types.pickup_hours if order_types else None) or {},
+            "prep_minutes": prep_minutes or 0,
+            "slot_minutes": int(throttles.get("pickup_slot_minutes") or DEFAULT_SLOT_MINUTES),
+            "capacity": throttles.get("max_orders_per_slot"),
+        }
+
+    return cache.get_or_set(
+        f"restaurant:{restaurant_id}:pickup-settings", load, tags=[f"restaurant:{restaurant_id}"]
+    )
+
+
+def day_slots(settings: dict, day: date) -> list[tuple[datetime, datetime]]:
+    tz = _tz()
+    step = settings["slot_minutes"]
+    midnight = datetime.combine(day, time(), tzinfo=tz)
+    slots = []
+    for start, end in pickup_windows(settings["pickup_hours"], day.weekday()):
+        for minute in range(start, end - step + 1, step):
+            slot_start = midnight + timedelta(minutes=minute)
+            slots.append((slot_start, slot_start + timedelta(minutes=step)))
+    return slots
+
+
+def _reserved_counts(restaurant_id, slots) -> dict[datetime, int]:
+    if not slots:
+        return {}
+    rows = (
+        db.session.query(PickupSlotCounter.slot_start, PickupSlotCounter.reserved)
+        .filter(
+            PickupSlotCounter.restaurant_id == restaurant_id,
+            PickupSlotCounter.slot_start >= slots[0][0],
+            PickupSlotCounter.slot_start <= slots[-1][0],
+        )
+        .all()
+    )
+    return {slot_start: reserved for slot_start, reserved in rows}
+
+
+def _open_slots(restaurant_id, settings: dict, day: date, now: datetime):
+    earliest = now + timedelta(minutes=settings["prep_minutes"])
+    slots = [slot for slot in day_slots(settings, day) if slot[0] >= earliest]
+    return slots, _reserved_counts(restaurant_id, slots)
+
+
+def list_pickup_slots(restaurant_id, settings: dict, day: date, now: datetime) -> list[dict]:
+    slots, counts = _open_slots(restaurant_id, settings, day, now)
+    capacity = settings["capacity"]
+    results = []
+    for slot_start, slot_end in slots:
+        reserved = counts.get(slot_start, 0)
+        remaining = max(0, capacity - reserved) if capacity is not None else None
+        results.append(
+            {
+                "start": slot_start.isoformat(),
+                "end": slot_end.isoformat(),
+                "capacity": capacity,
+                "remaining": remaining,
+                "available": remaining is None or remaining > 0,
+            }
+        )
+    return results
+
+
+def reserve_pickup_slot(restaurant_id, slot_start: datetime, capacity: int | None) -> bool:
+    if capacity is not None and capacity <= 0:
+        return False
+    table = PickupSlotCounter.__table__
+    stmt = insert(table).values(
+        id=uuid.uuid4(), restaurant_id=restaurant_id, slot_start=slot_start, reserved=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_pickup_slot_counters_slot",
+        set_={"reserved": table.c.reserved + 1, "updated_at": func.now()},
+        where=table.c.reserved < capacity if capacity is not None else None,
+    )
+    return db.session.execute(stmt).rowcount == 1
+
+
+def release_pickup_slot(restaurant_id, slot_start: datetime) -> None:
+    table = PickupSlotCounter.__table__
+    db.session.execute(
+        update(table)
+        .where(
+            table.c.restaurant_id == restaurant_id,
+            table.c.slot_start == slot_start,
+            table.c.reserved > 0,
+        )
+        .values(reserved=table.c.reserved - 1, updated_at=func.now())
+    )
+
+
+def assign_pickup_slot(
+    restaurant_id, requested: datetime, now: datetime, allow_reassign: bool = True
+) -> tuple[tuple[datetime, datetime] | None, str | None, datetime | None]:
+    """Reserve the slot covering ``requested`` or, if allowed, the next slot with room that day.
+
+    Returns ``(slot, None, None)`` on success or ``(None, reason, next_available_start)``.
+    """
+    settings = slot_settings(restaurant_id)
+    if not settings or not settings["supports_pickup"]:
+        return None, PICKUP_UNSUPPORTED, None
+    slots, counts = _open_slots(restaurant_id, settings, local_date(requested), now)
+    capacity = settings["capacity"]
+    candidates = [slot for slot in slots if slot[1] > requested]
+    if not candidates:
+        return None, OUTSIDE_HOURS, None
+
+    requested_slot = candidates[0]
+    if requested_slot[0] > requested and not allow_reassign:
+        return None, OUTSIDE_HOURS, requested_slot[0]
+    for slot in candidates if allow_reassign else candidates[:1]:
+        # Counts are only a hint to skip known-full slots; the upsert is the real check.
+        if capacity is not None and counts.get(slot[0], 0) >= capacity:
+            continue
+        if reserve_pickup_slot(restaurant_id, slot[0], capacity):
+            return slot, None, None
+    next_available = None
+    if not allow_reassign:
+        next_available = next(
+            (
+                slot[0]
+                for slot in candidates[1:]
+                if capacity is None or counts.get(slot[0], 0) < capacity
+            ),
+            None,
+        )
+    return None, SLOT_FULL, next_available
@@ -0,0 +1,181 @@
+import math
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import case, func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import insert
+
+from ..extensions import db
+from ..models import (
+    Order,
+    OrderStatus,
+    Rating,
+    RatingTarget,
+    Restaurant,
+    RestaurantLike,
+    RestaurantPopularity,
+)
+
+# An event of weight w at time t is worth w * 2 ** (-(now - t) / half_life). Decay shrinks
+# every restaurant by the same factor, so ranking only needs sum(w * exp((t - EPOCH) / tau))
+# with tau = half_life / ln 2. Its log is what gets stored: it never overflows and never
+# needs rewriting as time passes.
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+ORDER_WEIGHT = 1.0
+LIKE_WEIGHT = 3.0
+# Per star, so a one-star rating barely registers.
+RATING_WEIGHT_PER_STAR = 0.4
+
+SCORES = {"popular": "popular_score", "trending": "trending_score"}
+UNCOUNTED_ORDER_STATUSES = (OrderStatus.CREATED, OrderStatus.CANCELLED, OrderStatus.REFUNDED)
+
+
+def _tau_seconds(half_life_hours: float) -> float:
+    return half_life_hours * 3600 / math.log(2)
+
+
+def _half_lives() -> dict[str, float]:
+    config = current_app.config
+    return {
+        "popular_score": config["POPULARITY_HALF_LIFE_HOURS"],
+        "trending_score": config["TRENDING_HALF_LIFE_HOURS"],
+    }
+
+
+def event_score(weight: float, at: datetime, half_life_hours: float) -> float:
+    return math.log(weight) + (at - EPOCH).total_seconds() / _tau_seconds(half_life_hours)
+
+
+def _log_add(current, added):
+    high = func.greatest(current, added)
+    low = func.least(current, added)
+    return case((current.is_(None), added), else_=high + func.ln(1 + func.exp(low - high)))
+
+
+def record_event(restaurant_id, weight: float, at: datetime | None = None) -> None:
+    """Fold one event into the restaurant's scores, in the caller's transaction."""
+    at = at or datetime.now(tz=timezone.utc)
+    table = RestaurantPopularity.__table__
+    scores = {
+        column: event_score(weight, at, half_life) for column, half_life in _half_lives().items()
+    }
+    stmt = insert(table).values(id=uuid.uuid4(), restaurant_id=restaurant_id, **scores)
+    set_ = {column: _log_add(table.c[column], stmt.excluded[column]) for column in scores}
+    set_["updated_at"] = func.now()
+    db.session.execute(
+        stmt.on_conflict_do_update(constraint="uq_restaurant_popularity_restaurant", set_=set_)
+    )
+
+
+def record_order_placed(order: Order) -> None:
+    record_event(order.restaurant_id, ORDER_WEIGHT, order.placed_at)
+
+
+def record_like(restaurant_id) -> None:
+    record_event(restaurant_id, LIKE_WEIGHT)
+
+
+def record_rating(restaurant_id, stars: int) -> None:
+    record_event(restaurant_id, RATING_WEIGHT_PER_STAR * stars)
+
+
+def ensure_popularity(restaurant_id) -> None:
+    """Give a new restaurant its (empty) row so popularity sorts can inner-join it."""
+    db.session.execute(
+        insert(RestaurantPopularity.__table__)
+        .values(id=uuid.uuid4(), restaurant_id=restaurant_id)
+        .on_conflict_do_nothing(constraint="uq_restaurant_popularity_restaurant")
+    )
+
+
+def events_select(since: datetime, restaurant_id=None):
+    orders = select(
+        Order.restaurant_id.label("restaurant_id"),
+        Order.placed_at.label("at"),
+        literal(ORDER_WEIGHT).label("weight"),
+    ).where(Order.placed_at >= since, Order.status.notin_(UNCOUNTED_ORDER_STATUSES))
+    likes = select(
+        RestaurantLike.restaurant_id, RestaurantLike.created_at, literal(LIKE_WEIGHT)
+    ).where(RestaurantLike.created_at >= since)
+    ratings = select(
+        Rating.target_id, Rating.created_at, Rating.stars * RATING_WEIGHT_PER_STAR
+    ).where(Rating.target_type == RatingTarget.RESTAURANT, Rating.created_at >= since)
+    if restaurant_id is not None:
+        orders = orders.where(Order.restaurant_id == restaurant_id)
+        likes = likes.where(RestaurantLike.restaurant_id == restaurant_id)
+        ratings = ratings.where(Rating.target_id == restaurant_id)
+    return union_all(orders, likes, ratings).subquery("events")
+
+
+def scores_select(since: datetime, restaurant_id=None):
+    """Stored scores per restaurant from events since ``since``, via log-sum-exp."""
+    events = events_select(since, restaurant_id)
+    exponents = {
+        column: func.ln(events.c.weight)
+        + (func.extract("epoch", events.c.at) - EPOCH.timestamp()) / _tau_seconds(half_life)
+        for column, half_life in _half_lives().items()
+    }
+    columns = [events.c.restaurant_id]
+    for column, exponent in exponents.items():
+        columns.append(exponent.label(column))
+        columns.append(
+            func.max(exponent).over(partition_by=events.c.restaurant_id).label(f"{column}_max")
+        )
+    scored = select(*columns).subquery("scored")
+    return (
+        select(
+            scored.c.restaurant_id,
+            *[
+                (
+                    func.max(scored.c[f"{column}_max"])
+                    + func.ln(func.sum(func.exp(scored.c[column] - scored.c[f"{column}_max"])))
+                ).label(column)
+                for column in exponents
+            ],
+        )
+        .group_by(scored.c.restaurant_id)
+        .subquery("totals")
+    )
+
+
+def recompute(restaurant_id=None, now: datetime | None = None) -> int:
+    """Rebuild scores from the last ``POPULARITY_LOOKBACK_DAYS`` of events in one statement.
+
+    This also drops unlikes, deleted ratings and cancelled orders, which increments cannot
+    take back. Restaurants without recent events are reset to NULL. Increments racing the
+    statement may be overwritten; the next run picks them up from the source tables.
+    """
+    now = now or datetime.now(tz=timezone.utc)
+    since = now - timedelta(days=current_app.config["POPULARITY_LOOKBACK_DAYS"])
+    totals = scores_select(since, restaurant_id)
+    rows = (
+        select(
+            func.gen_random_uuid(),
+            Restaurant.id,
+            totals.c.popular_score,
+            totals.c.trending_score,
+            literal(now),
+        )
+        .select_from(Restaurant)
+        .outerjoin(totals, totals.c.restaurant_id == Restaurant.id)
+    )
+    if restaurant_id is not None:
+        rows = rows.where(Restaurant.id == restaurant_id)
+    table = RestaurantPopularity.__table__
+    stmt = insert(table).from_select(
+        ["id", "restaurant_id", "popular_score", "trending_score", "recomputed_at"], rows
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_restaurant_popularity_restaurant",
+        set_={
+            "popular_score": stmt.excluded.popular_score,
+            "trending_score": stmt.excluded.trending_score,
+            "recomputed_at": stmt.excluded.recomputed_at,
+            "updated_at": func.now(),
+        },
+    )
+    count = db.session.execute(stmt).rowcount
+    db.session.commit()
+    return count
@@ -0,0 +1,104 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from ..extensions import cache, db
+from ..models import OrderType, PrepTimeEstimate, Restaurant
+
+MIN_SAMPLES = 3
+MAX_SAMPLE_MINUTES = 240
+ESTIMATES_TTL = 60
+
+
+def hour_of_week(at: datetime) -> int:
+    local = at.astimezone(ZoneInfo(current_app.config["AVAILABILITY_TIMEZONE"]))
+    return local.weekday() * 24 + local.hour
+
+
+def _estimates_key(restaurant_id) -> str:
+    return f"prep-times:{restaurant_id}"
+
+
+def record_prep_time(restaurant_id, confirmed_at: datetime, ready_at: datetime) -> None:
+    """Fold one CONFIRMED -> READY duration into the restaurant's hour-of-week average.
+
+    The update is a single upsert; early samples use ``1 / n`` so the average warms up
+    quickly before settling to ``PREP_TIME_EMA_ALPHA``.
+    """
+    minutes = (ready_at - confirmed_at).total_seconds() / 60
+    if minutes <= 0 or minutes > MAX_SAMPLE_MINUTES:
+        return
+    alpha = current_app.config["PREP_TIME_EMA_ALPHA"]
+    table = PrepTimeEstimate.__table__
+    weight = func.greatest(alpha, 1.0 / (table.c.samples + 1))
+    stmt = insert(table).values(
+        id=uuid.uuid4(),
+        restaurant_id=restaurant_id,
+        hour_of_week=hour_of_week(confirmed_at),
+        ema_minutes=minutes,
+        samples=1,
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_prep_time_estimates_hour",
+        set_={
+            "ema_minutes": table.c.ema_minutes + weight * (minutes - table.c.ema_minutes),
+            "samples": table.c.samples + 1,
+            "updated_at": func.now(),
+        },
+    )
+    db.session.execute(stmt)
+    cache.delete(_estimates_key(restaurant_id))
+
+
+def _load_estimates(restaurant_id) -> dict:
+    restaurant = db.session.get(Restaurant, restaurant_id)
+    if not restaurant:
+        return {}
+    config = restaurant.configuration
+    order_types = restaurant.order_type_configuration
+    rows = (
+        db.session.query(
+            PrepTimeEstimate.hour_of_week, PrepTimeEstimate.ema_minutes, PrepTimeEstimate.samples
+        )
+        .filter(
+            PrepTimeEstimate.restaurant_id == restaurant_id,
+            PrepTimeEstimate.samples >= MIN_SAMPLES,
+        )
+        .all()
+    )
+    return {
+        "configured": {
+            None: (config.prep_time_minutes if config else 0) or 0,
+            OrderType.PICKUP.value: order_types and order_types.prep_time_pickup_minutes,
+            OrderType.DELIVERY.value: order_types and order_types.prep_time_delivery_minutes,
+        },
+        "hours": {hour: (ema, samples) for hour, ema, samples in rows},
+    }
+
+
+def estimate_prep_minutes(
+    restaurant_id, at: datetime | None = None, order_type: OrderType | None = None
+) -> dict:
+    """Learned prep time for the hour of week, falling back to the configured minutes."""
+    at = at or datetime.now(tz=timezone.utc)
+    estimates = cache.get_or_set(
+        _estimates_key(restaurant_id), lambda: _load_estimates(restaurant_id), ttl=ESTIMATES_TTL
+    )
+    if not estimates:
+        return {"minutes": 0, "source": "configured", "samples": 0}
+    learned = estimates["hours"].get(hour_of_week(at))
+    if learned:
+        return {"minutes": round(learned[0]), "source": "history", "samples": learned[1]}
+    configured = estimates["configured"]
+    minutes = configured.get(order_type.value if order_type else None) or configured[None]
+    return {"minutes": minutes, "source": "configured", "samples": 0}
+
+
+def estimated_ready_at(order, at: datetime | None = None) -> datetime:
+    at = at or datetime.now(tz=timezone.utc)
+    estimate = estimate_prep_minutes(order.restaurant_id, at, order.order_type)
+    return at + timedelta(minutes=estimate["minutes"])
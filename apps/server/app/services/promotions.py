@@ -0,0 +1,360 @@
+import uuid
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import func, or_
+
+from ..extensions import cache, db
+from ..model_helpers import normalize_lower
+from ..models import Coupon, Promotion, PromotionCondition, PromotionScope, PromotionType
+from .cart_totals import CartLines
+
+PROMOTIONS_TAG = "promotions"
+_MAX_COMPILED = 4096
+
+# Compiled evaluators are closures, which cannot be pickled into shared or Redis backends,
+# so the cache holds plain snapshots and each process memoizes the compiled form.
+_compiled: dict[str, tuple[dict, Callable[[dict, float], int]]] = {}
+_active_index: tuple[str, "PromotionIndex"] | None = None
+
+
+def _epoch(dt):
+    return dt.timestamp() if dt else None
+
+
+def promotion_snapshot(promo: Promotion, coupon: Coupon | None = None, conditions=()) -> dict:
+    user_ids = {
+        str(user_id)
+        for condition in conditions
+        for user_id in (condition.rules or {}).get("user_ids") or ()
+    }
+    return {
+        "id": str(promo.id),
+        "code": promo.code,
+        "code_normalized": promo.code_normalized,
+        "name": promo.name,
+        "type": promo.type.value if promo.type else None,
+        "scope": promo.scope.value if promo.scope else None,
+        "min_order_cents": promo.min_order_cents or 0,
+        "rules": dict(promo.rules or {}),
+        "starts_at": _epoch(promo.starts_at),
+        "ends_at": _epoch(promo.ends_at),
+        "is_active": bool(promo.is_active and promo.deleted_at is None),
+        "updated_at": _epoch(promo.updated_at),
+        "coupon_id": str(coupon.id) if coupon else None,
+        "max_redemptions": coupon.max_redemptions if coupon else None,
+        "per_customer_limit": coupon.per_customer_limit if coupon else None,
+        "user_ids": sorted(user_ids) or None,
+    }
+
+
+def _load_snapshot(promo: Promotion | None) -> dict:
+    if not promo:
+        return {}
+    # Redemption limits live on the active coupon sharing the promotion's code.
+    coupon = (
+        db.session.query(Coupon)
+        .filter(func.lower(Coupon.code) == promo.code_normalized, Coupon.is_active.is_(True))
+        .first()
+    )
+    return promotion_snapshot(promo, coupon, promo.conditions)
+
+
+def get_promotion_by_code(code: str | None) -> dict | None:
+    """Return the cached snapshot for a promo code, or None when no promotion uses it.
+
+    Unknown codes are cached too (as an empty snapshot) because promo pushes retry them.
+    """
+    normalized = normalize_lower(code)
+    if not normalized:
+        return None
+
+    def load():
+        return _load_snapshot(
+            db.session.query(Promotion).filter_by(code_normalized=normalized).first()
+        )
+
+    return cache.get_or_set(f"promo:code:{normalized}", load, tags=[PROMOTIONS_TAG]) or None
+
+
+def get_promotion(promotion_id) -> dict | None:
+    return (
+        cache.get_or_set(
+            f"promo:id:{promotion_id}",
+            lambda: _load_snapshot(db.session.get(Promotion, promotion_id)),
+            tags=[PROMOTIONS_TAG],
+        )
+        or None
+    )
+
+
+def invalidate_promotions() -> None:
+    cache.delete_tag(PROMOTIONS_TAG)
+
+
+def _load_active_snapshots() -> list[dict]:
+    promos = (
+        db.session.query(Promotion)
+        .filter(
+            Promotion.is_active.is_(True),
+            Promotion.deleted_at.is_(None),
+            or_(Promotion.ends_at.is_(None), Promotion.ends_at > func.now()),
+        )
+        .all()
+    )
+    if not promos:
+        return []
+    conditions = defaultdict(list)
+    for condition in (
+        db.session.query(PromotionCondition)
+        .filter(PromotionCondition.promotion_id.in_([promo.id for promo in promos]))
+        .all()
+    ):
+        conditions[condition.promotion_id].append(condition)
+    coupons = {
+        coupon.code.lower(): coupon
+        for coupon in db.session.query(Coupon)
+        .filter(
+            func.lower(Coupon.code).in_({promo.code_normalized for promo in promos}),
+            Coupon.is_active.is_(True),
+        )
+        .all()
+    }
+    return [
+        promotion_snapshot(promo, coupons.get(promo.code_normalized), conditions[promo.id])
+        for promo in promos
+    ]
+
+
+class _Bucket:
+    """Snapshots ordered by min_order_cents so candidates are a bisected prefix."""
+
+    __slots__ = ("minimums", "snapshots")
+
+    def __init__(self, snapshots):
+        snapshots = sorted(snapshots, key=lambda snapshot: snapshot["min_order_cents"])
+        self.snapshots = snapshots
+        self.minimums = [snapshot["min_order_cents"] for snapshot in snapshots]
+
+    def upto(self, subtotal_cents: int) -> list[dict]:
+        return self.snapshots[: bisect_right(self.minimums, subtotal_cents)]
+
+
+class PromotionIndex:
+    """Auto-apply and user-targeted promotions bucketed by restaurant, scope target and user.
+
+    Promotions with ``rules.auto_apply`` and no targeting conditions are offered to everyone.
+    Promotions whose ``PromotionCondition`` rules list ``user_ids`` are offered only to those
+    users. Code-only promotions are never offered.
+    """
+
+    def __init__(self, snapshots):
+        public = []
+        by_restaurant = defaultdict(list)
+        by_item = defaultdict(list)
+        by_category = defaultdict(list)
+        by_user = defaultdict(list)
+        for snapshot in snapshots:
+            rules = snapshot["rules"]
+            if snapshot["user_ids"]:
+                for user_id in snapshot["user_ids"]:
+                    by_user[user_id].append(snapshot)
+            elif not rules.get("auto_apply"):
+                continue
+            elif snapshot["scope"] == PromotionScope.RESTAURANT.value:
+                for restaurant_id in rules.get("restaurant_ids") or ():
+                    by_restaurant[str(restaurant_id)].append(snapshot)
+            elif snapshot["scope"] == PromotionScope.ITEM.value and (
+                rules.get("menu_item_ids") or rules.get("category_ids")
+            ):
+                for menu_item_id in rules.get("menu_item_ids") or ():
+                    by_item[str(menu_item_id)].append(snapshot)
+                for category_id in rules.get("category_ids") or ():
+                    by_category[str(category_id)].append(snapshot)
+            else:
+                public.append(snapshot)
+        self.public = _Bucket(public)
+        self.by_restaurant = {key: _Bucket(value) for key, value in by_restaurant.items()}
+        self.by_item = {key: _Bucket(value) for key, value in by_item.items()}
+        self.by_category = {key: _Bucket(value) for key, value in by_category.items()}
+        self.by_user = {key: _Bucket(value) for key, value in by_user.items()}
+
+    def candidates(self, lines: CartLines, subtotal_cents: int, user_id=None) -> list[dict]:
+        buckets = [self.public, self.by_restaurant.get(lines.restaurant_id)]
+        buckets.extend(self.by_item.get(menu_item_id) for menu_item_id in lines.by_item)
+        buckets.extend(self.by_category.get(category_id) for category_id in lines.by_category)
+        if user_id is not None:
+            buckets.append(self.by_user.get(str(user_id)))
+        found = {}
+        for bucket in buckets:
+            if bucket is not None:
+                for snapshot in bucket.upto(subtotal_cents):
+                    found[snapshot["id"]] = snapshot
+        return list(found.values())
+
+
+def get_promotion_index() -> PromotionIndex:
+    global _active_index
+    # A small version key guards the large snapshot list, so each process only
+    # rebuilds its index after invalidate_promotions() or expiry.
+    version = cache.get_or_set(
+        "promo:active:version", lambda: uuid.uuid4().hex, ttl=300, tags=[PROMOTIONS_TAG]
+    )
+    current = _active_index
+    if current is not None and current[0] == version:
+        return current[1]
+    snapshots = cache.get_or_set(
+        f"promo:active:{version}", _load_active_snapshots, ttl=300, tags=[PROMOTIONS_TAG]
+    )
+    index = PromotionIndex(snapshots or [])
+    _active_index = (version, index)
+    return index
+
+
+def _targeted_lines(lines: CartLines, item_ids: frozenset, category_ids: frozenset):
+    if not item_ids and not category_ids:
+        return range(len(lines))
+    # Walk whichever side is smaller: the cart's lines or the promotion's target ids.
+    if len(item_ids) + len(category_ids) > len(lines):
+        return [
+            index
+            for index in range(len(lines))
+            if lines.menu_item_ids[index] in item_ids or lines.category_ids[index] in category_ids
+        ]
+    selected = set()
+    for menu_item_id in item_ids:
+        selected.update(lines.by_item.get(menu_item_id, ()))
+    for category_id in category_ids:
+        selected.update(lines.by_category.get(category_id, ()))
+    return sorted(selected)
+
+
+def _bogo_discount(lines: CartLines, indexes, buy_qty: int, get_qty: int, percent: float) -> int:
+    """Buy ``buy_qty`` get ``get_qty`` at ``percent`` off, discounting the cheapest units."""
+    units = sum(lines.quantities[index] for index in indexes)
+    free_units = (units // (buy_qty + get_qty)) * get_qty
+    discount = 0
+    for index in sorted(indexes, key=lines.unit_prices.__getitem__):
+        if free_units <= 0:
+            break
+        taken = min(free_units, lines.quantities[index])
+        discount += taken * lines.unit_prices[index]
+        free_units -= taken
+    return int(discount * (percent / 100.0))
+
+
+def _type_evaluator(promo_type: str | None, rules: dict) -> Callable[[CartLines, list, dict], int]:
+    if promo_type == PromotionType.PERCENT.value:
+        percent = rules.get("percent", 0)
+        cap = rules.get("max_discount_cents")
+
+        def percent_off(lines, indexes, totals):
+            base = sum(lines.line_total(index) for index in indexes)
+            discount = int(base * (percent / 100.0))
+            return min(discount, cap) if cap is not None else discount
+
+        return percent_off
+    if promo_type == PromotionType.FIXED.value:
+        amount = rules.get("amount_cents", 0)
+        return lambda lines, indexes, totals: min(
+            sum(lines.line_total(index) for index in indexes), amount
+        )
+    if promo_type == PromotionType.FREE_DELIVERY.value:
+        return lambda lines, indexes, totals: totals["fee_cents"] if indexes else 0
+    if promo_type == PromotionType.BOGO.value:
+        buy_qty = max(1, int(rules.get("buy_qty", 1)))
+        get_qty = max(1, int(rules.get("get_qty", 1)))
+        percent = rules.get("percent", 100)
+        return lambda lines, indexes, totals: _bogo_discount(
+            lines, indexes, buy_qty, get_qty, percent
+        )
+    return lambda lines, indexes, totals: 0
+
+
+def _id_set(rules: dict, key: str) -> frozenset:
+    return frozenset(str(value) for value in rules.get(key) or ())
+
+
+def compile_promotion(snapshot: dict) -> Callable[[CartLines, dict, float], int]:
+    """Compile a snapshot into ``evaluator(lines, totals, now) -> discount_cents``.
+
+    ORDER and GLOBAL promotions price the whole cart. RESTAURANT promotions require the cart's
+    restaurant to be in ``rules.restaurant_ids``. ITEM promotions price only the lines matching
+    ``rules.menu_item_ids`` or ``rules.category_ids``.
+    """
+    # The full snapshot is compared because updated_at alone can repeat within a second.
+    compiled = _compiled.get(snapshot["id"])
+    if compiled is not None and (compiled[0] is snapshot or compiled[0] == snapshot):
+        return compiled[1]
+
+    rules = snapshot["rules"]
+    scope = snapshot["scope"]
+    is_active = snapshot["is_active"]
+    starts_at = snapshot["starts_at"]
+    ends_at = snapshot["ends_at"]
+    min_order_cents = snapshot["min_order_cents"]
+    restaurant_ids = _id_set(rules, "restaurant_ids")
+    item_ids = category_ids = frozenset()
+    if scope == PromotionScope.ITEM.value:
+        item_ids = _id_set(rules, "menu_item_ids")
+        category_ids = _id_set(rules, "category_ids")
+    discount_for = _type_evaluator(snapshot["type"], rules)
+
+    def evaluator(lines: CartLines, totals: dict, now: float) -> int:
+        if not is_active:
+            return 0
+        if starts_at is not None and starts_at > now:
+            return 0
+        if ends_at is not None and ends_at < now:
+            return 0
+        if totals["subtotal_cents"] < min_order_cents:
+            return 0
+        if scope == PromotionScope.RESTAURANT.value and lines.restaurant_id not in restaurant_ids:
+            return 0
+        indexes = _targeted_lines(lines, item_ids, category_ids)
+        if not indexes:
+            return 0
+        discount = discount_for(lines, indexes, totals)
+        return max(0, min(discount, totals["subtotal_cents"] + totals["fee_cents"]))
+
+    if len(_compiled) >= _MAX_COMPILED:
+        _compiled.clear()
+    _compiled[snapshot["id"]] = (snapshot, evaluator)
+    return evaluator
+
+
+def evaluate_promotion(
+    snapshot: dict, lines: CartLines, totals: dict, now: datetime | None = None
+) -> int:
+    now = now or datetime.now(tz=timezone.utc)
+    return compile_promotion(snapshot)(lines, totals, now.timestamp())
+
+
+def best_promotion(
+    snapshots, lines: CartLines, totals: dict, now: datetime | None = None
+) -> tuple[dict | None, int]:
+    """Price every candidate against the same cart lines and return the largest discount."""
+    now = (now or datetime.now(tz=timezone.utc)).timestamp()
+    best, best_discount = None, 0
+    for snapshot in snapshots:
+        discount = compile_promotion(snapshot)(lines, totals, now)
+        if discount > best_discount:
+            best, best_discount = snapshot, discount
+    return best, best_discount
+
+
+def eligible_promotions(
+    lines: CartLines, totals: dict, user_id=None, now: datetime | None = None
+) -> list[tuple[dict, int]]:
+    """Return ``(snapshot, discount_cents)`` for every applicable promotion, best first."""
+    now = (now or datetime.now(tz=timezone.utc)).timestamp()
+    candidates = get_promotion_index().candidates(lines, totals["subtotal_cents"], user_id)
+    ranked = []
+    for snapshot in candidates:
+        discount = compile_promotion(snapshot)(lines, totals, now)
+        if discount > 0:
+            ranked.append((snapshot, discount))
+    ranked.sort(key=lambda entry: entry[1], reverse=True)
+    return ranked
@@ -0,0 +1,166 @@
+import uuid
+
+from sqlalchemy import Float, case, cast, delete, func, update
+from sqlalchemy.dialects.postgresql import insert
+
+from ..extensions import cache, db
+from ..models import (
+    CourierAssignment,
+    CourierAssignmentStatus,
+    DeliveryTask,
+    Order,
+    OrderItem,
+    OrderStatus,
+    Rating,
+    RatingAggregate,
+    RatingTarget,
+)
+from .popularity import record_rating
+
+MAX_STARS = 5
+RATEABLE_STATUSES = (OrderStatus.COMPLETED,)
+
+
+def rateable_targets(order: Order) -> set[tuple[RatingTarget, uuid.UUID]]:
+    """Everything the order's customer may rate: its restaurant, items and courier."""
+    targets = {(RatingTarget.RESTAURANT, order.restaurant_id)}
+    items = (
+        db.session.query(OrderItem.menu_item_id)
+        .filter(OrderItem.order_id == order.id, OrderItem.menu_item_id.isnot(None))
+        .distinct()
+    )
+    targets.update((RatingTarget.MENU_ITEM, menu_item_id) for (menu_item_id,) in items)
+    couriers = (
+        db.session.query(CourierAssignment.courier_id)
+        .join(DeliveryTask, DeliveryTask.id == CourierAssignment.delivery_task_id)
+        .filter(
+            DeliveryTask.order_id == order.id,
+            CourierAssignment.status == CourierAssignmentStatus.ACCEPTED,
+        )
+    )
+    targets.update((RatingTarget.COURIER, courier_id) for (courier_id,) in couriers)
+    return targets
+
+
+def _average(count, total):
+    return case((count > 0, cast(total, Float) / cast(count, Float)), else_=0.0)
+
+
+def _add_to_aggregate(target_type: RatingTarget, target_id, stars: int):
+    table = RatingAggregate.__table__
+    stmt = insert(table).values(
+        id=uuid.uuid4(),
+        target_type=target_type,
+        target_id=target_id,
+        ratings_count=1,
+        stars_sum=stars,
+        average_stars=float(stars),
+    )
+    count = table.c.ratings_count + 1
+    total = table.c.stars_sum + stmt.excluded.stars_sum
+    return stmt.on_conflict_do_update(
+        constraint="uq_rating_aggregates_target",
+        set_={
+            "ratings_count": count,
+            "stars_sum": total,
+            "average_stars": _average(count, total),
+            "updated_at": func.now(),
+        },
+    )
+
+
+def _remove_from_aggregate(target_type: RatingTarget, target_id, stars: int):
+    table = RatingAggregate.__table__
+    count = table.c.ratings_count - 1
+    total = table.c.stars_sum - stars
+    return (
+        update(table)
+        .where(table.c.target_type == target_type, table.c.target_id == target_id)
+        .values(
+            ratings_count=count,
+            stars_sum=total,
+            average_stars=_average(count, total),
+            updated_at=func.now(),
+        )
+    )
+
+
+def _invalidate(target_type: RatingTarget, target_id) -> None:
+    if target_type == RatingTarget.RESTAURANT:
+        cache.delete_tag(f"restaurant:{target_id}")
+
+
+def add_rating(
+    rater_id,
+    order_id,
+    target_type: RatingTarget,
+    target_id,
+    stars: int,
+    comment: str | None = None,
+    tags: list[str] | None = None,
+) -> uuid.UUID | None:
+    """Store a rating and fold it into the target's aggregate in the same transaction.
+
+    Returns the new rating id, or ``None`` when the rater already rated this target for
+    the order; the aggregate is only touched when a row was actually inserted.
+    """
+    table = Rating.__table__
+    rating_id = db.session.execute(
+        insert(table)
+        .values(
+            id=uuid.uuid4(),
+            rater_id=rater_id,
+            order_id=order_id,
+            target_type=target_type,
+            target_id=target_id,
+            stars=stars,
+            comment=comment,
+            tags=tags,
+        )
+        .on_conflict_do_nothing(constraint="uq_ratings_rater_order_target")
+        .returning(table.c.id)
+    ).scalar()
+    if rating_id is None:
+        db.session.rollback()
+        return None
+    db.session.execute(_add_to_aggregate(target_type, target_id, stars))
+    if target_type == RatingTarget.RESTAURANT:
+        record_rating(target_id, stars)
+    db.session.commit()
+    _invalidate(target_type, target_id)
+    return rating_id
+
+
+def remove_rating(rating_id) -> bool:
+    """Delete a rating and take it back out of its aggregate; ``False`` if already gone."""
+    table = Rating.__table__
+    removed = db.session.execute(
+        delete(table)
+        .where(table.c.id == rating_id)
+        .returning(table.c.target_type, table.c.target_id, table.c.stars)
+    ).first()
+    if removed is None:
+        db.session.rollback()
+        return False
+    target_type, target_id, stars = removed
+    db.session.execute(_remove_from_aggregate(target_type, target_id, stars))
+    db.session.commit()
+    _invalidate(target_type, target_id)
+    return True
+
+
+def ensure_aggregate(target_type: RatingTarget, target_id) -> None:
+    """Give a new target an empty aggregate so rating-sorted listings can inner-join it."""
+    db.session.execute(
+        insert(RatingAggregate.__table__)
+        .values(id=uuid.uuid4(), target_type=target_type, target_id=target_id)
+        .on_conflict_do_nothing(constraint="uq_rating_aggregates_target")
+    )
+
+
+def get_aggregate(target_type: RatingTarget, target_id) -> RatingAggregate | None:
+    return (
+        db.session.query(RatingAggregate)
+        .filter(RatingAggregate.target_type == target_type, RatingAggregate.target_id == target_id)
+        .first()
+    )
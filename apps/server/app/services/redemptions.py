@@ -0,0 +1,172 @@
+import random
+import uuid
+
+from flask import current_app
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from ..extensions import cache, db
+from ..models import CouponCustomerRedemption, CouponRedemptionCounter, PromotionRedemption
+
+MAX_REDEMPTIONS = "max_redemptions"
+PER_CUSTOMER_LIMIT = "per_customer_limit"
+
+
+def _shard_capacities(max_redemptions: int, shards: int) -> list[int]:
+    shards = max(1, min(shards, max_redemptions))
+    base, extra = divmod(max_redemptions, shards)
+    return [base + (1 if index < extra else 0) for index in range(shards)]
+
+
+def _ensure_counter_shards(coupon_id, max_redemptions: int) -> int:
+    """Make the coupon's counter shards add up to ``max_redemptions``; returns their count.
+
+    Shards are created on first use. When the promotion's limit has changed since, the
+    redemptions still available (the limit minus those already used) are spread over the
+    shards again, so a raised limit takes effect and a lowered one is never exceeded. This
+    runs on its own connection so it survives a checkout rollback, and is cached per limit
+    so it only happens again after the limit changes.
+    """
+    cache_key = f"coupon:{coupon_id}:shards:{max_redemptions}"
+    shards = cache.get(cache_key)
+    if shards:
+        return shards
+
+    wanted = max(1, min(current_app.config["COUPON_COUNTER_SHARDS"], max_redemptions))
+    table = CouponRedemptionCounter.__table__
+    with db.engine.begin() as connection:
+        connection.execute(
+            insert(table)
+            .values(
+                [
+                    {"id": uuid.uuid4(), "coupon_id": coupon_id, "shard": shard, "capacity": 0}
+                    for shard in range(wanted)
+                ]
+            )
+            .on_conflict_do_nothing(constraint="uq_coupon_redemption_counters_shard")
+        )
+        rows = connection.execute(
+            select(table.c.shard, table.c.capacity, table.c.used)
+            .where(table.c.coupon_id == coupon_id)
+            .order_by(table.c.shard)
+            .with_for_update()
+        ).all()
+        capacities = _rebalanced_capacities(rows, max_redemptions)
+        if capacities != [row.capacity for row in rows]:
+            connection.execute(
+                update(table)
+                .where(table.c.coupon_id == coupon_id, table.c.shard == bindparam("b_shard"))
+                .values(capacity=bindparam("b_capacity"), updated_at=func.now()),
+                [
+                    {"b_shard": row.shard, "b_capacity": capacity}
+                    for row, capacity in zip(rows, capacities)
+                ],
+            )
+    shards = len(rows)
+    cache.set(cache_key, shards, ttl=86400)
+    return shards
+
+
+def _rebalanced_capacities(rows, max_redemptions: int) -> list[int]:
+    """Capacities for ``rows`` (shards with ``capacity`` and ``used``) totalling the limit.
+
+    Kept as they are when they already add up; otherwise each shard keeps what it has used
+    and the remaining redemptions are split evenly over the shards.
+    """
+    if sum(row.capacity for row in rows) == max_redemptions:
+        return [row.capacity for row in rows]
+    remaining = max(0, max_redemptions - sum(row.used for row in rows))
+    shares = _shard_capacities(remaining, len(rows)) if remaining else []
+    shares += [0] * (len(rows) - len(shares))
+    return [row.used + share for row, share in zip(rows, shares)]
+
+
+def _reserve_customer_slot(coupon_id, customer_id, limit: int) -> bool:
+    if limit <= 0:
+        return False
+    table = CouponCustomerRedemption.__table__
+    stmt = insert(table).values(
+        id=uuid.uuid4(), coupon_id=coupon_id, customer_id=customer_id, used=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_coupon_customer_redemptions",
+        set_={"used": table.c.used + 1, "updated_at": func.now()},
+        where=table.c.used < limit,
+    )
+    return db.session.execute(stmt).rowcount == 1
+
+
+def _reserve_global_slot(coupon_id, max_redemptions: int) -> int | None:
+    if max_redemptions <= 0:
+        return None
+    shards = _ensure_counter_shards(coupon_id, max_redemptions)
+    table = CouponRedemptionCounter.__table__
+    # Starting at a random shard spreads row locks when a viral code is redeemed concurrently;
+    # the remaining shards are only visited once the first choice is exhausted.
+    start = random.randrange(shards)
+    for offset in range(shards):
+        shard = (start + offset) % shards
+        result = db.session.execute(
+            update(table)
+            .where(
+                table.c.coupon_id == coupon_id,
+                table.c.shard == shard,
+                table.c.used < table.c.capacity,
+            )
+            .values(used=table.c.used + 1, updated_at=func.now())
+        )
+        if result.rowcount == 1:
+            return shard
+    return None
+
+
+def reserve_redemption(promo: dict, customer_id) -> tuple[int | None, str | None]:
+    """Reserve one use of the promotion's coupon inside the caller's transaction.
+
+    Returns ``(counter_shard, None)`` on success or ``(None, limit_name)`` when a limit is
+    exhausted, in which case the caller must roll back.
+    """
+    coupon_id = promo.get("coupon_id")
+    if not coupon_id:
+        return None, None
+    coupon_id = uuid.UUID(coupon_id)
+
+    per_customer_limit = promo.get("per_customer_limit")
+    if per_customer_limit is not None and not _reserve_customer_slot(
+        coupon_id, customer_id, per_customer_limit
+    ):
+        return None, PER_CUSTOMER_LIMIT
+
+    max_redemptions = promo.get("max_redemptions")
+    if max_redemptions is None:
+        return None, None
+    shard = _reserve_global_slot(coupon_id, max_redemptions)
+    if shard is None:
+        return None, MAX_REDEMPTIONS
+    return shard, None
+
+
+def release_redemption(redemption: PromotionRedemption) -> None:
+    if redemption.coupon_id is None:
+        return
+    if redemption.counter_shard is not None:
+        counters = CouponRedemptionCounter.__table__
+        db.session.execute(
+            update(counters)
+            .where(
+                counters.c.coupon_id == redemption.coupon_id,
+                counters.c.shard == redemption.counter_shard,
+                counters.c.used > 0,
+            )
+            .values(used=counters.c.used - 1, updated_at=func.now())
+        )
+    customers = CouponCustomerRedemption.__table__
+    db.session.execute(
+        update(customers)
+        .where(
+            customers.c.coupon_id == redemption.coupon_id,
+            customers.c.customer_id == redemption.customer_id,
+            customers.c.used > 0,
+        )
+        .values(used=customers.c.used - 1, updated_at=func.now())
+    )
@@ -0,0 +1,296 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import case, func, insert, update
+from sqlalchemy.orm import aliased
+
+from ..extensions import db
+from ..models import (
+    Address,
+    CourierAssignment,
+    CourierAssignmentStatus,
+    CourierLatestLocation,
+    DeliveryTask,
+    DeliveryTaskStatus,
+    Order,
+    RoutePlan,
+)
+from .geo import distance_matrix_km
+
+PICKUP = "pickup"
+DROPOFF = "dropoff"
+ACTIVE = "active"
+SUPERSEDED = "superseded"
+
+ACTIVE_TASK_STATUSES = (DeliveryTaskStatus.ASSIGNED, DeliveryTaskStatus.PICKED_UP)
+LIVE_ASSIGNMENT_STATUSES = (CourierAssignmentStatus.OFFERED, CourierAssignmentStatus.ACCEPTED)
+
+# Minutes of travel a minute of lateness is worth when comparing routes.
+LATE_WEIGHT = 5.0
+_EPSILON = 1e-9
+
+
+def _simulate(route, travel, stops, service_minutes):
+    """Walk ``route`` from the start; returns ``(cost, arrivals, late_minutes)``.
+
+    Pickups wait until their ``ready`` minute; dropoffs past ``due`` are penalised.
+    A dropoff ahead of its pickup makes the route infeasible.
+    """
+    clock = 0.0
+    position = 0
+    late = 0.0
+    visited = set()
+    arrivals = []
+    for index in route:
+        stop = stops[index - 1]
+        pickup = stop["pickup"]
+        if pickup is not None and pickup not in visited:
+            return math.inf, arrivals, late
+        clock += travel[position][index]
+        if clock < stop["ready"]:
+            clock = stop["ready"]
+        arrivals.append(clock)
+        if stop["due"] is not None and clock > stop["due"]:
+            late += clock - stop["due"]
+        clock += service_minutes
+        visited.add(index)
+        position = index
+    return clock + LATE_WEIGHT * late, arrivals, late
+
+
+def _nearest_neighbour(travel, stops) -> list[int]:
+    remaining = set(range(1, len(stops) + 1))
+    route = []
+    position = 0
+    clock = 0.0
+    while remaining:
+        best, best_arrival = None, math.inf
+        for index in remaining:
+            pickup = stops[index - 1]["pickup"]
+            if pickup is not None and pickup in remaining:
+                continue
+            arrival = max(clock + travel[position][index], stops[index - 1]["ready"])
+            if arrival < best_arrival:
+                best, best_arrival = index, arrival
+        route.append(best)
+        remaining.discard(best)
+        position, clock = best, best_arrival
+    return route
+
+
+def _two_opt(route, travel, stops, service_minutes) -> list[int]:
+    """First-improvement 2-opt over the open path that starts at the courier.
+
+    Reversals are screened with the O(1) distance delta before the O(n) simulation
+    that checks precedence and time windows.
+    """
+    best_cost = _simulate(route, travel, stops, service_minutes)[0]
+    size = len(route)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(size - 1):
+            before = route[i - 1] if i else 0
+            first = route[i]
+            for k in range(i + 1, size):
+                last = route[k]
+                old_after = travel[last][route[k + 1]] if k + 1 < size else 0.0
+                new_after = travel[first][route[k + 1]] if k + 1 < size else 0.0
+                delta = travel[before][last] + new_after - travel[before][first] - old_after
+                if delta >= -_EPSILON:
+                    continue
+                candidate = route[:i] + route[i : k + 1][::-1] + route[k + 1 :]
+                cost = _simulate(candidate, travel, stops, service_minutes)[0]
+                if cost < best_cost - _EPSILON:
+                    route, best_cost = candidate, cost
+                    first = route[i]
+                    improved = True
+    return route
+
+
+def solve_route(
+    start: tuple[float, float], stops: list[dict], speed_kmh: float, service_minutes: float
+) -> dict:
+    """Order pickup and dropoff stops for one courier.
+
+    ``stops`` carry ``lat``, ``lng``, ``ready`` and ``due`` (minutes from now, ``due`` may be
+    ``None``) and ``pickup``: the 1-based index of the stop that must come first, or ``None``.
+    """
+    if not stops:
+        return {"route": [], "arrivals": [], "distance_km": 0.0, "late_minutes": 0.0}
+    distances = distance_matrix_km([start] + [(stop["lat"], stop["lng"]) for stop in stops])
+    minutes_per_km = 60.0 / speed_kmh
+    travel = [[km * minutes_per_km for km in row] for row in distances]
+    route = _two_opt(_nearest_neighbour(travel, stops), travel, stops, service_minutes)
+    _, arrivals, late = _simulate(route, travel, stops, service_minutes)
+    legs = zip([0] + route[:-1], route)
+    return {
+        "route": [index - 1 for index in route],
+        "arrivals": arrivals,
+        "distance_km": sum(distances[a][b] for a, b in legs),
+        "late_minutes": late,
+    }
+
+
+def _minutes_after(now: datetime, at: datetime | None) -> float:
+    return max(0.0, (at - now).total_seconds() / 60) if at else 0.0
+
+
+def _task_stops(tasks: list[dict], now: datetime, promise_minutes: int) -> list[dict]:
+    stops = []
+    for task in tasks:
+        due_at = (task["placed_at"] or now) + timedelta(minutes=promise_minutes)
+        due = (due_at - now).total_seconds() / 60
+        pickup = None
+        if task["status"] != DeliveryTaskStatus.PICKED_UP:
+            stops.append(
+                {
+                    "task": task,
+                    "kind": PICKUP,
+                    "lat": task["pickup"][0],
+                    "lng": task["pickup"][1],
+                    "ready": _minutes_after(now, task["ready_at"]),
+                    "due": None,
+                    "pickup": None,
+                }
+            )
+            pickup = len(stops)
+        if task["dropoff"] is not None:
+            stops.append(
+                {
+                    "task": task,
+                    "kind": DROPOFF,
+                    "lat": task["dropoff"][0],
+                    "lng": task["dropoff"][1],
+                    "ready": 0.0,
+                    "due": due,
+                    "pickup": pickup,
+                }
+            )
+    return stops
+
+
+def _load_courier_tasks(courier_ids) -> dict:
+    pickup = aliased(Address)
+    dropoff = aliased(Address)
+    rows = (
+        db.session.query(
+            CourierAssignment.courier_id,
+            DeliveryTask.id,
+            DeliveryTask.order_id,
+            DeliveryTask.restaurant_id,
+            DeliveryTask.status,
+            Order.estimated_ready_at,
+            Order.placed_at,
+            pickup.latitude,
+            pickup.longitude,
+            dropoff.latitude,
+            dropoff.longitude,
+        )
+        .join(DeliveryTask, DeliveryTask.id == CourierAssignment.delivery_task_id)
+        .join(Order, Order.id == DeliveryTask.order_id)
+        .join(pickup, pickup.id == DeliveryTask.pickup_address_id)
+        .outerjoin(dropoff, dropoff.id == DeliveryTask.dropoff_address_id)
+        .filter(
+            CourierAssignment.courier_id.in_(courier_ids),
+            CourierAssignment.status.in_(LIVE_ASSIGNMENT_STATUSES),
+            DeliveryTask.status.in_(ACTIVE_TASK_STATUSES),
+            pickup.latitude.isnot(None),
+        )
+        .all()
+    )
+    tasks: dict = {}
+    for row in rows:
+        courier_id, task_id, order_id, restaurant_id, status, ready_at, placed_at = row[:7]
+        pick_lat, pick_lng, drop_lat, drop_lng = row[7:]
+        tasks.setdefault(courier_id, []).append(
+            {
+                "id": task_id,
+                "order_id": order_id,
+                "restaurant_id": restaurant_id,
+                "status": status,
+                "ready_at": ready_at,
+                "placed_at": placed_at,
+                "pickup": (float(pick_lat), float(pick_lng)),
+                "dropoff": (float(drop_lat), float(drop_lng)) if drop_lat is not None else None,
+            }
+        )
+    return tasks
+
+
+def plan_routes(courier_ids, now: datetime | None = None) -> int:
+    """Replace the active RoutePlan of each courier and refresh task ETAs to match.
+
+    All couriers are loaded with two queries and written with one insert and two updates.
+    """
+    courier_ids = list(courier_ids)
+    if not courier_ids:
+        return 0
+    now = now or datetime.now(tz=timezone.utc)
+    config = current_app.config
+    tasks_by_courier = _load_courier_tasks(courier_ids)
+    positions = {
+        courier_id: (float(lat), float(lng))
+        for courier_id, lat, lng in db.session.query(
+            CourierLatestLocation.courier_id,
+            CourierLatestLocation.latitude,
+            CourierLatestLocation.longitude,
+        )
+        .filter(CourierLatestLocation.courier_id.in_(courier_ids))
+        .all()
+    }
+    plans = []
+    etas = {}
+    for courier_id, tasks in tasks_by_courier.items():
+        stops = _task_stops(tasks, now, config["DELIVERY_PROMISE_MINUTES"])
+        start = positions.get(courier_id) or (stops[0]["lat"], stops[0]["lng"])
+        solution = solve_route(
+            start, stops, config["DISPATCH_COURIER_SPEED_KMH"], config["ROUTE_STOP_SERVICE_MINUTES"]
+        )
+        sequence = []
+        for index, arrival in zip(solution["route"], solution["arrivals"]):
+            stop = stops[index]
+            eta = now + timedelta(minutes=arrival)
+            if stop["kind"] == DROPOFF:
+                etas[stop["task"]["id"]] = eta
+            sequence.append(
+                {
+                    "delivery_task_id": str(stop["task"]["id"]),
+                    "order_id": str(stop["task"]["order_id"]),
+                    "kind": stop["kind"],
+                    "latitude": stop["lat"],
+                    "longitude": stop["lng"],
+                    "eta": eta.isoformat(),
+                }
+            )
+        restaurants = {task["restaurant_id"] for task in tasks}
+        plans.append(
+            {
+                "courier_id": courier_id,
+                "restaurant_id": restaurants.pop() if len(restaurants) == 1 else None,
+                "status": ACTIVE,
+                "metadata_json": {
+                    "stops": sequence,
+                    "distance_km": round(solution["distance_km"], 3),
+                    "late_minutes": round(solution["late_minutes"], 1),
+                    "computed_at": now.isoformat(),
+                },
+            }
+        )
+    db.session.execute(
+        update(RoutePlan)
+        .where(RoutePlan.courier_id.in_(courier_ids), RoutePlan.status == ACTIVE)
+        .values(status=SUPERSEDED, updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    if plans:
+        db.session.execute(insert(RoutePlan), plans)
+    if etas:
+        db.session.execute(
+            update(DeliveryTask)
+            .where(DeliveryTask.id.in_(list(etas)))
+            .values(eta=case(etas, value=DeliveryTask.id), updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+    return len(plans)
@@ -0,0 +1,343 @@
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from flask import current_app
+from sqlalchemy import delete, func, literal, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from ..extensions import db
+from ..models import MenuItemSalesRollup, Order, OrderItem, OrderStatus, RestaurantSalesRollup
+
+HOUR = "hour"
+DAY = "day"
+GRANULARITIES = (HOUR, DAY)
+
+ROLLUP_COLUMNS = (
+    "orders_count",
+    "completed_count",
+    "cancelled_count",
+    "gross_cents",
+    "cancelled_cents",
+)
+ITEM_COLUMNS = ("quantity", "revenue_cents", "cancelled_quantity", "cancelled_cents")
+
+
+def _zone() -> ZoneInfo:
+    return ZoneInfo(current_app.config["AVAILABILITY_TIMEZONE"])
+
+
+def local_today() -> date:
+    return datetime.now(tz=_zone()).date()
+
+
+def day_bounds(day: date) -> tuple[datetime, datetime]:
+    """Start and end of a local (``AVAILABILITY_TIMEZONE``) calendar day."""
+    zone = _zone()
+    return (
+        datetime.combine(day, time(), tzinfo=zone),
+        datetime.combine(day + timedelta(days=1), time(), tzinfo=zone),
+    )
+
+
+def buckets_for(at: datetime) -> tuple[dict, date]:
+    """Hour and day bucket starts for ``at``, plus its local calendar day."""
+    local = at.astimezone(_zone())
+    day = local.date()
+    return {HOUR: local.replace(minute=0, second=0, microsecond=0), DAY: day_bounds(day)[0]}, day
+
+
+def order_deltas(order: Order, to_status: OrderStatus) -> dict | None:
+    if to_status == OrderStatus.CONFIRMED:
+        return {"orders_count": 1, "gross_cents": order.total_cents}
+    if to_status == OrderStatus.COMPLETED:
+        return {"completed_count": 1}
+    if to_status == OrderStatus.CANCELLED:
+        return {"cancelled_count": 1, "cancelled_cents": order.total_cents}
+    return None
+
+
+def _upsert(table, rows: list[dict], constraint: str, columns, replace=()):
+    stmt = insert(table).values(rows)
+    set_ = {column: table.c[column] + stmt.excluded[column] for column in columns}
+    set_.update({column: stmt.excluded[column] for column in replace})
+    set_["updated_at"] = func.now()
+    return stmt.on_conflict_do_update(constraint=constraint, set_=set_)
+
+
+def _item_rows(order: Order, to_status: OrderStatus, day: date) -> list[dict]:
+    lines = (
+        db.session.query(
+            OrderItem.menu_item_id,
+            OrderItem.name_snapshot,
+            OrderItem.quantity,
+            OrderItem.total_price_cents,
+        )
+        .filter(OrderItem.order_id == order.id, OrderItem.menu_item_id.isnot(None))
+        .all()
+    )
+    quantity_column, cents_column = (
+        ("quantity", "revenue_cents")
+        if to_status == OrderStatus.CONFIRMED
+        else ("cancelled_quantity", "cancelled_cents")
+    )
+    rows: dict = {}
+    for menu_item_id, name, quantity, cents in lines:
+        row = rows.setdefault(
+            menu_item_id,
+            {
+                "id": uuid.uuid4(),
+                "restaurant_id": order.restaurant_id,
+                "menu_item_id": menu_item_id,
+                "day": day,
+                "name": name,
+                **dict.fromkeys(ITEM_COLUMNS, 0),
+            },
+        )
+        row[quantity_column] += quantity
+        row[cents_column] += cents
+    # A fixed row order keeps concurrent upserts from deadlocking each other.
+    return [rows[key] for key in sorted(rows, key=str)]
+
+
+def record_order_event(order: Order, to_status: OrderStatus) -> None:
+    """Fold one order transition into the hourly, daily and per-item rollups.
+
+    Runs in the caller's transaction so the rollups commit with the status change.
+    Everything is bucketed by ``placed_at``; orders that were never confirmed have
+    none and are not counted.
+    """
+    deltas = order_deltas(order, to_status)
+    if deltas is None or order.placed_at is None:
+        return
+    buckets, day = buckets_for(order.placed_at)
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "restaurant_id": order.restaurant_id,
+            "granularity": granularity,
+            "bucket_start": start,
+            **{column: deltas.get(column, 0) for column in ROLLUP_COLUMNS},
+        }
+        for granularity, start in buckets.items()
+    ]
+    db.session.execute(
+        _upsert(
+            RestaurantSalesRollup.__table__,
+            rows,
+            "uq_restaurant_sales_rollups_bucket",
+            ROLLUP_COLUMNS,
+        )
+    )
+    if to_status == OrderStatus.COMPLETED:
+        return
+    items = _item_rows(order, to_status, day)
+    if items:
+        db.session.execute(
+            _upsert(
+                MenuItemSalesRollup.__table__,
+                items,
+                "uq_menu_item_sales_rollups_day",
+                ITEM_COLUMNS,
+                replace=("name",),
+            )
+        )
+
+
+def _orders_in(start: datetime, end: datetime, restaurant_id=None) -> list:
+    conditions = [Order.placed_at >= start, Order.placed_at < end]
+    if restaurant_id is not None:
+        conditions.append(Order.restaurant_id == restaurant_id)
+    return conditions
+
+
+def restaurant_rollup_select(granularity: str, start: datetime, end: datetime, restaurant_id=None):
+    zone = current_app.config["AVAILABILITY_TIMEZONE"]
+    if granularity == HOUR:
+        local_hour = func.date_trunc("hour", func.timezone(zone, Order.placed_at))
+        bucket = func.timezone(zone, local_hour)
+    else:
+        bucket = literal(start)
+    orders = (
+        select(
+            Order.restaurant_id,
+            Order.status,
+            Order.total_cents,
+            bucket.label("bucket_start"),
+        )
+        .where(*_orders_in(start, end, restaurant_id))
+        .subquery()
+    )
+    completed = orders.c.status == OrderStatus.COMPLETED
+    cancelled = orders.c.status == OrderStatus.CANCELLED
+    return select(
+        func.gen_random_uuid(),
+        orders.c.restaurant_id,
+        literal(granularity),
+        orders.c.bucket_start,
+        func.count(),
+        func.count().filter(completed),
+        func.count().filter(cancelled),
+        func.coalesce(func.sum(orders.c.total_cents), 0),
+        func.coalesce(func.sum(orders.c.total_cents).filter(cancelled), 0),
+    ).group_by(orders.c.restaurant_id, orders.c.bucket_start)
+
+
+def item_rollup_select(day: date, start: datetime, end: datetime, restaurant_id=None):
+    cancelled = Order.status == OrderStatus.CANCELLED
+    return (
+        select(
+            func.gen_random_uuid(),
+            Order.restaurant_id,
+            OrderItem.menu_item_id,
+            literal(day),
+            func.max(OrderItem.name_snapshot),
+            func.sum(OrderItem.quantity),
+            func.sum(OrderItem.total_price_cents),
+            func.coalesce(func.sum(OrderItem.quantity).filter(cancelled), 0),
+            func.coalesce(func.sum(OrderItem.total_price_cents).filter(cancelled), 0),
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(*_orders_in(start, end, restaurant_id), OrderItem.menu_item_id.isnot(None))
+        .group_by(Order.restaurant_id, OrderItem.menu_item_id)
+    )
+
+
+def backfill_day(day: date, restaurant_id=None) -> None:
+    """Rebuild one local day of rollups from ``orders`` and ``order_items``.
+
+    The rollup tables are locked against incremental writers for the (short)
+    transaction so a live upsert cannot land between the delete and the insert.
+    """
+    start, end = day_bounds(day)
+    db.session.execute(
+        text(
+            "LOCK TABLE restaurant_sales_rollups, menu_item_sales_rollups "
+            "IN SHARE ROW EXCLUSIVE MODE"
+        )
+    )
+    rollups = delete(RestaurantSalesRollup).where(
+        RestaurantSalesRollup.bucket_start >= start, RestaurantSalesRollup.bucket_start < end
+    )
+    items = delete(MenuItemSalesRollup).where(MenuItemSalesRollup.day == day)
+    if restaurant_id is not None:
+        rollups = rollups.where(RestaurantSalesRollup.restaurant_id == restaurant_id)
+        items = items.where(MenuItemSalesRollup.restaurant_id == restaurant_id)
+    db.session.execute(rollups)
+    db.session.execute(items)
+    rollup_columns = ["id", "restaurant_id", "granularity", "bucket_start", *ROLLUP_COLUMNS]
+    for granularity in GRANULARITIES:
+        db.session.execute(
+            insert(RestaurantSalesRollup.__table__).from_select(
+                rollup_columns, restaurant_rollup_select(granularity, start, end, restaurant_id)
+            )
+        )
+    db.session.execute(
+        insert(MenuItemSalesRollup.__table__).from_select(
+            ["id", "restaurant_id", "menu_item_id", "day", "name", *ITEM_COLUMNS],
+            item_rollup_select(day, start, end, restaurant_id),
+        )
+    )
+    db.session.commit()
+
+
+def backfill(first: date, last: date, restaurant_id=None) -> int:
+    """Rebuild every day from ``first`` to ``last`` inclusive, one transaction per day."""
+    days = 0
+    day = first
+    while day <= last:
+        backfill_day(day, restaurant_id)
+        day += timedelta(days=1)
+        days += 1
+    return days
+
+
+def _metrics(counts: dict) -> dict:
+    net_orders = counts["orders_count"] - counts["cancelled_count"]
+    net_cents = counts["gross_cents"] - counts["cancelled_cents"]
+    return {
+        "orders": counts["orders_count"],
+        "completed_orders": counts["completed_count"],
+        "cancelled_orders": counts["cancelled_count"],
+        "gross_cents": counts["gross_cents"],
+        "net_cents": net_cents,
+        "average_ticket_cents": round(net_cents / net_orders) if net_orders > 0 else 0,
+    }
+
+
+def bucket_starts(first: date, last: date, granularity: str) -> list[datetime]:
+    if granularity == DAY:
+        return [day_bounds(first + timedelta(days=n))[0] for n in range((last - first).days + 1)]
+    # Step in UTC so DST changes neither skip nor repeat an hour.
+    current = day_bounds(first)[0].astimezone(timezone.utc)
+    end = day_bounds(last)[1].astimezone(timezone.utc)
+    starts = []
+    while current < end:
+        starts.append(current)
+        current += timedelta(hours=1)
+    return starts
+
+
+def sales_report(restaurant_id, first: date, last: date, granularity: str, top: int = 10) -> dict:
+    """Series, totals and top items for local days ``first`` to ``last``, read from rollups."""
+    start, _ = day_bounds(first)
+    _, end = day_bounds(last)
+    rows = (
+        db.session.query(
+            RestaurantSalesRollup.bucket_start,
+            *(getattr(RestaurantSalesRollup, column) for column in ROLLUP_COLUMNS),
+        )
+        .filter(
+            RestaurantSalesRollup.restaurant_id == restaurant_id,
+            RestaurantSalesRollup.granularity == granularity,
+            RestaurantSalesRollup.bucket_start >= start,
+            RestaurantSalesRollup.bucket_start < end,
+        )
+        .all()
+    )
+    by_start = {row[0]: dict(zip(ROLLUP_COLUMNS, row[1:])) for row in rows}
+    empty = dict.fromkeys(ROLLUP_COLUMNS, 0)
+    totals = dict(empty)
+    series = []
+    for bucket_start in bucket_starts(first, last, granularity):
+        counts = by_start.get(bucket_start, empty)
+        for column in ROLLUP_COLUMNS:
+            totals[column] += counts[column]
+        series.append({"start": bucket_start.isoformat(), **_metrics(counts)})
+
+    net_cents = func.sum(MenuItemSalesRollup.revenue_cents - MenuItemSalesRollup.cancelled_cents)
+    net_quantity = func.sum(MenuItemSalesRollup.quantity - MenuItemSalesRollup.cancelled_quantity)
+    items = (
+        db.session.query(
+            MenuItemSalesRollup.menu_item_id,
+            func.max(MenuItemSalesRollup.name),
+            net_quantity,
+            net_cents,
+        )
+        .filter(
+            MenuItemSalesRollup.restaurant_id == restaurant_id,
+            MenuItemSalesRollup.day >= first,
+            MenuItemSalesRollup.day <= last,
+        )
+        .group_by(MenuItemSalesRollup.menu_item_id)
+        .order_by(net_cents.desc())
+        .limit(top)
+        .all()
+    )
+    return {
+        "granularity": granularity,
+        "from": first.isoformat(),
+        "to": last.isoformat(),
+        "timezone": current_app.config["AVAILABILITY_TIMEZONE"],
+        "totals": _metrics(totals),
+        "buckets": series,
+        "top_items": [
+            {
+                "menu_item_id": str(menu_item_id),
+                "name": name,
+                "quantity": int(quantity),
+                "revenue_cents": int(cents),
+            }
+            for menu_item_id, name, quantity, cents in items
+        ],
+    }
@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+from flask import current_app
+
+from .courier_locations import latest_location
+
+logger = logging.getLogger(__name__)
+
+
+class _Channel:
+    def __init__(self, key, courier_id, initial):
+        self.key = key
+        self.courier_id = courier_id
+        self.subscribers = 0
+        self.position = initial
+        self.version = 1 if initial is not None else 0
+        self.changed = threading.Condition()
+
+
+class Subscription:
+    def __init__(self, hub: "TrackingHub", channel: _Channel):
+        self._hub = hub
+        self._channel = channel
+        self._seen = 0
+
+    def wait(self, timeout: float) -> Any:
+        """Block until the position changes; returns it, or ``None`` after ``timeout``."""
+        channel = self._channel
+        with channel.changed:
+            if channel.version == self._seen:
+                channel.changed.wait(timeout)
+            if channel.version == self._seen:
+                return None
+            self._seen = channel.version
+            return channel.position
+
+    def close(self) -> None:
+        self._hub._release(self._channel)
+
+
+class TrackingHub:
+    """Per-process fan-out of courier positions to live tracking streams.
+
+    Every delivery task being watched gets one poller thread, however many viewers
+    it has. The poller reads ``loader(courier_id)`` every ``interval`` seconds,
+    which caps the push rate, and exits when the last viewer disconnects.
+    """
+
+    def __init__(self, loader: Callable[[Any], Any], interval: float):
+        self._loader = loader
+        self._interval = interval
+        self._channels: dict = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, key, courier_id, initial=None) -> Subscription:
+        with self._lock:
+            channel = self._channels.get(key)
+            if channel is None or channel.courier_id != courier_id:
+                channel = _Channel(key, courier_id, initial)
+                self._channels[key] = channel
+                threading.Thread(
+                    target=self._poll, args=(channel,), name=f"tracking-{key}", daemon=True
+                ).start()
+            channel.subscribers += 1
+        return Subscription(self, channel)
+
+    def viewers(self, key) -> int:
+        with self._lock:
+            channel = self._channels.get(key)
+            return channel.subscribers if channel else 0
+
+    def _release(self, channel: _Channel) -> None:
+        with self._lock:
+            channel.subscribers -= 1
+            if channel.subscribers <= 0 and self._channels.get(channel.key) is channel:
+                del self._channels[channel.key]
+
+    def _poll(self, channel: _Channel) -> None:
+        while True:
+            with self._lock:
+                if channel.subscribers <= 0:
+                    return
+            try:
+                position = self._loader(channel.courier_id)
+            except Exception:
+                logger.exception("Tracking poll failed for %s", channel.key)
+                position = None
+            if position is not None and position != channel.position:
+                with channel.changed:
+                    channel.position = position
+                    channel.version += 1
+                    channel.changed.notify_all()
+            time.sleep(self._interval)
+
+
+_hub: TrackingHub | None = None
+_hub_lock = threading.Lock()
+
+
+def get_hub() -> TrackingHub:
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                app = current_app._get_current_object()
+
+                def loader(courier_id):
+                    # The cache may be per process, so a miss falls back to the courier's
+                    # row in courier_latest_locations: one primary-key read per interval.
+                    with app.app_context():
+                        return latest_location(courier_id)
+
+                _hub = TrackingHub(loader, app.config["TRACKING_PUSH_INTERVAL_SECONDS"])
+    return _hub
@@ -0,0 +1,50 @@
+"""add export jobs
+
+Revision ID: 0a6c4e2b9d57
+Revises: f5b2d8e6a931
+Create Date: 2026-10-19 19:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0a6c4e2b9d57"
+down_revision = "f5b2d8e6a931"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "export_jobs",
+        sa.Column("requested_by_id", sa.UUID(), nullable=False),
+        sa.Column("dataset", sa.String(length=32), nullable=False),
+        sa.Column("format", sa.String(length=16), nullable=False),
+        sa.Column("filters", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rows_exported", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("chunks_written", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("bytes_written", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("cursor", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("manifest", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["requested_by_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_export_jobs_requested_by_id", "export_jobs", ["requested_by_id"])
+    op.create_index("ix_export_jobs_status_created_at", "export_jobs", ["status", "created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_export_jobs_status_created_at", table_name="export_jobs")
+    op.drop_index("ix_export_jobs_requested_by_id", table_name="export_jobs")
+    op.drop_table("export_jobs")
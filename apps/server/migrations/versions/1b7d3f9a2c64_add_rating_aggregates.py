@@ -0,0 +1,73 @@
+"""add rating aggregates
+
+Revision ID: 1b7d3f9a2c64
+Revises: 0a6c4e2b9d57
+Create Date: 2026-10-19 20:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "1b7d3f9a2c64"
+down_revision = "0a6c4e2b9d57"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE rating_target ADD VALUE IF NOT EXISTS 'MENU_ITEM'")
+
+    op.create_unique_constraint(
+        "uq_ratings_rater_order_target",
+        "ratings",
+        ["rater_id", "order_id", "target_type", "target_id"],
+    )
+    op.create_table(
+        "rating_aggregates",
+        sa.Column(
+            "target_type",
+            postgresql.ENUM(name="rating_target", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("target_id", sa.UUID(), nullable=False),
+        sa.Column("ratings_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("stars_sum", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("average_stars", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("target_type", "target_id", name="uq_rating_aggregates_target"),
+    )
+    op.create_index(
+        "ix_rating_aggregates_rank",
+        "rating_aggregates",
+        ["target_type", sa.text("average_stars DESC"), sa.text("ratings_count DESC"), "target_id"],
+    )
+    op.execute(
+        """
+        INSERT INTO rating_aggregates (id, target_type, target_id, ratings_count, stars_sum, average_stars)
+        SELECT gen_random_uuid(), target_type, target_id, count(*), sum(stars), avg(stars)
+        FROM ratings
+        GROUP BY target_type, target_id
+        """
+    )
+    # Rating-sorted listings inner-join restaurants to their aggregate.
+    op.execute(
+        """
+        INSERT INTO rating_aggregates (id, target_type, target_id)
+        SELECT gen_random_uuid(), 'RESTAURANT', id FROM restaurants
+        ON CONFLICT ON CONSTRAINT uq_rating_aggregates_target DO NOTHING
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("ix_rating_aggregates_rank", table_name="rating_aggregates")
+    op.drop_table("rating_aggregates")
+    op.drop_constraint("uq_ratings_rater_order_target", "ratings", type_="unique")
+    # Postgres cannot drop an enum value; MENU_ITEM stays on rating_target.
@@ -0,0 +1,56 @@
+"""add restaurant popularity
+
+Revision ID: 2c8e4a6b1f73
+Revises: 1b7d3f9a2c64
+Create Date: 2026-10-19 20:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "2c8e4a6b1f73"
+down_revision = "1b7d3f9a2c64"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "restaurant_popularity",
+        sa.Column("restaurant_id", sa.UUID(), nullable=False),
+        sa.Column("popular_score", sa.Float(), nullable=True),
+        sa.Column("trending_score", sa.Float(), nullable=True),
+        sa.Column("recomputed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["restaurant_id"], ["restaurants.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("restaurant_id", name="uq_restaurant_popularity_restaurant"),
+    )
+    op.create_index(
+        "ix_restaurant_popularity_popular",
+        "restaurant_popularity",
+        [sa.text("popular_score DESC NULLS LAST"), "restaurant_id"],
+    )
+    op.create_index(
+        "ix_restaurant_popularity_trending",
+        "restaurant_popularity",
+        [sa.text("trending_score DESC NULLS LAST"), "restaurant_id"],
+    )
+    # Popularity sorts inner-join restaurants to their row; scores are filled by the first
+    # `flask popularity recompute` run.
+    op.execute(
+        """
+        INSERT INTO restaurant_popularity (id, restaurant_id)
+        SELECT gen_random_uuid(), id FROM restaurants
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("ix_restaurant_popularity_trending", table_name="restaurant_popularity")
+    op.drop_index("ix_restaurant_popularity_popular", table_name="restaurant_popularity")
+    op.drop_table("restaurant_popularity")
@@ -0,0 +1,83 @@
+"""add coupon redemption counters
+
+Revision ID: 3c7e91a4d5b0
+Revises: 8b2f3c9a1d2e
+Create Date: 2026-10-19 09:12:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3c7e91a4d5b0"
+down_revision = "8b2f3c9a1d2e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "coupon_redemption_counters",
+        sa.Column("coupon_id", sa.UUID(), nullable=False),
+        sa.Column("shard", sa.SmallInteger(), nullable=False),
+        sa.Column("capacity", sa.Integer(), nullable=False),
+        sa.Column("used", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.CheckConstraint("used <= capacity", name="ck_coupon_redemption_counters_capacity"),
+        sa.ForeignKeyConstraint(["coupon_id"], ["coupons.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("coupon_id", "shard", name="uq_coupon_redemption_counters_shard"),
+    )
+    op.create_index(
+        "ix_coupon_redemption_counters_coupon_id", "coupon_redemption_counters", ["coupon_id"]
+    )
+
+    op.create_table(
+        "coupon_customer_redemptions",
+        sa.Column("coupon_id", sa.UUID(), nullable=False),
+        sa.Column("customer_id", sa.UUID(), nullable=False),
+        sa.Column("used", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["coupon_id"], ["coupons.id"]),
+        sa.ForeignKeyConstraint(["customer_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("coupon_id", "customer_id", name="uq_coupon_customer_redemptions"),
+    )
+    op.create_index(
+        "ix_coupon_customer_redemptions_coupon_id", "coupon_customer_redemptions", ["coupon_id"]
+    )
+    op.create_index(
+        "ix_coupon_customer_redemptions_customer_id", "coupon_customer_redemptions", ["customer_id"]
+    )
+
+    op.add_column("promotion_redemptions", sa.Column("coupon_id", sa.UUID(), nullable=True))
+    op.add_column("promotion_redemptions", sa.Column("counter_shard", sa.SmallInteger(), nullable=True))
+    op.create_index("ix_promotion_redemptions_coupon_id", "promotion_redemptions", ["coupon_id"])
+    op.create_foreign_key(
+        "fk_promotion_redemptions_coupon_id_coupons",
+        "promotion_redemptions",
+        "coupons",
+        ["coupon_id"],
+        ["id"],
+    )
+
+
+def downgrade():
+    op.drop_constraint(
+        "fk_promotion_redemptions_coupon_id_coupons", "promotion_redemptions", type_="foreignkey"
+    )
+    op.drop_index("ix_promotion_redemptions_coupon_id", table_name="promotion_redemptions")
+    op.drop_column("promotion_redemptions", "counter_shard")
+    op.drop_column("promotion_redemptions", "coupon_id")
+
+    op.drop_index("ix_coupon_customer_redemptions_customer_id", table_name="coupon_customer_redemptions")
+    op.drop_index("ix_coupon_customer_redemptions_coupon_id", table_name="coupon_customer_redemptions")
+    op.drop_table("coupon_customer_redemptions")
+
+    op.drop_index("ix_coupon_redemption_counters_coupon_id", table_name="coupon_redemption_counters")
+    op.drop_table("coupon_redemption_counters")
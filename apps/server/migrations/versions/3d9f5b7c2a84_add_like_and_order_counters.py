@@ -0,0 +1,64 @@
+"""add like and order counters
+
+Revision ID: 3d9f5b7c2a84
+Revises: 2c8e4a6b1f73
+Create Date: 2026-10-19 21:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3d9f5b7c2a84"
+down_revision = "2c8e4a6b1f73"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_counters",
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("orders_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("likes_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", name="uq_user_counters_user"),
+    )
+    op.create_table(
+        "restaurant_counters",
+        sa.Column("restaurant_id", sa.UUID(), nullable=False),
+        sa.Column("likes_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["restaurant_id"], ["restaurants.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("restaurant_id", name="uq_restaurant_counters_restaurant"),
+    )
+    op.execute(
+        """
+        INSERT INTO user_counters (id, user_id, orders_count, likes_count)
+        SELECT gen_random_uuid(), users.id,
+               (SELECT count(*) FROM orders WHERE orders.customer_id = users.id),
+               (SELECT count(*) FROM restaurant_likes WHERE restaurant_likes.user_id = users.id)
+        FROM users
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO restaurant_counters (id, restaurant_id, likes_count)
+        SELECT gen_random_uuid(), restaurant_id, count(*)
+        FROM restaurant_likes
+        GROUP BY restaurant_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("restaurant_counters")
+    op.drop_table("user_counters")
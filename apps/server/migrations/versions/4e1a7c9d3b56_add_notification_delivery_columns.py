@@ -0,0 +1,48 @@
+"""add notification delivery columns
+
+Revision ID: 4e1a7c9d3b56
+Revises: 3d9f5b7c2a84
+Create Date: 2026-10-19 21:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4e1a7c9d3b56"
+down_revision = "3d9f5b7c2a84"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Columns and indexes on the partitioned parent cascade to every partition.
+    op.add_column("notifications", sa.Column("coalesce_key", sa.String(length=128), nullable=True))
+    op.add_column(
+        "notifications", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0")
+    )
+    op.add_column(
+        "notifications",
+        sa.Column(
+            "next_attempt_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+    op.add_column("notifications", sa.Column("last_error", sa.Text(), nullable=True))
+    op.create_index(
+        "ix_notifications_pending_due",
+        "notifications",
+        ["next_attempt_at"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_notifications_pending_due", table_name="notifications")
+    op.drop_column("notifications", "last_error")
+    op.drop_column("notifications", "next_attempt_at")
+    op.drop_column("notifications", "attempts")
+    op.drop_column("notifications", "coalesce_key")
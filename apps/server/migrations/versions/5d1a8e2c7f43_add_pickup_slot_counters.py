@@ -0,0 +1,39 @@
+"""add pickup slot counters
+
+Revision ID: 5d1a8e2c7f43
+Revises: 3c7e91a4d5b0
+Create Date: 2026-10-19 11:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5d1a8e2c7f43"
+down_revision = "3c7e91a4d5b0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "pickup_slot_counters",
+        sa.Column("restaurant_id", sa.UUID(), nullable=False),
+        sa.Column("slot_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("reserved", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["restaurant_id"], ["restaurants.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("restaurant_id", "slot_start", name="uq_pickup_slot_counters_slot"),
+    )
+    op.create_index(
+        "ix_pickup_slot_counters_restaurant_id", "pickup_slot_counters", ["restaurant_id"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_pickup_slot_counters_restaurant_id", table_name="pickup_slot_counters")
+    op.drop_table("pickup_slot_counters")
@@ -0,0 +1,44 @@
+"""add prep time estimates
+
+Revision ID: 7e4b0c9d2a16
+Revises: 5d1a8e2c7f43
+Create Date: 2026-10-19 13:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "7e4b0c9d2a16"
+down_revision = "5d1a8e2c7f43"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "prep_time_estimates",
+        sa.Column("restaurant_id", sa.UUID(), nullable=False),
+        sa.Column("hour_of_week", sa.SmallInteger(), nullable=False),
+        sa.Column("ema_minutes", sa.Float(), nullable=False),
+        sa.Column("samples", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["restaurant_id"], ["restaurants.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("restaurant_id", "hour_of_week", name="uq_prep_time_estimates_hour"),
+    )
+    op.create_index(
+        "ix_prep_time_estimates_restaurant_id", "prep_time_estimates", ["restaurant_id"]
+    )
+    op.add_column(
+        "orders", sa.Column("estimated_ready_at", sa.DateTime(timezone=True), nullable=True)
+    )
+
+
+def downgrade():
+    op.drop_column("orders", "estimated_ready_at")
+    op.drop_index("ix_prep_time_estimates_restaurant_id", table_name="prep_time_estimates")
+    op.drop_table("prep_time_estimates")
@@ -0,0 +1,60 @@
+"""add courier latest locations
+
+Revision ID: 9a3f6d1e8b27
+Revises: 7e4b0c9d2a16
+Create Date: 2026-10-19 14:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9a3f6d1e8b27"
+down_revision = "7e4b0c9d2a16"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "courier_latest_locations",
+        sa.Column("courier_id", sa.UUID(), nullable=False),
+        sa.Column("delivery_task_id", sa.UUID(), nullable=True),
+        sa.Column("latitude", sa.Numeric(9, 6), nullable=False),
+        sa.Column("longitude", sa.Numeric(9, 6), nullable=False),
+        sa.Column("recorded_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["courier_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["delivery_task_id"], ["delivery_tasks.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_courier_latest_locations_courier_id",
+        "courier_latest_locations",
+        ["courier_id"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_courier_latest_locations_delivery_task_id",
+        "courier_latest_locations",
+        ["delivery_task_id"],
+    )
+    op.create_index(
+        "ix_courier_location_updates_courier_recorded",
+        "courier_location_updates",
+        ["courier_id", "recorded_at"],
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "ix_courier_location_updates_courier_recorded", table_name="courier_location_updates"
+    )
+    op.drop_index(
+        "ix_courier_latest_locations_delivery_task_id", table_name="courier_latest_locations"
+    )
+    op.drop_index("ix_courier_latest_locations_courier_id", table_name="courier_latest_locations")
+    op.drop_table("courier_latest_locations")
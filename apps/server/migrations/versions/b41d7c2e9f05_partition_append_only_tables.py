@@ -0,0 +1,158 @@
+"""range partition append-only tables
+
+Revision ID: b41d7c2e9f05
+Revises: 9a3f6d1e8b27
+Create Date: 2026-10-19 16:05:00.000000
+
+Each table is renamed and attached as a ``<table>_p_legacy`` partition covering everything
+up to the end of its newest period, so existing rows are not copied. Later periods get
+their own partitions, a DEFAULT partition catches rows past the created horizon, and
+``flask partitions create`` keeps the horizon moving.
+"""
+from datetime import datetime, timedelta, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b41d7c2e9f05"
+down_revision = "9a3f6d1e8b27"
+branch_labels = None
+depends_on = None
+
+
+TABLES = {
+    "courier_location_updates": {
+        "column": "recorded_at",
+        "period": "day",
+        "ahead": 7,
+        "foreign_keys": [("courier_id", "users"), ("delivery_task_id", "delivery_tasks")],
+        "indexes": [
+            ("ix_courier_location_updates_courier", ["courier_id"]),
+            ("ix_courier_location_updates_courier_id", ["courier_id"]),
+            ("ix_courier_location_updates_delivery_task_id", ["delivery_task_id"]),
+            ("ix_courier_location_updates_courier_recorded", ["courier_id", "recorded_at"]),
+        ],
+        "brin": "ix_courier_location_updates_recorded_brin",
+    },
+    "order_status_history": {
+        "column": "created_at",
+        "period": "month",
+        "ahead": 2,
+        "foreign_keys": [("order_id", "orders"), ("actor_id", "users")],
+        "indexes": [
+            ("ix_order_status_history_actor_id", ["actor_id"]),
+            ("ix_order_status_history_order", ["order_id"]),
+            ("ix_order_status_history_order_id", ["order_id"]),
+        ],
+        "brin": "ix_order_status_history_created_brin",
+    },
+    "audit_logs": {
+        "column": "created_at",
+        "period": "month",
+        "ahead": 2,
+        "foreign_keys": [("actor_id", "users")],
+        "indexes": [
+            ("ix_audit_logs_actor_id", ["actor_id"]),
+            ("ix_audit_logs_entity", ["entity_type", "entity_id"]),
+        ],
+        "brin": "ix_audit_logs_created_brin",
+    },
+    "notifications": {
+        "column": "created_at",
+        "period": "month",
+        "ahead": 2,
+        "foreign_keys": [("user_id", "users")],
+        "indexes": [
+            ("ix_notifications_user_id", ["user_id"]),
+            ("ix_notifications_user_status", ["user_id", "status"]),
+        ],
+        "brin": "ix_notifications_created_brin",
+    },
+}
+
+
+def _period_start(at, period):
+    at = at.astimezone(timezone.utc)
+    if period == "day":
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return at.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_period(start, period):
+    if period == "day":
+        return start + timedelta(days=1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def _partition_name(table, start, period):
+    return f"{table}_p{start:%Y%m%d}" if period == "day" else f"{table}_p{start:%Y%m}"
+
+
+def _partition_table(table, spec):
+    column, period = spec["column"], spec["period"]
+    legacy = f"{table}_p_legacy"
+    bind = op.get_bind()
+
+    op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    op.execute(f"ALTER INDEX {table}_pkey RENAME TO {legacy}_pkey")
+    for name, _ in spec["indexes"]:
+        # Renamed rather than dropped: creating the same index on the parent attaches these.
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_legacy")
+
+    op.execute(
+        f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ({column})"
+    )
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {column})")
+    for fk_column, referred in spec["foreign_keys"]:
+        op.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {table}_{fk_column}_fkey "
+            f"FOREIGN KEY ({fk_column}) REFERENCES {referred} (id)"
+        )
+
+    newest = bind.execute(sa.text(f"SELECT max({column}) FROM {legacy}")).scalar()
+    now = datetime.now(tz=timezone.utc)
+    boundary = _next_period(_period_start(max(newest or now, now), period), period)
+    op.execute(
+        f"ALTER TABLE {table} ATTACH PARTITION {legacy} "
+        f"FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')"
+    )
+    start = boundary
+    for _ in range(spec["ahead"]):
+        end = _next_period(start, period)
+        op.execute(
+            f"CREATE TABLE {_partition_name(table, start, period)} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        start = end
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    for name, columns in spec["indexes"]:
+        op.create_index(name, table, columns, unique=False)
+    op.create_index(spec["brin"], table, [column], unique=False, postgresql_using="brin")
+
+
+def _unpartition_table(table, spec):
+    rebuilt = f"{table}_unpartitioned"
+    op.execute(f"CREATE TABLE {rebuilt} (LIKE {table} INCLUDING DEFAULTS)")
+    op.execute(f"INSERT INTO {rebuilt} SELECT * FROM {table}")
+    op.execute(f"DROP TABLE {table} CASCADE")
+    op.execute(f"ALTER TABLE {rebuilt} RENAME TO {table}")
+    op.create_primary_key(f"{table}_pkey", table, ["id"])
+    for fk_column, referred in spec["foreign_keys"]:
+        op.create_foreign_key(f"{table}_{fk_column}_fkey", table, referred, [fk_column], ["id"])
+    for name, columns in spec["indexes"]:
+        op.create_index(name, table, columns, unique=False)
+
+
+def upgrade():
+    for table, spec in TABLES.items():
+        _partition_table(table, spec)
+
+
+def downgrade():
+    for table, spec in TABLES.items():
+        _unpartition_table(table, spec)
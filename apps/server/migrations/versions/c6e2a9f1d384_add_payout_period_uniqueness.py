@@ -0,0 +1,25 @@
+"""add payout period uniqueness
+
+Revision ID: c6e2a9f1d384
+Revises: b41d7c2e9f05
+Create Date: 2026-10-19 17:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "c6e2a9f1d384"
+down_revision = "b41d7c2e9f05"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_unique_constraint(
+        "uq_payouts_restaurant_period", "payouts", ["restaurant_id", "start_at", "end_at"]
+    )
+
+
+def downgrade():
+    op.drop_constraint("uq_payouts_restaurant_period", "payouts", type_="unique")
@@ -0,0 +1,72 @@
+"""add sales rollups
+
+Revision ID: d7f1b3a8e452
+Revises: c6e2a9f1d384
+Create Date: 2026-10-19 18:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d7f1b3a8e452"
+down_revision = "c6e2a9f1d384"
+branch_labels = None
+depends_on = None
+
+
+def _base_columns():
+    return [
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    ]
+
+
+def upgrade():
+    op.create_table(
+        "restaurant_sales_rollups",
+        sa.Column("restaurant_id", sa.UUID(), nullable=False),
+        sa.Column("granularity", sa.String(length=8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("orders_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("cancelled_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("gross_cents", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("cancelled_cents", sa.BigInteger(), nullable=False, server_default="0"),
+        *_base_columns(),
+        sa.ForeignKeyConstraint(["restaurant_id"], ["restaurants.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "restaurant_id", "granularity", "bucket_start", name="uq_restaurant_sales_rollups_bucket"
+        ),
+    )
+    op.create_table(
+        "menu_item_sales_rollups",
+        sa.Column("restaurant_id", sa.UUID(), nullable=False),
+        sa.Column("menu_item_id", sa.UUID(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("name", sa.String(length=120), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("revenue_cents", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("cancelled_quantity", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("cancelled_cents", sa.BigInteger(), nullable=False, server_default="0"),
+        *_base_columns(),
+        sa.ForeignKeyConstraint(["restaurant_id"], ["restaurants.id"]),
+        sa.ForeignKeyConstraint(["menu_item_id"], ["menu_items.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("restaurant_id", "day", "menu_item_id", name="uq_menu_item_sales_rollups_day"),
+    )
+    op.create_index(
+        "ix_menu_item_sales_rollups_menu_item_id", "menu_item_sales_rollups", ["menu_item_id"]
+    )
+    # Backfills find the orders of a day by placed_at.
+    op.create_index("ix_orders_placed_at", "orders", ["placed_at"])
+
+
+def downgrade():
+    op.drop_index("ix_orders_placed_at", table_name="orders")
+    op.drop_index("ix_menu_item_sales_rollups_menu_item_id", table_name="menu_item_sales_rollups")
+    op.drop_table("menu_item_sales_rollups")
+    op.drop_table("restaurant_sales_rollups")
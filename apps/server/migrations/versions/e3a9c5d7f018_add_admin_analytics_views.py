@@ -0,0 +1,91 @@
+"""add admin analytics views
+
+Revision ID: e3a9c5d7f018
+Revises: d7f1b3a8e452
+Create Date: 2026-10-19 18:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e3a9c5d7f018"
+down_revision = "d7f1b3a8e452"
+branch_labels = None
+depends_on = None
+
+
+# Created empty: the first `flask analytics refresh` populates them, later runs
+# refresh concurrently, which needs the unique index on each view.
+VIEWS = {
+    "admin_daily_orders": (
+        """
+        SELECT (created_at AT TIME ZONE 'UTC')::date AS day,
+               status,
+               count(*) AS orders_count,
+               sum(total_cents)::bigint AS total_cents,
+               sum(discount_cents)::bigint AS discount_cents
+        FROM orders
+        GROUP BY 1, 2
+        """,
+        ["day", "status"],
+    ),
+    "admin_daily_signups": (
+        """
+        SELECT (created_at AT TIME ZONE 'UTC')::date AS day,
+               role,
+               count(*) AS users_count
+        FROM users
+        GROUP BY 1, 2
+        """,
+        ["day", "role"],
+    ),
+    "admin_daily_promo_costs": (
+        """
+        SELECT (coalesce(redeemed_at, created_at) AT TIME ZONE 'UTC')::date AS day,
+               promotion_id,
+               count(*) AS redemptions_count,
+               sum(discount_cents)::bigint AS discount_cents
+        FROM promotion_redemptions
+        WHERE status = 'APPLIED'
+        GROUP BY 1, 2
+        """,
+        ["day", "promotion_id"],
+    ),
+    "admin_daily_memberships": (
+        """
+        SELECT (started_at AT TIME ZONE 'UTC')::date AS day,
+               tier_id,
+               source,
+               count(*) AS started_count,
+               count(*) FILTER (WHERE status = 'ACTIVE') AS active_count
+        FROM customer_memberships
+        GROUP BY 1, 2, 3
+        """,
+        ["day", "tier_id", "source"],
+    ),
+}
+
+
+def upgrade():
+    op.create_table(
+        "analytics_refreshes",
+        sa.Column("view_name", sa.String(length=64), nullable=False),
+        sa.Column("refreshed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("duration_ms", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("view_name"),
+    )
+    for name, (query, key) in VIEWS.items():
+        op.execute(f"CREATE MATERIALIZED VIEW {name} AS {query} WITH NO DATA")
+        op.execute(f"CREATE UNIQUE INDEX uq_{name} ON {name} ({', '.join(key)})")
+
+
+def downgrade():
+    for name in reversed(list(VIEWS)):
+        op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {name}")
+    op.drop_table("analytics_refreshes")
@@ -0,0 +1,26 @@
+"""add redemption created_at index
+
+Revision ID: f5b2d8e6a931
+Revises: e3a9c5d7f018
+Create Date: 2026-10-19 19:20:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "f5b2d8e6a931"
+down_revision = "e3a9c5d7f018"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Date-filtered exports stream redemptions in created_at order.
+    op.create_index(
+        "ix_promo_redemptions_created_at", "promotion_redemptions", ["created_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_promo_redemptions_created_at", table_name="promotion_redemptions")
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
 import argparse
+import csv
+import io
+import json
 import random
+import uuid
 from datetime import datetime, timezone
+from enum import Enum
+from multiprocessing import Pool
 
 from faker import Faker
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 
 from app import create_app
 from app.extensions import db
@@ -26,8 +33,11 @@ from app.models import (
     PromotionScope,
     PromotionType,
     ChargeStatus,
+    RatingAggregate,
+    RatingTarget,
     Restaurant,
     RestaurantConfiguration,
+    RestaurantPopularity,
     RestaurantStaffRole,
     RestaurantStaffUser,
     RestaurantStatus,
@@ -36,6 +46,8 @@ from app.models import (
     User,
     UserRoleType,
 )
+from app.services.popularity import ensure_popularity
+from app.services.ratings import ensure_aggregate
 
 
 ROLE_DEFINITIONS = {
@@ -124,6 +136,8 @@ def _seed_restaurant(owner: User, index: int):
         db.session.flush()
         db.session.add(RestaurantConfiguration(restaurant_id=restaurant.id))
         db.session.add(OrderTypeConfiguration(restaurant_id=restaurant.id, supports_pickup=True))
+        ensure_aggregate(RatingTarget.RESTAURANT, restaurant.id)
+        ensure_popularity(restaurant.id)
         db.session.add(
             RestaurantStaffUser(
                 user_id=owner.id, restaurant_id=restaurant.id, role=RestaurantStaffRole.OWNER
@@ -303,6 +317,242 @@ def _seed_demo_in_context() -> None:
     db.session.commit()
 
 
+BULK_NAMESPACE = uuid.UUID("6f1d3c52-7d0a-4b8e-9a43-2b1f0c5e9d17")
+BULK_CATEGORIES_PER_MENU = 3
+BULK_ITEMS_PER_CATEGORY = 3
+BULK_OPTIONS_PER_GROUP = 2
+BULK_POOL_SIZE = 512
+
+# Parent tables come first so each chunk can be written in a single pass.
+BULK_TABLES = [
+    Restaurant.__table__,
+    RatingAggregate.__table__,
+    RestaurantPopularity.__table__,
+    RestaurantConfiguration.__table__,
+    OrderTypeConfiguration.__table__,
+    RestaurantStaffUser.__table__,
+    Menu.__table__,
+    MenuCategory.__table__,
+    MenuItem.__table__,
+    MenuItemOptionGroup.__table__,
+    MenuItemOption.__table__,
+]
+
+_bulk_pools: dict | None = None
+
+
+def _bulk_id(seed: int, kind: str, *parts) -> uuid.UUID:
+    return uuid.uuid5(BULK_NAMESPACE, ":".join([str(seed), kind, *map(str, parts)]))
+
+
+def _init_bulk_worker(seed: int) -> None:
+    # Faker only builds small value pools once per process. Rows draw from them with a
+    # per-restaurant RNG, so the output does not depend on worker count or scheduling.
+    global _bulk_pools
+    pool_faker = Faker()
+    pool_faker.seed_instance(seed)
+    _bulk_pools = {
+        "words": [pool_faker.word().title() for _ in range(BULK_POOL_SIZE)],
+        "sentences": [pool_faker.sentence() for _ in range(BULK_POOL_SIZE)],
+        "phones": [pool_faker.phone_number() for _ in range(BULK_POOL_SIZE)],
+        "domains": [pool_faker.domain_name() for _ in range(BULK_POOL_SIZE)],
+    }
+
+
+def _column_defaults(table) -> dict:
+    defaults = {}
+    for column in table.columns:
+        if column.default is None or column.primary_key:
+            continue
+        if column.default.is_scalar:
+            defaults[column.name] = column.default.arg
+        elif column.default.is_callable:
+            defaults[column.name] = column.default.arg(None)
+    return defaults
+
+
+def _generate_bulk_chunk(args) -> dict[str, list[dict]]:
+    seed, owner_id, start, stop = args
+    pools = _bulk_pools
+    rows = {table.name: [] for table in BULK_TABLES}
+    for index in range(start, stop):
+        rng = random.Random(f"{seed}:{index}")
+        restaurant_id = _bulk_id(seed, "restaurant", index)
+        rows["restaurants"].append(
+            {
+                "id": restaurant_id,
+                "name": f"Bulk Restaurant {index}",
+                "phone": rng.choice(pools["phones"]),
+                "email": f"restaurant{index}@{rng.choice(pools['domains'])}",
+                "status": RestaurantStatus.ACTIVE,
+                "cuisines": rng.sample(pools["words"], 2),
+                "owner_id": owner_id,
+            }
+        )
+        # Rating and popularity sorts inner-join these rows; see ensure_aggregate and
+        # ensure_popularity for the one-at-a-time equivalents.
+        rows["rating_aggregates"].append(
+            {
+                "id": _bulk_id(seed, "rating_aggregate", index),
+                "target_type": RatingTarget.RESTAURANT,
+                "target_id": restaurant_id,
+            }
+        )
+        rows["restaurant_popularity"].append(
+            {"id": _bulk_id(seed, "popularity", index), "restaurant_id": restaurant_id}
+        )
+        rows["restaurant_configurations"].append(
+            {"id": _bulk_id(seed, "configuration", index), "restaurant_id": restaurant_id}
+        )
+        rows["order_type_configurations"].append(
+            {
+                "id": _bulk_id(seed, "order_type_configuration", index),
+                "restaurant_id": restaurant_id,
+                "supports_pickup": True,
+            }
+        )
+        rows["restaurant_staff_users"].append(
+            {
+                "id": _bulk_id(seed, "staff", index),
+                "user_id": owner_id,
+                "restaurant_id": restaurant_id,
+                "role": RestaurantStaffRole.OWNER,
+            }
+        )
+        menu_id = _bulk_id(seed, "menu", index)
+        rows["menus"].append(
+            {
+                "id": menu_id,
+                "restaurant_id": restaurant_id,
+                "name": f"Main Menu {index}",
+                "is_active": True,
+            }
+        )
+        for c in range(BULK_CATEGORIES_PER_MENU):
+            category_id = _bulk_id(seed, "category", index, c)
+            rows["menu_categories"].append(
+                {
+                    "id": category_id,
+                    "restaurant_id": restaurant_id,
+                    "menu_id": menu_id,
+                    "name": f"Category {c+1}",
+                    "sort_order": c,
+                    "is_active": True,
+                }
+            )
+            for i in range(BULK_ITEMS_PER_CATEGORY):
+                item_id = _bulk_id(seed, "item", index, c, i)
+                base_price = rng.randint(800, 2200)
+                rows["menu_items"].append(
+                    {
+                        "id": item_id,
+                        "restaurant_id": restaurant_id,
+                        "menu_id": menu_id,
+                        "category_id": category_id,
+                        "name": rng.choice(pools["words"]),
+                        "description": rng.choice(pools["sentences"]),
+                        "base_price_cents": base_price,
+                        "price_pickup_cents": base_price,
+                        "tags": [rng.choice(pools["words"]).lower()],
+                        "is_active": True,
+                        "display_order": rng.randint(0, 10),
+                    }
+                )
+                group_id = _bulk_id(seed, "option_group", index, c, i)
+                rows["menu_item_option_groups"].append(
+                    {
+                        "id": group_id,
+                        "menu_item_id": item_id,
+                        "name": "Add-ons",
+                        "min_choices": 0,
+                        "max_choices": 2,
+                        "is_required": False,
+                        "is_active": True,
+                    }
+                )
+                for o in range(BULK_OPTIONS_PER_GROUP):
+                    rows["menu_item_options"].append(
+                        {
+                            "id": _bulk_id(seed, "option", index, c, i, o),
+                            "option_group_id": group_id,
+                            "name": rng.choice(pools["words"]),
+                            "price_delta_cents": rng.randint(50, 250),
+                            "is_active": True,
+                        }
+                    )
+    return rows
+
+
+def _copy_value(column, value):
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(column.type, JSONB):
+        return json.dumps(value)
+    if isinstance(column.type, ARRAY):
+        quoted = ['"' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"' for v in value]
+        return "{" + ",".join(quoted) + "}"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value)
+
+
+def _copy_rows(connection, table, rows: list[dict]) -> None:
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(table.c[name], row[name]) for name in columns])
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _write_bulk_chunk(rows: dict[str, list[dict]], use_copy: bool) -> None:
+    with db.engine.begin() as connection:
+        for table in BULK_TABLES:
+            if not rows[table.name]:
+                continue
+            defaults = _column_defaults(table)
+            table_rows = [{**defaults, **row} for row in rows[table.name]]
+            if use_copy:
+                _copy_rows(connection, table, table_rows)
+            else:
+                connection.execute(table.insert(), table_rows)
+
+
+def _seed_bulk_in_context(scale: int, workers: int, seed: int, chunk_size: int) -> None:
+    owner = _get_or_create_user(
+        "bulk-owner@nush.local", UserRoleType.RESTAURANT_OWNER, "owner123", name="Bulk Owner"
+    )
+    db.session.commit()
+
+    # A chunk whose first restaurant exists was written by an earlier run with the same seed,
+    # so an interrupted rebuild can simply be restarted.
+    chunks = []
+    for start in range(0, scale, chunk_size):
+        if db.session.get(Restaurant, _bulk_id(seed, "restaurant", start)):
+            continue
+        chunks.append((seed, owner.id, start, min(start + chunk_size, scale)))
+
+    use_copy = db.engine.dialect.name == "postgresql"
+    if workers <= 1:
+        _init_bulk_worker(seed)
+        for chunk in chunks:
+            _write_bulk_chunk(_generate_bulk_chunk(chunk), use_copy)
+    else:
+        with Pool(workers, initializer=_init_bulk_worker, initargs=(seed,)) as pool:
+            for rows in pool.imap_unordered(_generate_bulk_chunk, chunks):
+                _write_bulk_chunk(rows, use_copy)
+    print(f"Seeded {scale} restaurants ({len(chunks)} new chunks) with seed {seed}.")
+
+
 def seed_rbac() -> None:
     app = create_app()
     with app.app_context():
@@ -322,16 +572,30 @@ def seed_all() -> None:
         _seed_demo_in_context()
 
 
+def seed_bulk(scale: int, workers: int = 1, seed: int = 0, chunk_size: int = 500) -> None:
+    app = create_app()
+    with app.app_context():
+        _seed_bulk_in_context(scale, workers, seed, chunk_size)
+
+
 def _parse_args():
     parser = argparse.ArgumentParser(description="Seed RBAC and demo data.")
     parser.add_argument("--rbac", action="store_true", help="Seed RBAC roles and permissions")
     parser.add_argument("--demo", action="store_true", help="Seed demo users, restaurants, and menus")
+    parser.add_argument(
+        "--scale", type=int, default=0, help="Bulk-generate this many restaurants with full menus"
+    )
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to generate rows")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for reproducible datasets")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Restaurants per write batch")
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = _parse_args()
-    if args.rbac and not args.demo:
+    if args.scale:
+        seed_bulk(args.scale, workers=args.workers, seed=args.seed, chunk_size=args.chunk_size)
+    elif args.rbac and not args.demo:
         seed_rbac()
     elif args.demo and not args.rbac:
         seed_demo()
@@ -0,0 +1,113 @@
+import importlib.util
+import os
+import sys
+import unittest
+import uuid
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import UserRoleType  # noqa: E402
+from app.services import admin_analytics  # noqa: E402
+
+MIGRATION = os.path.join(
+    ROOT, "migrations", "versions", "e3a9c5d7f018_add_admin_analytics_views.py"
+)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+    def scalar(self):
+        return self.rows
+
+
+class AdminAnalyticsTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+
+    def test_views_match_migration(self):
+        spec = importlib.util.spec_from_file_location("analytics_migration", MIGRATION)
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+        self.assertEqual(
+            [view.name for view in admin_analytics.VIEWS], list(migration.VIEWS)
+        )
+        for view in admin_analytics.VIEWS:
+            query, key = migration.VIEWS[view.name]
+            for name in view.c.keys():
+                self.assertRegex(query, rf"\b{name}\b")
+            self.assertTrue(set(key) <= set(view.c.keys()))
+
+    def test_overview_reads_views_only(self):
+        promo = uuid.uuid4()
+        refreshed = datetime(2026, 10, 1, 12, tzinfo=timezone.utc)
+        results = iter(
+            [
+                [
+                    (date(2026, 9, 30), "COMPLETED", 3, 9000, 500),
+                    (date(2026, 9, 30), "CANCELLED", 1, 2000, 0),
+                    (date(2026, 10, 1), "CONFIRMED", 2, 4000, 0),
+                ],
+                [(date(2026, 9, 30), "CUSTOMER", 4), (date(2026, 10, 1), "COURIER", 1)],
+                [(promo, 2, 700)],
+                [("PAID", 1), ("EARNED", 2)],
+                5,
+                20,
+            ]
+        )
+        statements = []
+
+        def execute(statement, *args):
+            statements.append(str(statement))
+            return FakeResult(next(results))
+
+        with mock.patch.object(db.session, "execute", side_effect=execute), mock.patch.object(
+            admin_analytics,
+            "refresh_times",
+            return_value={view.name: refreshed for view in admin_analytics.VIEWS},
+        ):
+            report = admin_analytics.overview(date(2026, 9, 30), date(2026, 10, 1))
+
+        for sql in statements:
+            self.assertIn("FROM admin_daily_", sql)
+        self.assertEqual(report["gmv"]["total_cents"], 13000)
+        self.assertEqual(
+            report["orders_by_status"], {"completed": 3, "cancelled": 1, "confirmed": 2}
+        )
+        self.assertEqual([day["count"] for day in report["new_users"]], [4, 1])
+        self.assertEqual(report["promo_cost"]["total_cents"], 700)
+        self.assertEqual(report["membership_conversion"]["period_rate"], 0.25)
+        self.assertEqual(report["membership_conversion"]["member_share"], 0.25)
+        self.assertEqual(report["refreshed_at"], refreshed.isoformat())
+
+    def test_unrefreshed_views_answer_not_ready(self):
+        admin = SimpleNamespace(id=uuid.uuid4(), role=UserRoleType.ADMIN, is_active=True)
+        names = [view.name for view in admin_analytics.VIEWS]
+        client = self.app.test_client()
+        with (
+            mock.patch("app.auth_helpers.get_current_user", return_value=admin),
+            mock.patch("app.routes.admin.overview", return_value={"gmv": {}}) as overview,
+            mock.patch.object(db.session, "execute") as execute,
+        ):
+            execute.return_value = FakeResult([(names[0], True), (names[1], False)])
+            response = client.get("/api/v1/admin/analytics")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.get_json()["error"]["details"]["views"], names[1:])
+            self.assertFalse(overview.called)
+
+            execute.return_value = FakeResult([(name, True) for name in names])
+            self.assertEqual(client.get("/api/v1/admin/analytics").status_code, 200)
@@ -0,0 +1,69 @@
+import os
+import sys
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.extensions import cache  # noqa: E402
+from app.services import admission  # noqa: E402
+
+SETTINGS = {"max_orders": 3, "window_seconds": 300, "max_preparing": 2, "prep_minutes": 10}
+
+
+class AdmissionTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+        cache.clear()
+        patcher = mock.patch.object(admission, "admission_settings", return_value=SETTINGS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(admission, "preparing_count", return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_order_rate_uses_sliding_window(self):
+        start = 3000.0
+        for _ in range(3):
+            self.assertTrue(admission.check_admission("r1", now=start)["admitted"])
+            admission.record_order("r1", now=start)
+        decision = admission.check_admission("r1", now=start + 60)
+        self.assertFalse(decision["admitted"])
+        self.assertEqual(decision["reason"], admission.ORDER_RATE)
+        self.assertEqual(decision["retry_after_seconds"], 240)
+        # Halfway through the next window the previous three orders weigh 1.5.
+        self.assertTrue(admission.check_admission("r1", now=start + 450)["admitted"])
+
+    def test_kitchen_load_reports_wait(self):
+        with mock.patch.object(admission, "preparing_count", return_value=5):
+            decision = admission.check_admission("r1", now=0.0)
+        self.assertFalse(decision["admitted"])
+        self.assertEqual(decision["reason"], admission.KITCHEN_LOAD)
+        self.assertEqual(decision["estimated_wait_minutes"], 30)
+
+    def test_direct_confirm_is_admission_checked(self):
+        user = SimpleNamespace(id=uuid.uuid4(), is_active=True)
+        cart = SimpleNamespace(restaurant_id="r1", items=[object()])
+        with (
+            mock.patch("app.auth_helpers.get_current_user", return_value=user),
+            mock.patch("app.routes.orders.get_current_user", return_value=user),
+            mock.patch("app.routes.orders._load_cart_for_user", return_value=(cart, None)),
+            mock.patch("app.routes.orders.unavailable_cart_items", return_value=[]),
+            mock.patch.object(admission, "preparing_count", return_value=5),
+            mock.patch("app.routes.orders.cart_lines") as cart_lines,
+        ):
+            response = self.app.test_client().post(
+                "/api/v1/checkout/confirm", json={"cart_id": str(uuid.uuid4())}
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()["error"]["details"]["reason"], admission.KITCHEN_LOAD)
+        self.assertIn("Retry-After", response.headers)
+        self.assertFalse(cart_lines.called)
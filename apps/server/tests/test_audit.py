@@ -0,0 +1,139 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.auth_helpers import audited  # noqa: E402
+from app.routes.response import error, ok  # noqa: E402
+from app.services.audit import AuditBuffer, record, replay_spool, spill_rows  # noqa: E402
+
+ACTOR = uuid.UUID(int=1)
+ENTITY = uuid.UUID(int=2)
+
+
+def _row(n=0):
+    return {
+        "id": uuid.UUID(int=100 + n),
+        "created_at": datetime(2026, 10, 19, 12, n, tzinfo=timezone.utc),
+        "actor_id": ACTOR if n % 2 else None,
+        "action": "user.update",
+        "entity_type": "user",
+        "entity_id": ENTITY,
+        "metadata": {"payload": {"is_active": False}},
+        "ip_address": "10.0.0.1",
+        "user_agent": "curl/8",
+    }
+
+
+class AuditBufferTests(unittest.TestCase):
+    def test_writes_full_batches_in_background(self):
+        batches = []
+        flushed = threading.Event()
+
+        def writer(rows):
+            batches.append(rows)
+            flushed.set()
+
+        buffer = AuditBuffer(writer, mock.Mock(), interval=60, batch_rows=2, max_rows=100)
+        buffer.add(_row(0))
+        self.assertFalse(flushed.wait(0.05))
+        buffer.add(_row(1))
+        self.assertTrue(flushed.wait(1))
+        self.assertEqual(len(batches[0]), 2)
+        self.assertEqual(buffer.pending(), 0)
+
+    def test_spills_instead_of_dropping(self):
+        spill = mock.Mock()
+
+        def writer(rows):
+            raise RuntimeError("database unavailable")
+
+        buffer = AuditBuffer(writer, spill, interval=60, batch_rows=2, max_rows=3)
+        # Flush by hand only, so the background thread cannot race the assertions.
+        buffer._ensure_thread = lambda: None
+        for n in range(4):
+            buffer.add(_row(n))
+        with self.assertLogs("app.services.audit", "ERROR"):
+            self.assertEqual(buffer.flush(), 0)
+        spilled = [row["id"] for call in spill.call_args_list for row in call[0][0]]
+        # The buffer was full at the fourth row, then the failed write spilled the rest.
+        self.assertEqual(spilled, [_row(n)["id"] for n in range(4)])
+        self.assertEqual(buffer.pending(), 0)
+
+    def test_spill_files_replay_into_the_table(self):
+        rows = [_row(0), _row(1)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = spill_rows(directory, rows)
+            self.assertEqual(os.listdir(directory), [os.path.basename(path)])
+            with mock.patch("app.services.audit.write_rows") as write_rows:
+                self.assertEqual(replay_spool(directory), 2)
+            self.assertEqual(write_rows.call_args[0][0], rows)
+            self.assertEqual(os.listdir(directory), [])
+
+
+class AuditCaptureTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.user = SimpleNamespace(id=ACTOR)
+        patcher = mock.patch("app.auth_helpers.get_current_user", return_value=self.user)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _call(self, view, **kwargs):
+        with self.app.test_request_context(
+            "/api/v1/admin/things", method="POST", json={"name": "x"}
+        ):
+            with mock.patch("app.auth_helpers.record_audit") as record_audit:
+                view(**kwargs)
+        return record_audit
+
+    def test_records_created_entity_from_response(self):
+        view = audited("thing.create", "thing", "thing")(
+            lambda: ok({"thing": {"id": str(ENTITY)}}, status=201)
+        )
+        record_audit = self._call(view)
+        record_audit.assert_called_once_with(
+            ACTOR,
+            "thing.create",
+            "thing",
+            str(ENTITY),
+            {"method": "POST", "path": "/api/v1/admin/things", "payload": {"name": "x"}},
+        )
+
+    def test_records_entity_from_view_argument(self):
+        view = audited("thing.update", "thing", "thing_id")(lambda thing_id: ok({}))
+        record_audit = self._call(view, thing_id=ENTITY)
+        self.assertEqual(record_audit.call_args[0][3], ENTITY)
+
+    def test_skips_rejected_calls(self):
+        view = audited("thing.update", "thing", "thing_id")(
+            lambda thing_id: error("FORBIDDEN", "Insufficient role", status=403)
+        )
+        self.assertFalse(self._call(view, thing_id=ENTITY).called)
+
+    def test_record_only_queues_a_row(self):
+        buffer = mock.Mock()
+        with (
+            mock.patch("app.services.audit.get_buffer", return_value=buffer),
+            self.app.test_request_context(
+                "/", headers={"User-Agent": "a" * 300}, environ_base={"REMOTE_ADDR": "10.0.0.9"}
+            ),
+        ):
+            record(ACTOR, "thing.update", "thing", str(ENTITY))
+            self.app.config["AUDIT_ENABLED"] = False
+            record(ACTOR, "thing.update", "thing", str(ENTITY))
+        row = buffer.add.call_args[0][0]
+        self.assertEqual(buffer.add.call_count, 1)
+        self.assertEqual(row["entity_id"], ENTITY)
+        self.assertEqual(row["ip_address"], "10.0.0.9")
+        self.assertEqual(len(row["user_agent"]), 255)
@@ -0,0 +1,56 @@
+import os
+import sys
+import unittest
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.services.availability import AvailabilityTable  # noqa: E402
+
+MONDAY = date(2026, 1, 5)
+
+
+def at(day: date, hour: int, minute: int = 0) -> datetime:
+    return datetime(day.year, day.month, day.day, hour, minute)
+
+
+class AvailabilityTableTests(unittest.TestCase):
+    def test_item_without_rules_is_always_open(self):
+        table = AvailabilityTable()
+        self.assertTrue(table.item_open("burger", "mains", at(MONDAY, 3)))
+
+    def test_weekday_windows_are_merged_and_bounded(self):
+        table = AvailabilityTable(
+            [
+                ("item:pancakes", 0, 7 * 60, 10 * 60, None, None),
+                ("item:pancakes", 0, 9 * 60, 11 * 60, None, None),
+            ]
+        )
+        self.assertFalse(table.item_open("pancakes", None, at(MONDAY, 6, 59)))
+        self.assertTrue(table.item_open("pancakes", None, at(MONDAY, 10, 30)))
+        self.assertFalse(table.item_open("pancakes", None, at(MONDAY, 11)))
+        self.assertFalse(table.item_open("pancakes", None, at(date(2026, 1, 6), 8)))
+
+    def test_overnight_windows_roll_into_next_day(self):
+        table = AvailabilityTable([("category:late", None, 22 * 60, 2 * 60, None, None)])
+        self.assertTrue(table.item_open("fries", "late", at(MONDAY, 23)))
+        self.assertTrue(table.item_open("fries", "late", at(MONDAY, 1, 30)))
+        self.assertFalse(table.item_open("fries", "late", at(MONDAY, 12)))
+
+    def test_item_rules_override_category_rules(self):
+        table = AvailabilityTable(
+            [
+                ("category:breakfast", None, 6 * 60, 11 * 60, None, None),
+                ("item:coffee", None, 0, 24 * 60, None, None),
+            ]
+        )
+        self.assertFalse(table.item_open("eggs", "breakfast", at(MONDAY, 15)))
+        self.assertTrue(table.item_open("coffee", "breakfast", at(MONDAY, 15)))
+
+    def test_date_range_limits_seasonal_rules(self):
+        start = MONDAY.toordinal()
+        table = AvailabilityTable([("item:eggnog", None, 0, 24 * 60, start, start + 6)])
+        self.assertTrue(table.item_open("eggnog", None, at(MONDAY, 12)))
+        self.assertFalse(table.item_open("eggnog", None, at(date(2026, 1, 12), 12)))
@@ -0,0 +1,106 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.cache import Cache, MemoryBackend, RedisBackend, SharedMemoryBackend  # noqa: E402
+
+# ``app.cache`` the attribute is the extension instance; the module is only in sys.modules.
+cache_module = sys.modules["app.cache"]
+
+
+class CacheBehaviourMixin:
+    def make_backend(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.cache = Cache()
+        self.cache.backend = self.make_backend()
+
+    def test_delete_tag_invalidates_tagged_entries(self):
+        self.cache.set("menu", {"id": 1}, tags=["restaurant:1"])
+        self.cache.set("other", {"id": 2}, tags=["restaurant:2"])
+        self.cache.delete_tag("restaurant:1")
+        self.assertIsNone(self.cache.get("menu"))
+        self.assertEqual(self.cache.get("other"), {"id": 2})
+
+    def test_entries_expire(self):
+        self.cache.set("short", 1, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get("short"))
+
+    def test_incr_counts_and_add_is_exclusive(self):
+        self.assertEqual(self.cache.incr("hits"), 1)
+        self.assertEqual(self.cache.incr("hits", 4), 5)
+        self.assertTrue(self.cache.backend.add("lock", 1))
+        self.assertFalse(self.cache.backend.add("lock", 1))
+
+    def test_get_or_set_loads_once_under_concurrency(self):
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return "value"
+
+        threads = [
+            threading.Thread(target=self.cache.get_or_set, args=("key", loader)) for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.get("key"), "value")
+
+    def test_timed_out_wait_keeps_the_other_workers_lock(self):
+        lock_key = self.cache._key("lock:slow")
+        self.assertTrue(self.cache.backend.add(lock_key, "other", ttl=10))
+        self.assertEqual(self.cache.get_or_set("slow", lambda: "v", lock_timeout=0.02), "v")
+        self.assertFalse(self.cache.backend.add(lock_key, "next", ttl=10))
+
+    def test_none_results_are_not_cached(self):
+        self.assertIsNone(self.cache.get_or_set("missing", lambda: None))
+        self.assertEqual(self.cache.get_or_set("missing", lambda: 3), 3)
+
+
+class MemoryBackendTests(CacheBehaviourMixin, unittest.TestCase):
+    def make_backend(self):
+        return MemoryBackend(max_entries=100)
+
+    def test_evicts_least_recently_used(self):
+        backend = MemoryBackend(max_entries=2)
+        backend.set("a", 1)
+        backend.set("b", 2)
+        backend.get("a")
+        backend.set("c", 3)
+        self.assertEqual(backend.get_many(["a", "c"]), [1, 3])
+        self.assertIsNot(backend.get("b"), 2)
+
+
+class SharedMemoryBackendTests(CacheBehaviourMixin, unittest.TestCase):
+    def make_backend(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return SharedMemoryBackend(os.path.join(tmp.name, "cache.sqlite"))
+
+
+class RedisBackendTests(unittest.TestCase):
+    def test_incr_sets_expiry_in_the_same_round_trip(self):
+        client = mock.Mock()
+        client.register_script.return_value.return_value = 3
+        with mock.patch.object(cache_module, "redis") as redis:
+            redis.Redis.from_url.return_value = client
+            backend = RedisBackend("redis://localhost/0")
+        self.assertEqual(backend.incr("hits", 1, ttl=2), 3)
+        client.register_script.return_value.assert_called_once_with(keys=["hits"], args=[1, 2000])
+        self.assertIn("PEXPIRE", client.register_script.call_args[0][0])
+        self.assertFalse(client.incrby.called)
+        self.assertFalse(client.pexpire.called)
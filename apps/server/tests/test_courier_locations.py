@@ -0,0 +1,131 @@
+import os
+import sys
+import threading
+import unittest
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy.exc import IntegrityError
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.models import UserRoleType  # noqa: E402
+from app.services.courier_locations import (  # noqa: E402
+    LocationBuffer,
+    _latest_per_courier,
+    ingest_fixes,
+)
+
+START = datetime(2026, 1, 5, 12, tzinfo=timezone.utc)
+
+
+def _fix(courier_id, seconds):
+    return {"courier_id": courier_id, "recorded_at": START + timedelta(seconds=seconds)}
+
+
+class LocationBufferTests(unittest.TestCase):
+    def test_flushes_when_batch_fills(self):
+        batches = []
+        flushed = threading.Event()
+
+        def writer(rows):
+            batches.append(rows)
+            flushed.set()
+
+        buffer = LocationBuffer(writer, interval=60, max_rows=3)
+        buffer.add([_fix("a", 0), _fix("a", 1)])
+        self.assertFalse(flushed.wait(0.05))
+        buffer.add([_fix("b", 0)])
+        self.assertTrue(flushed.wait(1))
+        self.assertEqual(len(batches[0]), 3)
+        self.assertEqual(buffer.pending(), 0)
+
+    def test_failed_flush_keeps_rows_and_caps_buffer(self):
+        def writer(rows):
+            raise RuntimeError("database unavailable")
+
+        buffer = LocationBuffer(writer, interval=60, max_rows=100)
+        # Flush by hand only, so the background thread cannot race the assertions.
+        buffer._ensure_thread = lambda: None
+        buffer.add([_fix("a", second) for second in range(10)])
+        with self.assertLogs("app.services.courier_locations", "ERROR"):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.pending(), 10)
+        with self.assertLogs("app.services.courier_locations", "WARNING"):
+            buffer.add([_fix("a", second) for second in range(10, 410)])
+        self.assertEqual(buffer.pending(), 400)
+
+    def test_rejected_batch_drops_only_bad_fixes(self):
+        written = []
+
+        def writer(rows):
+            if any(row["courier_id"] == "bad" for row in rows):
+                raise IntegrityError("INSERT", {}, Exception("foreign key violation"))
+            written.extend(rows)
+
+        buffer = LocationBuffer(writer, interval=60, max_rows=100)
+        buffer._ensure_thread = lambda: None
+        buffer.add([_fix("a", 0), _fix("bad", 1), _fix("b", 2)])
+        with self.assertLogs("app.services.courier_locations", "WARNING"):
+            self.assertEqual(buffer.flush(), 2)
+        self.assertEqual([row["courier_id"] for row in written], ["a", "b"])
+        self.assertEqual(buffer.pending(), 0)
+
+    def test_latest_per_courier_keeps_newest_fix(self):
+        rows = [_fix("a", 5), _fix("b", 1), _fix("a", 9), _fix("a", 2)]
+        latest = {row["courier_id"]: row["recorded_at"] for row in _latest_per_courier(rows)}
+        self.assertEqual(
+            latest, {"a": START + timedelta(seconds=9), "b": START + timedelta(seconds=1)}
+        )
+
+
+class IngestTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+
+    def test_compares_cached_position_in_utc(self):
+        # 13:30+02:00 is 11:30Z, older than the cached fix despite sorting later as text.
+        fix = {
+            "delivery_task_id": None,
+            "latitude": 1,
+            "longitude": 2,
+            "recorded_at": datetime(2026, 1, 5, 13, 30, tzinfo=timezone(timedelta(hours=2))),
+        }
+        cached = {"recorded_at": START.isoformat()}
+        with (
+            mock.patch("app.services.courier_locations.get_buffer"),
+            mock.patch("app.services.courier_locations.cache") as cache,
+        ):
+            cache.get.return_value = cached
+            ingest_fixes("a", [fix])
+            self.assertFalse(cache.set.called)
+            cache.get.return_value = None
+            ingest_fixes("a", [fix])
+        self.assertEqual(cache.set.call_args[0][1]["recorded_at"], "2026-01-05T11:30:00+00:00")
+
+
+class PostLocationsTests(unittest.TestCase):
+    def test_rejects_tasks_not_assigned_to_the_courier(self):
+        app = create_app()
+        courier = SimpleNamespace(id=uuid.uuid4(), role=UserRoleType.COURIER, is_active=True)
+        fixes = [{"latitude": 1, "longitude": 2, "delivery_task_id": str(uuid.uuid4())}]
+        query = mock.Mock()
+        query.return_value.filter.return_value = []
+        with (
+            mock.patch("app.auth_helpers.get_current_user", return_value=courier),
+            mock.patch("app.routes.courier.get_current_user", return_value=courier),
+            mock.patch("app.routes.courier.db.session.query", query),
+            mock.patch("app.routes.courier.ingest_fixes") as ingest,
+        ):
+            response = app.test_client().post("/api/v1/courier/locations", json={"fixes": fixes})
+        self.assertEqual(response.status_code, 422)
+        self.assertIn("fixes[0].delivery_task_id", response.get_json()["error"]["details"])
+        self.assertFalse(ingest.called)
@@ -0,0 +1,55 @@
+import itertools
+import os
+import random
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.services.dispatch import hungarian, match  # noqa: E402
+from app.services.geo import SpatialGrid, haversine_km  # noqa: E402
+
+
+def _point(key, lat, lng):
+    return {"id": key, "lat": lat, "lng": lng}
+
+
+class DispatchTests(unittest.TestCase):
+    def test_hungarian_matches_brute_force(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            rows = rng.randint(1, 4)
+            cols = rng.randint(rows, 5)
+            costs = [[rng.randint(0, 30) for _ in range(cols)] for _ in range(rows)]
+            assignment = hungarian(costs)
+            best = min(
+                sum(costs[row][perm[row]] for row in range(rows))
+                for perm in itertools.permutations(range(cols), rows)
+            )
+            self.assertEqual(sum(costs[row][col] for row, col in assignment.items()), best)
+            self.assertEqual(len(set(assignment.values())), rows)
+
+    def test_match_minimises_total_distance_not_first_pick(self):
+        # Greedy would give t1 the closer courier c1 and strand t2 with the far c2.
+        tasks = [_point("t1", 40.700, -74.000), _point("t2", 40.710, -74.000)]
+        couriers = [_point("c1", 40.705, -74.000), _point("c2", 40.690, -74.000)]
+        pairs = {task: courier for task, courier, _ in match(tasks, couriers, radius_km=5)}
+        self.assertEqual(pairs, {"t1": "c2", "t2": "c1"})
+
+    def test_match_respects_radius(self):
+        tasks = [_point("t1", 40.70, -74.00)]
+        couriers = [_point("near", 40.71, -74.00), _point("far", 41.00, -74.00)]
+        self.assertEqual([m[1] for m in match(tasks, couriers, radius_km=5)], ["near"])
+        self.assertEqual(match(tasks, [_point("far", 41.00, -74.00)], radius_km=5), [])
+
+    def test_grid_finds_every_point_in_radius(self):
+        rng = random.Random(3)
+        points = [(i, 52 + rng.random() * 0.3, 13 + rng.random() * 0.5) for i in range(300)]
+        grid = SpatialGrid(2.0, reference_lat=52.1)
+        for key, lat, lng in points:
+            grid.insert(key, lat, lng)
+        center = (52.15, 13.25)
+        expected = {key for key, lat, lng in points if haversine_km(*center, lat, lng) <= 4.0}
+        self.assertEqual({key for key, _ in grid.near(*center, 4.0)}, expected)
@@ -0,0 +1,218 @@
+import gzip
+import json
+import os
+import sys
+import tempfile
+import unittest
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import UserRoleType  # noqa: E402
+from app.services import export_jobs  # noqa: E402
+from app.services.export_jobs import (  # noqa: E402
+    COMPLETED,
+    MANIFEST,
+    QUEUED,
+    RUNNING,
+    JobReclaimed,
+    heartbeat,
+    run_job,
+    work_once,
+)
+from app.services.export_storage import LocalStorage  # noqa: E402
+
+START = datetime(2026, 9, 1, tzinfo=timezone.utc)
+ROWS = [
+    (
+        START + timedelta(minutes=n),
+        uuid.UUID(int=n + 1),
+        None,
+        None,
+        None,
+        None,
+        100 * n,
+        "PAID",
+        None,
+    )
+    for n in range(5)
+]
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def partitions(self):
+        if self.rows:
+            yield self.rows
+
+    def close(self):
+        pass
+
+
+def fake_execute(chunk_rows, statements):
+    """Serve ROWS in keyset order, honouring the chunk LIMIT and the statement's resume key."""
+
+    def execute(statement, *args):
+        statements.append(statement)
+        params = statement.compile().params.values()
+        stamps = [value for value in params if isinstance(value, datetime)]
+        ids = [value for value in params if isinstance(value, uuid.UUID)]
+        after = (stamps[0], ids[0]) if ids else None
+        remaining = [row for row in ROWS if after is None or (row[0], row[1]) > after]
+        return FakeResult(remaining[:chunk_rows])
+
+    return execute
+
+
+def make_job(**overrides):
+    values = {
+        "id": uuid.uuid4(),
+        "dataset": "payouts",
+        "format": "csv",
+        "filters": {"from": None, "to": None},
+        "status": QUEUED,
+        "attempts": 1,
+        "rows_exported": 0,
+        "chunks_written": 0,
+        "bytes_written": 0,
+        "cursor": None,
+        "manifest": {},
+        "finished_at": None,
+    }
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+class ExportJobTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["EXPORT_CHUNK_ROWS"] = 2
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = LocalStorage(directory.name)
+
+    def run_job(self, job, beats=None):
+        statements = []
+        execute = fake_execute(2, statements)
+        with (
+            mock.patch.object(db.session, "execute", side_effect=execute),
+            mock.patch.object(db.session, "commit"),
+            mock.patch.object(export_jobs, "heartbeat", beats or mock.Mock()),
+        ):
+            run_job(job, self.storage)
+        return statements
+
+    def read_part(self, job, name):
+        with gzip.open(self.storage.path(f"{job.id}/{name}"), "rt") as handle:
+            return handle.read().splitlines()
+
+    def test_writes_gzip_chunks_and_manifest(self):
+        job = make_job()
+        statements = self.run_job(job)
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(job.status, COMPLETED)
+        self.assertEqual(job.rows_exported, 5)
+        self.assertEqual([chunk["rows"] for chunk in job.manifest["chunks"]], [2, 2, 1])
+        part = self.read_part(job, "part-00002.csv.gz")
+        self.assertTrue(part[0].startswith("created_at,id,"))
+        self.assertEqual(len(part), 3)
+        with open(self.storage.path(f"{job.id}/{MANIFEST}")) as handle:
+            self.assertEqual(json.load(handle)["rows"], 5)
+        self.assertEqual(job.cursor["id"], str(ROWS[-1][1]))
+
+    def test_resumes_after_committed_cursor(self):
+        done = {"name": "part-00001.csv.gz", "rows": 2, "bytes": 10, "sha256": "x"}
+        job = make_job(
+            chunks_written=1,
+            rows_exported=2,
+            cursor={"at": ROWS[1][0].isoformat(), "id": str(ROWS[1][1])},
+            manifest={"chunks": [done]},
+        )
+        statements = self.run_job(job)
+        self.assertIn("(payouts.created_at, payouts.id) >", str(statements[0]))
+        self.assertEqual(
+            [chunk["name"] for chunk in job.manifest["chunks"]][-1], "part-00003.csv.gz"
+        )
+        self.assertEqual(job.rows_exported, 5)
+
+    def test_long_chunks_keep_heartbeating(self):
+        self.app.config["EXPORT_JOB_STALE_SECONDS"] = 0
+        beats = mock.Mock()
+        self.run_job(make_job(), beats)
+        # One beat per batch, one before each chunk is published and one for the manifest.
+        self.assertEqual(beats.call_count, 3 + 3 + 1)
+
+    def test_heartbeat_is_fenced_by_the_claim(self):
+        connection = mock.MagicMock()
+        connection.execute.return_value.rowcount = 0
+        engine = mock.MagicMock()
+        engine.begin.return_value.__enter__.return_value = connection
+        job = make_job(status=RUNNING, attempts=2)
+        with mock.patch.object(type(db), "engine", new_callable=mock.PropertyMock) as prop:
+            prop.return_value = engine
+            with self.assertRaises(JobReclaimed):
+                heartbeat(job)
+            connection.execute.return_value.rowcount = 1
+            heartbeat(job)
+        params = connection.execute.call_args[0][0].compile().params
+        self.assertEqual((params["id_1"], params["attempts_1"]), (job.id, 2))
+
+    def test_reclaimed_running_job_stops_without_writing(self):
+        job = make_job(status=RUNNING)
+        with self.assertRaises(JobReclaimed):
+            self.run_job(job, mock.Mock(side_effect=JobReclaimed(job.id)))
+        self.assertFalse(os.path.exists(self.storage.path(str(job.id))))
+        self.assertEqual(job.chunks_written, 0)
+        with (
+            mock.patch.object(export_jobs, "claim_job", return_value=job),
+            mock.patch.object(export_jobs, "run_job", side_effect=JobReclaimed(job.id)),
+            mock.patch.object(db.session, "rollback"),
+            mock.patch.object(db.session, "get", return_value=job),
+            self.assertLogs("app.services.export_jobs", "WARNING"),
+        ):
+            self.assertIs(work_once(), job)
+        # The job now belongs to the worker that reclaimed it.
+        self.assertEqual(job.status, RUNNING)
+        self.assertIsNone(job.finished_at)
+
+    def test_storage_rejects_keys_outside_root(self):
+        with self.assertRaises(ValueError):
+            self.storage.path("../escape")
+
+    def test_download_supports_range_requests(self):
+        job = make_job(status=COMPLETED)
+        self.app.config["EXPORT_STORAGE_URL"] = self.storage.root
+        self.run_job(job)
+        size = os.path.getsize(self.storage.path(f"{job.id}/part-00001.csv.gz"))
+        admin = SimpleNamespace(role=UserRoleType.ADMIN, is_active=True)
+        client = self.app.test_client()
+        with (
+            mock.patch("app.auth_helpers.get_current_user", return_value=admin),
+            mock.patch.object(db.session, "get", return_value=job),
+        ):
+            response = client.get(
+                f"/api/v1/admin/exports/{job.id}/files/part-00001.csv.gz",
+                headers={"Range": "bytes=0-9"},
+            )
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(len(response.data), 10)
+            self.assertEqual(response.headers["Content-Range"], f"bytes 0-9/{size}")
+            response.close()
+            missing = client.get(f"/api/v1/admin/exports/{job.id}/files/..%2Fsecret")
+            self.assertEqual(missing.status_code, 404)
+            os.remove(self.storage.path(f"{job.id}/part-00002.csv.gz"))
+            gone = client.get(f"/api/v1/admin/exports/{job.id}/files/part-00002.csv.gz")
+            self.assertEqual(gone.status_code, 404)
+            self.assertEqual(gone.get_json()["error"]["code"], "NOT_FOUND")
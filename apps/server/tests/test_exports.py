@@ -0,0 +1,98 @@
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import unittest
+import uuid
+from datetime import datetime, timezone
+from unittest import mock
+
+from sqlalchemy.dialects import postgresql
+from werkzeug.exceptions import NotFound
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import OrderStatus  # noqa: E402
+from app.services.exports import (  # noqa: E402
+    encode_batches,
+    export_statement,
+    header,
+    stream_export,
+)
+
+CREATED = datetime(2026, 9, 1, 8, tzinfo=timezone.utc)
+
+
+class FakeResult:
+    def __init__(self, batches):
+        self.batches = batches
+        self.closed = False
+
+    def partitions(self):
+        yield from self.batches
+
+    def close(self):
+        self.closed = True
+
+
+class ExportTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+
+    def test_statement_filters_and_orders_by_timestamp(self):
+        start = datetime(2026, 9, 1, tzinfo=timezone.utc)
+        end = datetime(2026, 10, 1, tzinfo=timezone.utc)
+        sql = str(export_statement("orders", start, end).compile(dialect=postgresql.dialect()))
+        self.assertIn("WHERE orders.created_at >= ", sql)
+        self.assertIn("AND orders.created_at < ", sql)
+        self.assertIn("ORDER BY orders.created_at, orders.id", sql)
+        self.assertNotIn("order_items", sql)
+
+    def test_csv_escapes_formulas_and_writes_header_once(self):
+        batches = [
+            [(CREATED, uuid.UUID(int=1), "=HYPERLINK()", "a@b.c", None, "customer", True, None)],
+            [(CREATED, uuid.UUID(int=2), "Ann", "-x", None, "admin", False, CREATED)],
+        ]
+        chunks = list(encode_batches(iter(batches), "csv", header("users")))
+        self.assertEqual(len(chunks), 2)
+        rows = list(csv.reader(io.StringIO("".join(chunks))))
+        self.assertEqual(rows[0][:3], ["created_at", "id", "name"])
+        self.assertEqual(rows[1][2], "'=HYPERLINK()")
+        self.assertEqual(rows[2][3], "'-x")
+        self.assertEqual(rows[1][4], "")
+
+    def test_empty_csv_still_has_header(self):
+        self.assertEqual(list(encode_batches(iter([]), "csv", ["a", "b"])), ["a,b\r\n"])
+
+    def test_ndjson_uses_plain_values(self):
+        row = (CREATED, uuid.UUID(int=3), None, OrderStatus.COMPLETED) + (None,) * 11
+        line = "".join(encode_batches(iter([[row]]), "ndjson", header("orders")))
+        record = json.loads(line)
+        self.assertEqual(record["status"], "completed")
+        self.assertEqual(record["created_at"], CREATED.isoformat())
+
+    def test_stream_uses_server_side_batches_and_gzip(self):
+        result = FakeResult([[(CREATED, uuid.UUID(int=4)) + (0,) * 7]] * 3)
+        with mock.patch.object(db.session, "execute", return_value=result) as execute:
+            body = b"".join(stream_export("payouts", "csv", None, None, 500, compress=True))
+        statement = execute.call_args[0][0]
+        self.assertEqual(statement.get_execution_options()["yield_per"], 500)
+        self.assertTrue(result.closed)
+        lines = gzip.decompress(body).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+
+    def test_route_matches_known_datasets_only(self):
+        urls = self.app.url_map.bind("localhost")
+        _, args = urls.match("/api/v1/admin/exports/redemptions.ndjson")
+        self.assertEqual(args, {"dataset": "redemptions", "fmt": "ndjson"})
+        with self.assertRaises(NotFound):
+            urls.match("/api/v1/admin/exports/carts.csv")
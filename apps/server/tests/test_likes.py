@@ -0,0 +1,121 @@
+import os
+import sys
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import UserRoleType  # noqa: E402
+from app.services.likes import like, liked_restaurant_ids  # noqa: E402
+
+
+def compile_pg(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def make_restaurant(**overrides):
+    values = {
+        "id": uuid.uuid4(),
+        "name": "Pho",
+        "status": None,
+        "cuisines": [],
+        "phone": None,
+        "email": None,
+        "rating_aggregate": None,
+        "counters": SimpleNamespace(likes_count=7),
+    }
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+class LikeTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+        self.user = SimpleNamespace(
+            id=uuid.uuid4(), role=UserRoleType.CUSTOMER, is_active=True, customer_profile=None
+        )
+
+    def test_liked_lookup_is_one_query(self):
+        ids = [uuid.uuid4() for _ in range(20)]
+        captured = []
+
+        def capture(query):
+            captured.append(compile_pg(query.statement))
+            return iter([(ids[3],)])
+
+        with mock.patch.object(Query, "__iter__", autospec=True, side_effect=capture):
+            self.assertEqual(liked_restaurant_ids(self.user.id, ids), {ids[3]})
+            self.assertEqual(liked_restaurant_ids(self.user.id, []), set())
+        self.assertEqual(len(captured), 1)
+        self.assertIn("restaurant_likes.user_id = ", captured[0])
+        self.assertIn("restaurant_likes.restaurant_id IN ", captured[0])
+
+    def test_repeat_like_leaves_counters_alone(self):
+        result = mock.Mock()
+        result.scalar.return_value = None
+        with (
+            mock.patch.object(db.session, "execute", return_value=result) as execute,
+            mock.patch.object(db.session, "rollback"),
+            mock.patch.object(db.session, "commit") as commit,
+        ):
+            self.assertFalse(like(self.user.id, uuid.uuid4()))
+        self.assertEqual(execute.call_count, 1)
+        commit.assert_not_called()
+
+    def test_new_like_bumps_user_and_restaurant_counters(self):
+        result = mock.Mock()
+        result.scalar.return_value = uuid.uuid4()
+        with (
+            mock.patch.object(db.session, "execute", return_value=result) as execute,
+            mock.patch.object(db.session, "commit"),
+        ):
+            self.assertTrue(like(self.user.id, uuid.uuid4()))
+        statements = [compile_pg(call[0][0]) for call in execute.call_args_list]
+        self.assertIn(
+            "ON CONFLICT ON CONSTRAINT uq_user_counters_user DO UPDATE SET "
+            "orders_count = (user_counters.orders_count + excluded.orders_count), "
+            "likes_count = (user_counters.likes_count + excluded.likes_count)",
+            statements[1],
+        )
+        self.assertIn("uq_restaurant_counters_restaurant", statements[2])
+
+    def test_me_reads_counters_instead_of_counting(self):
+        query = mock.Mock()
+        query.filter.return_value.first.return_value = (4, 2)
+        with (
+            mock.patch("app.auth_helpers.get_current_user", return_value=self.user),
+            mock.patch("app.routes.auth.get_current_user", return_value=self.user),
+            mock.patch("app.routes.auth.user_summary", return_value={}),
+            mock.patch.object(db.session, "query", return_value=query) as session_query,
+        ):
+            response = self.app.test_client().get("/api/v1/auth/me")
+        self.assertEqual(response.get_json()["data"]["counts"], {"orders": 4, "likes": 2})
+        session_query.assert_called_once()
+        query.count.assert_not_called()
+
+    def test_listing_marks_liked_restaurants(self):
+        liked, other = make_restaurant(), make_restaurant(counters=None)
+        with (
+            mock.patch("app.routes.restaurants.get_current_user", return_value=self.user),
+            mock.patch.object(Query, "all", return_value=[liked, other]),
+            mock.patch(
+                "app.routes.restaurants.liked_restaurant_ids", return_value={liked.id}
+            ) as lookup,
+        ):
+            response = self.app.test_client().get("/api/v1/restaurants")
+        restaurants = response.get_json()["data"]["restaurants"]
+        self.assertEqual([r["liked"] for r in restaurants], [True, False])
+        self.assertEqual([r["likes_count"] for r in restaurants], [7, 0])
+        lookup.assert_called_once_with(self.user.id, [liked.id, other.id])
@@ -0,0 +1,151 @@
+import os
+import sys
+import threading
+import time
+import unittest
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy.dialects import postgresql
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.services.notification_channels import Channel, FakeChannel, register_channel  # noqa: E402
+from app.services.notifications import (  # noqa: E402
+    ORDER_STATUS,
+    RECEIPT,
+    coalesce,
+    deliver,
+    enqueue,
+    record_results,
+    retry_delay,
+    work_once,
+)
+
+NOW = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+USER = uuid.UUID(int=1)
+ORDER = uuid.UUID(int=2)
+
+
+def make_row(minutes, type_, payload, key=f"order:{ORDER}", attempts=1, user_id=USER):
+    return SimpleNamespace(
+        created_at=NOW + timedelta(minutes=minutes),
+        id=uuid.uuid4(),
+        user_id=user_id,
+        type=type_,
+        payload=payload,
+        coalesce_key=key,
+        attempts=attempts,
+    )
+
+
+class SlowChannel(Channel):
+    name = "slow"
+
+    def __init__(self, concurrency):
+        super().__init__(concurrency)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def send(self, message):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+
+
+class NotificationTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config.update(
+            NOTIFICATION_COALESCE_SECONDS=5,
+            NOTIFICATION_MAX_ATTEMPTS=3,
+            NOTIFICATION_RETRY_BASE_SECONDS=30,
+            NOTIFICATION_RETRY_MAX_SECONDS=100,
+        )
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+
+    def test_enqueue_waits_for_coalescing_window(self):
+        with mock.patch.object(db.session, "add") as add:
+            enqueue(USER, ORDER_STATUS, {"order_id": str(ORDER), "status": "confirmed"}, "k")
+        notification = add.call_args[0][0]
+        delay = notification.next_attempt_at - notification.created_at
+        self.assertEqual(delay, timedelta(seconds=5))
+
+    def test_coalesces_updates_per_user_and_key(self):
+        rows = [
+            make_row(2, ORDER_STATUS, {"status": "preparing"}, attempts=2),
+            make_row(0, ORDER_STATUS, {"status": "confirmed"}),
+            make_row(1, RECEIPT, {"amount_cents": 1250, "currency": "USD"}),
+            make_row(1, ORDER_STATUS, {"status": "ready"}, key=None),
+        ]
+        messages = coalesce(rows)
+        self.assertEqual(len(messages), 2)
+        order = messages[0]
+        self.assertEqual(order["types"], [ORDER_STATUS, RECEIPT])
+        self.assertEqual(order["title"], "Your order is preparing.")
+        self.assertEqual(order["body"], "Your order is preparing. Receipt: 12.50 USD.")
+        self.assertEqual(len(order["rows"]), 3)
+        self.assertEqual(order["attempts"], 2)
+
+    def test_channels_respect_their_concurrency(self):
+        slow = SlowChannel(concurrency=2)
+        rows = [make_row(n, ORDER_STATUS, {"status": "ready"}, key=None) for n in range(6)]
+        messages = coalesce(rows)
+        errors = deliver(messages, {"slow": slow, "fake": FakeChannel(4)}, {USER: "slow"})
+        self.assertEqual(errors, [None] * 6)
+        self.assertEqual(slow.peak, 2)
+        errors = deliver(messages[:1], {"slow": slow}, {USER: "pigeon"})
+        self.assertFalse(errors[0].retryable)
+
+    def test_backoff_doubles_up_to_cap(self):
+        with mock.patch("app.services.notifications.random.uniform", return_value=1.0):
+            self.assertEqual([retry_delay(n) for n in (1, 2, 3, 4)], [30, 60, 100, 100])
+
+    def test_failures_retry_then_give_up(self):
+        retry = coalesce([make_row(0, ORDER_STATUS, {"status": "ready"}, attempts=1)])[0]
+        final = coalesce([make_row(0, ORDER_STATUS, {"status": "ready"}, attempts=3)])[0]
+        sent = coalesce([make_row(0, RECEIPT, {"amount_cents": 1, "currency": "USD"})])[0]
+        error = RuntimeError("boom")
+        with (
+            mock.patch.object(db.session, "execute") as execute,
+            mock.patch.object(db.session, "commit"),
+        ):
+            stats = record_results([retry, final, sent], [error, error, None], NOW)
+        self.assertEqual(stats, {"sent": 1, "retried": 1, "failed": 1})
+        statements = [
+            str(call[0][0].compile(dialect=postgresql.dialect())) for call in execute.call_args_list
+        ]
+        self.assertIn("next_attempt_at=", statements[0])
+        self.assertNotIn("status=", statements[0])
+        self.assertIn("status=", statements[1])
+        self.assertIn("sent_at=", statements[2])
+
+    def test_worker_sends_through_registered_channel(self):
+        fake = FakeChannel(failures=1)
+        register_channel(self.app, fake)
+        rows = [
+            make_row(0, ORDER_STATUS, {"status": "confirmed"}),
+            make_row(0, RECEIPT, {"amount_cents": 500, "currency": "USD"}, key="receipt"),
+        ]
+        with (
+            mock.patch("app.services.notifications.claim", return_value=rows),
+            mock.patch("app.services.notifications.channel_names", return_value={USER: "fake"}),
+            mock.patch.object(db.session, "execute"),
+            mock.patch.object(db.session, "commit"),
+        ):
+            stats = work_once(NOW)
+        self.assertEqual(stats, {"sent": 1, "retried": 1, "failed": 0})
+        self.assertEqual(len(fake.sent), 1)
+        self.assertEqual(fake.sent[0]["user_id"], str(USER))
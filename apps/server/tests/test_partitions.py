@@ -0,0 +1,65 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.services.partitions import (  # noqa: E402
+    expired_partitions,
+    missing_partitions,
+    planned_partitions,
+    upper_bound,
+)
+
+NOW = datetime(2026, 12, 30, 18, tzinfo=timezone.utc)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class PartitionTests(unittest.TestCase):
+    def test_monthly_plan_rolls_over_the_year(self):
+        plan = planned_partitions("audit_logs", NOW)
+        self.assertEqual(
+            [(name, start) for name, start, _ in plan],
+            [
+                ("audit_logs_p202612", utc(2026, 12, 1)),
+                ("audit_logs_p202701", utc(2027, 1, 1)),
+                ("audit_logs_p202702", utc(2027, 2, 1)),
+            ],
+        )
+        self.assertEqual(plan[-1][2], utc(2027, 3, 1))
+
+    def test_parses_upper_bounds_from_catalog(self):
+        legacy = "FOR VALUES FROM (MINVALUE) TO ('2026-12-31 00:00:00+00')"
+        self.assertEqual(upper_bound(legacy), utc(2026, 12, 31))
+        self.assertEqual(
+            upper_bound("FOR VALUES FROM ('2026-12-01 01:00:00+01') TO ('2027-01-01 01:00:00+01')"),
+            utc(2027, 1, 1),
+        )
+        self.assertIsNone(upper_bound("DEFAULT"))
+
+    def test_missing_partitions_start_after_legacy_range(self):
+        existing = [
+            ("courier_location_updates_p_legacy", utc(2026, 12, 31)),
+            ("courier_location_updates_default", None),
+        ]
+        missing = missing_partitions("courier_location_updates", existing, NOW)
+        self.assertEqual(missing[0][0], "courier_location_updates_p20261231")
+        self.assertEqual(len(missing), 7)
+
+    def test_expired_partitions_end_before_cutoff(self):
+        existing = [
+            ("notifications_p_legacy", utc(2026, 11, 1)),
+            ("notifications_p202611", utc(2026, 12, 1)),
+            ("notifications_p202612", utc(2027, 1, 1)),
+            ("notifications_default", None),
+        ]
+        self.assertEqual(
+            expired_partitions(existing, utc(2026, 12, 1)),
+            ["notifications_p_legacy", "notifications_p202611"],
+        )
@@ -0,0 +1,49 @@
+import os
+import sys
+import unittest
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects import postgresql
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.services.payouts import (  # noqa: E402
+    chunked,
+    parse_period,
+    payouts_statement,
+    transfers_statement,
+)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class PayoutTests(unittest.TestCase):
+    def test_parse_period_forms(self):
+        self.assertEqual(parse_period("2026-12"), (utc(2026, 12, 1), utc(2027, 1, 1)))
+        self.assertEqual(parse_period("2026-W01"), (utc(2025, 12, 29), utc(2026, 1, 5)))
+        self.assertEqual(parse_period("2026-02-28"), (utc(2026, 2, 28), utc(2026, 3, 1)))
+        with self.assertRaises(ValueError):
+            parse_period("last month")
+
+    def test_chunked(self):
+        self.assertEqual(chunked([1, 2, 3, 4, 5], 2), [[1, 2], [3, 4], [5]])
+        self.assertEqual(chunked([], 3), [])
+
+    def test_statements_are_set_based_and_idempotent(self):
+        start, end = parse_period("2026-09")
+        payouts = str(
+            payouts_statement(start, end, [uuid.uuid4()]).compile(dialect=postgresql.dialect())
+        )
+        self.assertIn("GROUP BY order_restaurant_allocations.restaurant_id", payouts)
+        self.assertIn("ON CONFLICT ON CONSTRAINT uq_payouts_restaurant_period DO NOTHING", payouts)
+        self.assertIn("AS payout_status)", payouts)
+        transfers = str(
+            transfers_statement(start, end, [uuid.uuid4()]).compile(dialect=postgresql.dialect())
+        )
+        self.assertIn("JOIN payouts ON payouts.restaurant_id", transfers)
+        self.assertIn("uq_transfer_order_type_destination DO NOTHING", transfers)
@@ -0,0 +1,189 @@
+import os
+import sys
+import unittest
+import uuid
+from datetime import date, datetime, time, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy.dialects import postgresql
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import OrderStatus  # noqa: E402
+from app.services import pickup_slots  # noqa: E402
+from app.services.pickup_slots import (  # noqa: E402
+    SLOT_FULL,
+    assign_pickup_slot,
+    day_slots,
+    list_pickup_slots,
+    pickup_windows,
+    release_pickup_slot,
+    reserve_pickup_slot,
+)
+
+MONDAY = date(2026, 1, 5)
+RESTAURANT = uuid.UUID(int=3)
+SETTINGS = {
+    "supports_pickup": True,
+    "pickup_hours": {"mon": [["11:00", "12:00"]]},
+    "prep_minutes": 0,
+    "slot_minutes": 20,
+    "capacity": 2,
+}
+
+
+class PickupSlotTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+
+    def test_pickup_windows_accept_lists_dicts_and_weekday_numbers(self):
+        hours = {
+            "mon": [["17:00", "21:00"], {"start": "11:00", "end": "14:00"}],
+            "1": [["12:00", "13:00"]],
+            "wed": [["bad"]],
+        }
+        self.assertEqual(pickup_windows(hours, 0), [(660, 840), (1020, 1260)])
+        self.assertEqual(pickup_windows(hours, 1), [(720, 780)])
+        self.assertEqual(pickup_windows(hours, 2), [])
+        self.assertEqual(pickup_windows({}, 3), [(0, 1440)])
+
+    def test_day_slots_fit_inside_windows(self):
+        settings = {"pickup_hours": {"mon": [["11:00", "12:10"]]}, "slot_minutes": 20}
+        slots = day_slots(settings, MONDAY)
+        self.assertEqual([slot[0].strftime("%H:%M") for slot in slots], ["11:00", "11:20", "11:40"])
+        self.assertEqual(slots[-1][1].strftime("%H:%M"), "12:00")
+
+
+def compile_pg(statement):
+    return statement.compile(dialect=postgresql.dialect())
+
+
+def at(clock: str) -> datetime:
+    hours, minutes = clock.split(":")
+    return datetime.combine(MONDAY, time(int(hours), int(minutes)), tzinfo=timezone.utc)
+
+
+class PickupSlotCapacityTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["AVAILABILITY_TIMEZONE"] = "UTC"
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+        patcher = mock.patch.object(pickup_slots, "slot_settings", return_value=SETTINGS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def counts(self, counts):
+        return mock.patch.object(pickup_slots, "_reserved_counts", return_value=counts)
+
+    def test_listing_reports_remaining_capacity(self):
+        with self.counts({at("11:00"): 2, at("11:20"): 1}):
+            slots = list_pickup_slots(RESTAURANT, SETTINGS, MONDAY, at("10:00"))
+        self.assertEqual([slot["remaining"] for slot in slots], [0, 1, 2])
+        self.assertEqual([slot["available"] for slot in slots], [False, True, True])
+        with self.counts({}):
+            slots = list_pickup_slots(
+                RESTAURANT, {**SETTINGS, "capacity": None}, MONDAY, at("10:00")
+            )
+        self.assertEqual({(slot["remaining"], slot["available"]) for slot in slots}, {(None, True)})
+
+    def test_reserve_increments_only_below_capacity(self):
+        with mock.patch.object(
+            db.session, "execute", return_value=SimpleNamespace(rowcount=0)
+        ) as execute:
+            self.assertFalse(reserve_pickup_slot(RESTAURANT, at("11:00"), 2))
+        sql = str(compile_pg(execute.call_args[0][0]))
+        self.assertIn("ON CONFLICT ON CONSTRAINT uq_pickup_slot_counters_slot DO UPDATE", sql)
+        self.assertIn("SET reserved = (pickup_slot_counters.reserved +", sql)
+        self.assertIn("WHERE pickup_slot_counters.reserved <", sql)
+        with mock.patch.object(
+            db.session, "execute", return_value=SimpleNamespace(rowcount=1)
+        ) as execute:
+            self.assertTrue(reserve_pickup_slot(RESTAURANT, at("11:00"), None))
+        self.assertNotIn("WHERE", str(compile_pg(execute.call_args[0][0])))
+
+    def test_zero_capacity_never_reserves(self):
+        with mock.patch.object(db.session, "execute") as execute:
+            self.assertFalse(reserve_pickup_slot(RESTAURANT, at("11:00"), 0))
+        self.assertFalse(execute.called)
+
+    def test_release_never_goes_below_zero(self):
+        with mock.patch.object(db.session, "execute") as execute:
+            release_pickup_slot(RESTAURANT, at("11:20"))
+        sql = str(compile_pg(execute.call_args[0][0]))
+        self.assertIn(
+            "UPDATE pickup_slot_counters SET reserved=(pickup_slot_counters.reserved -", sql
+        )
+        self.assertIn("pickup_slot_counters.reserved > ", sql)
+
+    def test_full_slot_is_rejected_with_next_available(self):
+        with (
+            self.counts({at("11:00"): 2, at("11:20"): 2}),
+            mock.patch.object(pickup_slots, "reserve_pickup_slot") as reserve,
+        ):
+            result = assign_pickup_slot(RESTAURANT, at("11:05"), at("10:00"), allow_reassign=False)
+        self.assertEqual(result, (None, SLOT_FULL, at("11:40")))
+        self.assertFalse(reserve.called)
+
+    def test_full_slot_is_reassigned_to_the_next_with_room(self):
+        with (
+            self.counts({at("11:00"): 2}),
+            mock.patch.object(pickup_slots, "reserve_pickup_slot", return_value=True) as reserve,
+        ):
+            result = assign_pickup_slot(RESTAURANT, at("11:05"), at("10:00"))
+        self.assertEqual(result, ((at("11:20"), at("11:40")), None, None))
+        reserve.assert_called_once_with(RESTAURANT, at("11:20"), 2)
+
+    def test_lost_race_moves_on_to_the_next_slot(self):
+        # The counts looked fine, but another order took the last place before the upsert.
+        with (
+            self.counts({}),
+            mock.patch.object(
+                pickup_slots, "reserve_pickup_slot", side_effect=[False, False, True]
+            ) as reserve,
+        ):
+            result = assign_pickup_slot(RESTAURANT, at("11:05"), at("10:00"))
+        self.assertEqual(result[0], (at("11:40"), at("12:00")))
+        self.assertEqual(reserve.call_count, 3)
+        with (
+            self.counts({}),
+            mock.patch.object(pickup_slots, "reserve_pickup_slot", return_value=False),
+        ):
+            result = assign_pickup_slot(RESTAURANT, at("11:05"), at("10:00"))
+        self.assertEqual(result, (None, SLOT_FULL, None))
+
+    def test_cancel_releases_the_slot(self):
+        user = SimpleNamespace(id=uuid.uuid4(), is_active=True)
+        order = SimpleNamespace(
+            id=uuid.uuid4(),
+            customer_id=user.id,
+            restaurant_id=RESTAURANT,
+            status=OrderStatus.CONFIRMED,
+            pickup_schedule=SimpleNamespace(requested_start=at("11:20")),
+        )
+        with (
+            mock.patch("app.auth_helpers.get_current_user", return_value=user),
+            mock.patch("app.routes.orders.get_current_user", return_value=user),
+            mock.patch.object(db.session, "get", return_value=order),
+            mock.patch.object(db.session, "query") as query,
+            mock.patch.object(db.session, "add"),
+            mock.patch.object(db.session, "commit"),
+            mock.patch("app.routes.orders.record_order_event"),
+            mock.patch("app.routes.orders.notify_order_status"),
+            mock.patch("app.routes.orders.order_summary", return_value={}),
+            mock.patch("app.routes.orders.release_pickup_slot") as release,
+        ):
+            query.return_value.filter_by.return_value.all.return_value = []
+            response = self.app.test_client().post(f"/api/v1/orders/{order.id}/cancel")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(order.status, OrderStatus.CANCELLED)
+        release.assert_called_once_with(RESTAURANT, at("11:20"))
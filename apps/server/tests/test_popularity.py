@@ -0,0 +1,86 @@
+import math
+import os
+import sys
+import unittest
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.services.popularity import event_score, recompute, record_event  # noqa: E402
+
+
+def compile_pg(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+class PopularityTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["POPULARITY_HALF_LIFE_HOURS"] = 168
+        self.app.config["TRENDING_HALF_LIFE_HOURS"] = 24
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+
+    def test_scores_halve_per_half_life(self):
+        at = datetime(2026, 10, 1, tzinfo=timezone.utc)
+        later = at + timedelta(hours=24)
+        self.assertAlmostEqual(event_score(2.0, at, 24), event_score(1.0, later, 24))
+        self.assertLess(event_score(2.0, at, 24), event_score(2.0, later, 24))
+        # Two events at the same moment add up like one of twice the weight.
+        self.assertAlmostEqual(event_score(1.0, at, 24) + math.log(2), event_score(2.0, at, 24))
+
+    def test_event_is_log_add_upsert(self):
+        with mock.patch.object(db.session, "execute") as execute:
+            record_event(uuid.uuid4(), 1.0, datetime(2026, 10, 1, tzinfo=timezone.utc))
+        sql = compile_pg(execute.call_args[0][0])
+        self.assertIn("ON CONFLICT ON CONSTRAINT uq_restaurant_popularity_restaurant", sql)
+        self.assertIn("WHEN (restaurant_popularity.popular_score IS NULL)", sql)
+        self.assertIn(
+            "greatest(restaurant_popularity.trending_score, excluded.trending_score)", sql
+        )
+        self.assertIn("ln(", sql)
+
+    def test_recompute_rebuilds_every_restaurant(self):
+        with (
+            mock.patch.object(db.session, "execute") as execute,
+            mock.patch.object(db.session, "commit") as commit,
+        ):
+            recompute(now=datetime(2026, 10, 1, tzinfo=timezone.utc))
+        sql = compile_pg(execute.call_args[0][0])
+        self.assertIn("FROM restaurants LEFT OUTER JOIN", sql)
+        self.assertIn("UNION ALL", sql)
+        self.assertIn("OVER (PARTITION BY events.restaurant_id)", sql)
+        self.assertIn("popular_score = excluded.popular_score", sql)
+        commit.assert_called_once()
+
+    def test_trending_sort_reads_score_index(self):
+        captured = []
+
+        def capture(query):
+            captured.append(compile_pg(query.statement))
+            return []
+
+        client = self.app.test_client()
+        with mock.patch.object(Query, "all", autospec=True, side_effect=capture):
+            self.assertEqual(client.get("/api/v1/restaurants?sort=trending").status_code, 200)
+            client.get("/api/v1/restaurants?sort=popular&order=asc")
+        self.assertIn(
+            "ORDER BY restaurant_popularity.trending_score DESC NULLS LAST, "
+            "restaurant_popularity.restaurant_id",
+            captured[0],
+        )
+        self.assertIn(
+            "ORDER BY restaurant_popularity.popular_score ASC NULLS FIRST, "
+            "restaurant_popularity.restaurant_id DESC",
+            captured[1],
+        )
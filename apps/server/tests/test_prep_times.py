@@ -0,0 +1,43 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.extensions import cache  # noqa: E402
+from app.models import OrderType  # noqa: E402
+from app.services.prep_times import estimate_prep_minutes, hour_of_week  # noqa: E402
+
+TUESDAY_NOON = datetime(2026, 1, 6, 12, 30, tzinfo=timezone.utc)
+
+
+class PrepTimeEstimateTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+        cache.clear()
+        cache.set(
+            "prep-times:r1",
+            {
+                "configured": {None: 20, "pickup": 12, "delivery": None},
+                "hours": {36: (17.6, 9)},
+            },
+        )
+
+    def test_hour_of_week_starts_monday(self):
+        self.assertEqual(hour_of_week(TUESDAY_NOON), 36)
+
+    def test_learned_average_wins_for_its_hour(self):
+        estimate = estimate_prep_minutes("r1", TUESDAY_NOON)
+        self.assertEqual(estimate, {"minutes": 18, "source": "history", "samples": 9})
+
+    def test_falls_back_to_configured_minutes_per_order_type(self):
+        evening = TUESDAY_NOON.replace(hour=19)
+        self.assertEqual(estimate_prep_minutes("r1", evening, OrderType.PICKUP)["minutes"], 12)
+        self.assertEqual(estimate_prep_minutes("r1", evening, OrderType.DELIVERY)["minutes"], 20)
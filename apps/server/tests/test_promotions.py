@@ -0,0 +1,309 @@
+import os
+import sys
+import unittest
+import uuid
+from datetime import datetime, timezone
+from itertools import product
+from types import SimpleNamespace
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.extensions import cache, db  # noqa: E402
+from app.models import UserRoleType  # noqa: E402
+from app.services import promotions  # noqa: E402
+from app.services.cart_totals import CartLines  # noqa: E402
+from app.services.promotions import (  # noqa: E402
+    PromotionIndex,
+    best_promotion,
+    compile_promotion,
+    evaluate_promotion,
+    get_promotion,
+    get_promotion_index,
+)
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def snapshot(promo_id, promo_type, scope="order", rules=None, **overrides):
+    data = {
+        "id": promo_id,
+        "code": promo_id,
+        "code_normalized": promo_id,
+        "name": promo_id,
+        "type": promo_type,
+        "scope": scope,
+        "min_order_cents": 0,
+        "rules": rules or {},
+        "starts_at": None,
+        "ends_at": None,
+        "is_active": True,
+        "updated_at": None,
+        "coupon_id": None,
+        "max_redemptions": None,
+        "per_customer_limit": None,
+        "user_ids": None,
+    }
+    data.update(overrides)
+    return data
+
+
+class DiscountEngineTests(unittest.TestCase):
+    def setUp(self):
+        self.lines = CartLines(
+            "r1",
+            [
+                ("burger", "mains", 1000, 2),
+                ("fries", "sides", 300, 3),
+                ("soda", "drinks", 200, 1),
+            ],
+        )
+        self.totals = {"subtotal_cents": self.lines.subtotal_cents, "fee_cents": 250}
+
+    def evaluate(self, promo):
+        return evaluate_promotion(promo, self.lines, self.totals, now=NOW)
+
+    def test_order_scope_percent_and_fixed(self):
+        self.assertEqual(self.evaluate(snapshot("p", "percent", rules={"percent": 10})), 310)
+        self.assertEqual(
+            self.evaluate(snapshot("f", "fixed", rules={"amount_cents": 5000})), 3100
+        )
+
+    def test_item_and_category_scopes_only_price_targeted_lines(self):
+        by_item = snapshot("i", "percent", "item", {"percent": 50, "menu_item_ids": ["burger"]})
+        by_category = snapshot(
+            "c", "fixed", "item", {"amount_cents": 500, "category_ids": ["sides"]}
+        )
+        missing = snapshot("m", "percent", "item", {"percent": 50, "menu_item_ids": ["salad"]})
+        self.assertEqual(self.evaluate(by_item), 1000)
+        self.assertEqual(self.evaluate(by_category), 500)
+        self.assertEqual(self.evaluate(missing), 0)
+
+    def test_restaurant_scope_requires_listed_restaurant(self):
+        promo = snapshot("r", "free_delivery", "restaurant", {"restaurant_ids": ["r1"]})
+        other = snapshot("o", "free_delivery", "restaurant", {"restaurant_ids": ["r2"]})
+        self.assertEqual(self.evaluate(promo), 250)
+        self.assertEqual(self.evaluate(other), 0)
+
+    def test_bogo_discounts_cheapest_units(self):
+        promo = snapshot("b", "bogo", "item", {"category_ids": ["mains", "sides"]})
+        # Five eligible units make two buy-one-get-one pairs; the two cheapest fries are free.
+        self.assertEqual(self.evaluate(promo), 600)
+        half = snapshot("h", "bogo", rules={"buy_qty": 2, "get_qty": 1, "percent": 50})
+        # Six units across the cart give two discounted units: the soda and one fries.
+        self.assertEqual(self.evaluate(half), 250)
+
+    def test_min_order_and_window_are_enforced(self):
+        promo = snapshot("p", "percent", rules={"percent": 10}, min_order_cents=5000)
+        expired = snapshot("e", "percent", rules={"percent": 10}, ends_at=NOW.timestamp() - 1)
+        self.assertEqual(self.evaluate(promo), 0)
+        self.assertEqual(self.evaluate(expired), 0)
+
+    def test_best_promotion_picks_largest_discount(self):
+        candidates = [
+            snapshot("p", "percent", rules={"percent": 10}),
+            snapshot("i", "percent", "item", {"percent": 50, "menu_item_ids": ["burger"]}),
+            snapshot("d", "free_delivery"),
+        ]
+        best, discount = best_promotion(candidates, self.lines, self.totals, now=NOW)
+        self.assertEqual(best["id"], "i")
+        self.assertEqual(discount, 1000)
+
+
+class PromotionIndexTests(unittest.TestCase):
+    def test_candidates_are_prefiltered_by_target_audience_and_minimum(self):
+        lines = CartLines("r1", [("burger", "mains", 1000, 1)])
+        index = PromotionIndex(
+            [
+                snapshot("public", "percent", rules={"percent": 5, "auto_apply": True}),
+                snapshot("code-only", "percent", rules={"percent": 50}),
+                snapshot(
+                    "big-order",
+                    "percent",
+                    rules={"percent": 20, "auto_apply": True},
+                    min_order_cents=5000,
+                ),
+                snapshot(
+                    "here",
+                    "fixed",
+                    "restaurant",
+                    {"amount_cents": 100, "auto_apply": True, "restaurant_ids": ["r1"]},
+                ),
+                snapshot(
+                    "elsewhere",
+                    "fixed",
+                    "restaurant",
+                    {"amount_cents": 100, "auto_apply": True, "restaurant_ids": ["r2"]},
+                ),
+                snapshot(
+                    "mains",
+                    "percent",
+                    "item",
+                    {"percent": 10, "auto_apply": True, "category_ids": ["mains"]},
+                ),
+                snapshot("vip", "fixed", rules={"amount_cents": 300}, user_ids=["u1"]),
+            ]
+        )
+        ids = {promo["id"] for promo in index.candidates(lines, 1000)}
+        self.assertEqual(ids, {"public", "here", "mains"})
+        ids = {promo["id"] for promo in index.candidates(lines, 1000, user_id="u1")}
+        self.assertEqual(ids, {"public", "here", "mains", "vip"})
+
+
+def reference_discount(promo, lines, totals, now):
+    """The discount rules written out plainly, to check the compiled evaluators against."""
+    rules = promo["rules"]
+    if not promo["is_active"] or totals["subtotal_cents"] < promo["min_order_cents"]:
+        return 0
+    if promo["starts_at"] is not None and promo["starts_at"] > now:
+        return 0
+    if promo["ends_at"] is not None and promo["ends_at"] < now:
+        return 0
+    restaurant_ids = rules.get("restaurant_ids", [])
+    if promo["scope"] == "restaurant" and lines.restaurant_id not in restaurant_ids:
+        return 0
+    rows = list(zip(lines.menu_item_ids, lines.category_ids, lines.unit_prices, lines.quantities))
+    items, categories = rules.get("menu_item_ids"), rules.get("category_ids")
+    if promo["scope"] == "item" and (items or categories):
+        rows = [row for row in rows if row[0] in (items or ()) or row[1] in (categories or ())]
+    if not rows:
+        return 0
+    base = sum(price * quantity for _, _, price, quantity in rows)
+    if promo["type"] == "percent":
+        discount = min(int(base * (rules["percent"] / 100.0)), rules["max_discount_cents"])
+    elif promo["type"] == "fixed":
+        discount = min(base, rules["amount_cents"])
+    elif promo["type"] == "free_delivery":
+        discount = totals["fee_cents"]
+    else:
+        buy, get = rules.get("buy_qty", 1), rules.get("get_qty", 1)
+        units = sorted(price for _, _, price, quantity in rows for _ in range(quantity))
+        free = len(units) // (buy + get) * get
+        discount = int(sum(units[:free]) * (rules.get("percent", 100) / 100.0))
+    return max(0, min(discount, totals["subtotal_cents"] + totals["fee_cents"]))
+
+
+class CompiledEvaluatorTests(unittest.TestCase):
+    TYPES = {
+        "percent": {"percent": 15, "max_discount_cents": 400},
+        "fixed": {"amount_cents": 700},
+        "free_delivery": {},
+        "bogo": {},
+        "bogo-half": {"buy_qty": 2, "get_qty": 1, "percent": 50},
+    }
+    SCOPES = {
+        "order": ("order", {}),
+        "global": ("global", {}),
+        "here": ("restaurant", {"restaurant_ids": ["r1"]}),
+        "elsewhere": ("restaurant", {"restaurant_ids": ["r2"]}),
+        "by-item": ("item", {"menu_item_ids": ["burger", "soda"]}),
+        "by-category": ("item", {"category_ids": ["sides"]}),
+        "no-match": ("item", {"menu_item_ids": ["salad"]}),
+    }
+    CONDITIONS = {
+        "open": {},
+        "inactive": {"is_active": False},
+        "not-started": {"starts_at": NOW.timestamp() + 60},
+        "started": {"starts_at": NOW.timestamp() - 60},
+        "ended": {"ends_at": NOW.timestamp() - 1},
+        "too-small": {"min_order_cents": 5000},
+        "big-enough": {"min_order_cents": 3100},
+    }
+
+    def setUp(self):
+        promotions._compiled.clear()
+        self.lines = CartLines(
+            "r1",
+            [
+                ("burger", "mains", 1000, 2),
+                ("fries", "sides", 300, 3),
+                ("soda", "drinks", 200, 1),
+            ],
+        )
+        self.totals = {"subtotal_cents": self.lines.subtotal_cents, "fee_cents": 250}
+
+    def test_compiled_matches_reference_for_every_type_scope_and_condition(self):
+        for (type_name, type_rules), (scope_name, (scope, scope_rules)), (
+            condition,
+            overrides,
+        ) in product(self.TYPES.items(), self.SCOPES.items(), self.CONDITIONS.items()):
+            promo = snapshot(
+                f"{type_name}/{scope_name}/{condition}",
+                type_name.split("-")[0],
+                scope,
+                {**type_rules, **scope_rules},
+                **overrides,
+            )
+            with self.subTest(promo["id"]):
+                expected = reference_discount(promo, self.lines, self.totals, NOW.timestamp())
+                compiled = compile_promotion(promo)(self.lines, self.totals, NOW.timestamp())
+                self.assertEqual(compiled, expected)
+                self.assertEqual(evaluate_promotion(promo, self.lines, self.totals, NOW), expected)
+
+    def test_edited_snapshot_is_recompiled(self):
+        promo = snapshot("p", "percent", rules={"percent": 10, "max_discount_cents": 10000})
+        evaluator = compile_promotion(promo)
+        self.assertIs(compile_promotion(dict(promo)), evaluator)
+        edited = dict(promo, rules={"percent": 20, "max_discount_cents": 10000})
+        self.assertEqual(evaluate_promotion(edited, self.lines, self.totals, NOW), 620)
+
+
+class PromotionInvalidationTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["AUDIT_ENABLED"] = False
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        admin = SimpleNamespace(id=uuid.uuid4(), role=UserRoleType.ADMIN, is_active=True)
+        for target in ("app.auth_helpers.get_current_user", "app.routes.admin.get_current_user"):
+            patcher = mock.patch(target, return_value=admin)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.promotion_id = uuid.uuid4()
+        self.stored = SimpleNamespace(id=self.promotion_id)
+        for name in ("add", "commit"):
+            patcher = mock.patch.object(db.session, name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(db.session, "get", return_value=self.stored)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def cached_snapshot(self, percent):
+        promo = snapshot(str(self.promotion_id), "percent", rules={"percent": percent})
+        with (
+            mock.patch.object(promotions, "_load_snapshot", return_value=promo),
+            mock.patch.object(promotions, "_load_active_snapshots", return_value=[promo]),
+        ):
+            return get_promotion(self.promotion_id), get_promotion_index()
+
+    def assert_invalidated(self, method, path, json=None):
+        before, index = self.cached_snapshot(10)
+        # Still served from the cache until something invalidates it.
+        self.assertEqual(self.cached_snapshot(20)[0]["rules"]["percent"], 10)
+        response = getattr(self.app.test_client(), method)(path, json=json)
+        self.assertLess(response.status_code, 300)
+        after, new_index = self.cached_snapshot(20)
+        self.assertEqual(after["rules"]["percent"], 20)
+        self.assertIsNot(new_index, index)
+
+    def test_create_invalidates_snapshots(self):
+        self.assert_invalidated(
+            "post",
+            "/api/v1/admin/promotions",
+            {"code": "NEW", "name": "New", "type": "percent", "scope": "order"},
+        )
+
+    def test_update_invalidates_snapshots(self):
+        self.assert_invalidated(
+            "patch", f"/api/v1/admin/promotions/{self.promotion_id}", {"rules": {"percent": 20}}
+        )
+
+    def test_delete_invalidates_snapshots(self):
+        self.assert_invalidated("delete", f"/api/v1/admin/promotions/{self.promotion_id}")
@@ -0,0 +1,136 @@
+import os
+import sys
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import OrderStatus, RatingTarget, UserRoleType  # noqa: E402
+from app.routes.serializers import restaurant_summary  # noqa: E402
+from app.services.ratings import (  # noqa: E402
+    _add_to_aggregate,
+    _remove_from_aggregate,
+    add_rating,
+)
+
+
+def compile_pg(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+class RatingTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+
+    def test_insert_upserts_running_totals(self):
+        sql = compile_pg(_add_to_aggregate(RatingTarget.RESTAURANT, uuid.uuid4(), 4))
+        self.assertIn("ON CONFLICT ON CONSTRAINT uq_rating_aggregates_target DO UPDATE", sql)
+        self.assertIn("ratings_count = (rating_aggregates.ratings_count + ", sql)
+        self.assertIn("stars_sum = (rating_aggregates.stars_sum + excluded.stars_sum)", sql)
+        self.assertNotIn("avg(", sql)
+
+    def test_delete_decrements_and_guards_empty_average(self):
+        sql = compile_pg(_remove_from_aggregate(RatingTarget.COURIER, uuid.uuid4(), 2))
+        self.assertIn("SET ratings_count=(rating_aggregates.ratings_count - ", sql)
+        self.assertIn("CASE WHEN", sql)
+        self.assertRegex(sql, r"THEN CAST\(.+ AS FLOAT\) / CAST\(.+ AS FLOAT\) ELSE \S+ END")
+
+    def test_duplicate_rating_leaves_aggregate_alone(self):
+        result = mock.Mock()
+        result.scalar.return_value = None
+        with (
+            mock.patch.object(db.session, "execute", return_value=result) as execute,
+            mock.patch.object(db.session, "commit") as commit,
+            mock.patch.object(db.session, "rollback"),
+        ):
+            rating_id = add_rating(
+                uuid.uuid4(), uuid.uuid4(), RatingTarget.RESTAURANT, uuid.uuid4(), 5
+            )
+        self.assertIsNone(rating_id)
+        self.assertEqual(execute.call_count, 1)
+        commit.assert_not_called()
+
+    def test_new_rating_updates_aggregate_in_same_transaction(self):
+        result = mock.Mock()
+        result.scalar.return_value = uuid.uuid4()
+        with (
+            mock.patch.object(db.session, "execute", return_value=result) as execute,
+            mock.patch.object(db.session, "commit") as commit,
+        ):
+            add_rating(uuid.uuid4(), uuid.uuid4(), RatingTarget.MENU_ITEM, uuid.uuid4(), 3)
+        self.assertEqual(execute.call_count, 2)
+        self.assertIn("rating_aggregates", compile_pg(execute.call_args_list[1][0][0]))
+        commit.assert_called_once()
+
+    def test_summary_includes_rating(self):
+        restaurant = SimpleNamespace(
+            id=uuid.uuid4(),
+            name="Pho",
+            status=None,
+            cuisines=None,
+            phone=None,
+            email=None,
+            rating_aggregate=SimpleNamespace(ratings_count=3, average_stars=4.3333),
+            counters=None,
+        )
+        self.assertEqual(restaurant_summary(restaurant)["rating"], {"average": 4.33, "count": 3})
+        restaurant.rating_aggregate = None
+        self.assertEqual(restaurant_summary(restaurant)["rating"], {"average": None, "count": 0})
+
+    def test_list_sorts_by_rating_index(self):
+        captured = []
+
+        def capture(query):
+            captured.append(compile_pg(query.statement))
+            return []
+
+        with mock.patch.object(Query, "all", autospec=True, side_effect=capture):
+            response = self.app.test_client().get("/api/v1/restaurants?sort=rating")
+        self.assertEqual(response.status_code, 200)
+        sql = captured[0]
+        self.assertIn("JOIN rating_aggregates ON rating_aggregates.target_id = restaurants.id", sql)
+        self.assertIn(
+            "ORDER BY rating_aggregates.average_stars DESC, rating_aggregates.ratings_count DESC, "
+            "rating_aggregates.target_id",
+            sql,
+        )
+        self.assertNotIn("rating_aggregates_1", sql)
+
+    def test_rating_requires_target_from_completed_order(self):
+        user = SimpleNamespace(id=uuid.uuid4(), role=UserRoleType.CUSTOMER, is_active=True)
+        order = SimpleNamespace(
+            id=uuid.uuid4(),
+            customer_id=user.id,
+            restaurant_id=uuid.uuid4(),
+            status=OrderStatus.COMPLETED,
+        )
+        payload = {
+            "target_type": "restaurant",
+            "target_id": str(uuid.uuid4()),
+            "order_id": str(order.id),
+            "stars": 4,
+        }
+        client = self.app.test_client()
+        with (
+            mock.patch("app.auth_helpers.get_current_user", return_value=user),
+            mock.patch("app.routes.ratings.get_current_user", return_value=user),
+            mock.patch.object(db.session, "get", return_value=order),
+            mock.patch("app.routes.ratings.rateable_targets", return_value=set()),
+        ):
+            response = client.post("/api/v1/ratings", json=payload)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.get_json()["error"]["details"], {"target_id": "invalid"})
+            response = client.post("/api/v1/ratings", json=dict(payload, stars=6))
+            self.assertEqual(response.status_code, 400)
@@ -0,0 +1,139 @@
+import os
+import sys
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy.dialects import postgresql
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.extensions import cache, db  # noqa: E402
+from app.services import redemptions  # noqa: E402
+from app.services.redemptions import (  # noqa: E402
+    MAX_REDEMPTIONS,
+    PER_CUSTOMER_LIMIT,
+    _rebalanced_capacities,
+    release_redemption,
+    reserve_redemption,
+)
+
+COUPON = uuid.UUID(int=7)
+CUSTOMER = uuid.UUID(int=8)
+
+
+def compile_pg(statement):
+    return statement.compile(dialect=postgresql.dialect())
+
+
+def shard(index, capacity, used):
+    return SimpleNamespace(shard=index, capacity=capacity, used=used)
+
+
+def promo(**overrides):
+    data = {"coupon_id": str(COUPON), "max_redemptions": 10, "per_customer_limit": 1}
+    data.update(overrides)
+    return data
+
+
+class RebalanceTests(unittest.TestCase):
+    def test_unchanged_limit_keeps_capacities(self):
+        rows = [shard(0, 5, 5), shard(1, 5, 1)]
+        self.assertEqual(_rebalanced_capacities(rows, 10), [5, 5])
+
+    def test_raised_limit_spreads_new_room(self):
+        rows = [shard(0, 5, 5), shard(1, 5, 1)]
+        # Six of ten used; fourteen remain of the new twenty.
+        self.assertEqual(_rebalanced_capacities(rows, 20), [12, 8])
+
+    def test_lowered_limit_is_never_exceeded(self):
+        rows = [shard(0, 5, 5), shard(1, 5, 1)]
+        self.assertEqual(_rebalanced_capacities(rows, 7), [6, 1])
+        # Below what has already been used, every shard is full.
+        self.assertEqual(_rebalanced_capacities(rows, 3), [5, 1])
+
+    def test_new_shards_start_empty(self):
+        rows = [shard(index, 0, 0) for index in range(4)]
+        self.assertEqual(_rebalanced_capacities(rows, 10), [3, 3, 2, 2])
+        self.assertEqual(_rebalanced_capacities(rows, 2), [1, 1, 0, 0])
+
+
+class ReservationTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+        cache.clear()
+
+    def execute(self, *rowcounts):
+        return mock.patch.object(
+            db.session,
+            "execute",
+            side_effect=[SimpleNamespace(rowcount=count) for count in rowcounts],
+        )
+
+    def test_per_customer_limit_upserts_under_the_limit(self):
+        with self.execute(0) as execute:
+            self.assertEqual(reserve_redemption(promo(), CUSTOMER), (None, PER_CUSTOMER_LIMIT))
+        sql = str(compile_pg(execute.call_args[0][0]))
+        self.assertIn("ON CONFLICT ON CONSTRAINT uq_coupon_customer_redemptions DO UPDATE", sql)
+        self.assertIn("WHERE coupon_customer_redemptions.used <", sql)
+        self.assertEqual(execute.call_count, 1)
+
+    def test_walks_shards_from_a_random_start(self):
+        with (
+            mock.patch.object(redemptions, "_ensure_counter_shards", return_value=3),
+            mock.patch.object(redemptions.random, "randrange", return_value=1),
+            self.execute(1, 0, 1) as execute,
+        ):
+            self.assertEqual(reserve_redemption(promo(), CUSTOMER), (2, None))
+        shards = [compile_pg(call[0][0]).params["shard_1"] for call in execute.call_args_list[1:]]
+        self.assertEqual(shards, [1, 2])
+        self.assertIn(
+            "coupon_redemption_counters.used < coupon_redemption_counters.capacity",
+            str(compile_pg(execute.call_args[0][0])),
+        )
+
+    def test_exhausted_shards_report_the_global_limit(self):
+        with (
+            mock.patch.object(redemptions, "_ensure_counter_shards", return_value=3),
+            self.execute(1, 0, 0, 0) as execute,
+        ):
+            self.assertEqual(reserve_redemption(promo(), CUSTOMER), (None, MAX_REDEMPTIONS))
+        self.assertEqual(execute.call_count, 4)
+
+    def test_promotions_without_a_coupon_reserve_nothing(self):
+        with mock.patch.object(db.session, "execute") as execute:
+            self.assertEqual(reserve_redemption(promo(coupon_id=None), CUSTOMER), (None, None))
+        self.assertFalse(execute.called)
+
+    def test_release_returns_both_slots(self):
+        redemption = SimpleNamespace(coupon_id=COUPON, customer_id=CUSTOMER, counter_shard=2)
+        with mock.patch.object(db.session, "execute") as execute:
+            release_redemption(redemption)
+        statements = [str(compile_pg(call[0][0])) for call in execute.call_args_list]
+        self.assertIn("UPDATE coupon_redemption_counters SET used=", statements[0])
+        self.assertIn("UPDATE coupon_customer_redemptions SET used=", statements[1])
+        self.assertTrue(all("used > " in statement for statement in statements))
+
+    def test_changed_limit_resizes_shards(self):
+        connection = mock.MagicMock()
+        connection.execute.return_value.all.return_value = [shard(0, 5, 5), shard(1, 5, 1)]
+        engine = mock.MagicMock()
+        engine.begin.return_value.__enter__.return_value = connection
+        with mock.patch.object(type(db), "engine", new_callable=mock.PropertyMock) as prop:
+            prop.return_value = engine
+            self.assertEqual(redemptions._ensure_counter_shards(COUPON, 10), 2)
+            self.assertEqual(connection.execute.call_count, 2)
+            # Cached for this limit; a new limit reconciles and rewrites the capacities.
+            self.assertEqual(redemptions._ensure_counter_shards(COUPON, 10), 2)
+            self.assertEqual(connection.execute.call_count, 2)
+            redemptions._ensure_counter_shards(COUPON, 20)
+        self.assertEqual(connection.execute.call_count, 5)
+        params = connection.execute.call_args[0][1]
+        self.assertEqual([row["b_capacity"] for row in params], [12, 8])
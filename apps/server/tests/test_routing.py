@@ -0,0 +1,70 @@
+import os
+import random
+import sys
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.services.geo import distance_matrix_km, haversine_km  # noqa: E402
+from app.services.routing import _two_opt, solve_route  # noqa: E402
+
+START = (40.75, -73.95)
+
+
+def _stop(lat, lng, ready=0.0, due=None, pickup=None):
+    return {"lat": lat, "lng": lng, "ready": ready, "due": due, "pickup": pickup}
+
+
+def _random_tasks(rng, count):
+    stops = []
+    for _ in range(count):
+        stops.append(_stop(40.7 + rng.random() * 0.1, -74 + rng.random() * 0.1, rng.random() * 20))
+        stops.append(
+            _stop(
+                40.7 + rng.random() * 0.1,
+                -74 + rng.random() * 0.1,
+                due=60 + rng.random() * 30,
+                pickup=len(stops),
+            )
+        )
+    return stops
+
+
+class RoutingTests(unittest.TestCase):
+    def test_distance_matrix_matches_haversine(self):
+        points = [(40.7, -74.0), (40.8, -73.9), (51.5, -0.12)]
+        matrix = distance_matrix_km(points)
+        self.assertAlmostEqual(matrix[0][2], haversine_km(*points[0], *points[2]), places=6)
+        self.assertEqual(matrix[1][1], 0.0)
+
+    def test_dropoffs_follow_their_pickups(self):
+        rng = random.Random(11)
+        stops = _random_tasks(rng, 12)
+        solution = solve_route(START, stops, speed_kmh=25, service_minutes=3)
+        position = {stop: order for order, stop in enumerate(solution["route"])}
+        self.assertEqual(sorted(solution["route"]), list(range(len(stops))))
+        for index, stop in enumerate(stops):
+            if stop["pickup"] is not None:
+                self.assertLess(position[stop["pickup"] - 1], position[index])
+
+    def test_two_opt_untangles_a_line(self):
+        lngs = [-73.90, -73.80, -73.70, -73.60]
+        stops = [_stop(40.75, lng) for lng in lngs]
+        travel = distance_matrix_km([(40.75, -73.95)] + [(40.75, lng) for lng in lngs])
+        route = _two_opt([1, 3, 2, 4], travel, stops, service_minutes=0)
+        self.assertEqual(route, [1, 2, 3, 4])
+
+    def test_pickups_wait_for_ready_time(self):
+        stops = [_stop(40.75, -73.94, ready=30.0), _stop(40.76, -73.94, pickup=1)]
+        solution = solve_route(START, stops, speed_kmh=25, service_minutes=2)
+        self.assertEqual(solution["arrivals"][0], 30.0)
+        self.assertGreater(solution["arrivals"][1], 32.0)
+
+    def test_fifty_stops_solve_quickly(self):
+        stops = _random_tasks(random.Random(5), 25)
+        started = time.perf_counter()
+        solve_route(START, stops, speed_kmh=25, service_minutes=3)
+        self.assertLess(time.perf_counter() - started, 0.1)
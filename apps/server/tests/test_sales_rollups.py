@@ -0,0 +1,98 @@
+import os
+import sys
+import unittest
+import uuid
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy.dialects import postgresql
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import OrderStatus  # noqa: E402
+from app.services.sales_rollups import (  # noqa: E402
+    DAY,
+    HOUR,
+    bucket_starts,
+    buckets_for,
+    order_deltas,
+    restaurant_rollup_select,
+    sales_report,
+)
+
+
+def compile_pg(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+class SalesRollupTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["AVAILABILITY_TIMEZONE"] = "America/New_York"
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+
+    def test_buckets_use_local_hour_and_day(self):
+        buckets, day = buckets_for(datetime(2026, 3, 3, 3, 45, tzinfo=timezone.utc))
+        self.assertEqual(day, date(2026, 3, 2))
+        self.assertEqual(buckets[HOUR], datetime(2026, 3, 3, 3, tzinfo=timezone.utc))
+        self.assertEqual(buckets[DAY], datetime(2026, 3, 2, 5, tzinfo=timezone.utc))
+
+    def test_deltas_per_transition(self):
+        order = SimpleNamespace(total_cents=2500)
+        self.assertEqual(
+            order_deltas(order, OrderStatus.CONFIRMED), {"orders_count": 1, "gross_cents": 2500}
+        )
+        self.assertEqual(order_deltas(order, OrderStatus.COMPLETED), {"completed_count": 1})
+        self.assertEqual(
+            order_deltas(order, OrderStatus.CANCELLED),
+            {"cancelled_count": 1, "cancelled_cents": 2500},
+        )
+        self.assertIsNone(order_deltas(order, OrderStatus.PREPARING))
+
+    def test_hour_buckets_follow_dst(self):
+        self.assertEqual(len(bucket_starts(date(2026, 11, 1), date(2026, 11, 1), HOUR)), 25)
+        self.assertEqual(len(bucket_starts(date(2026, 3, 8), date(2026, 3, 8), HOUR)), 23)
+        self.assertEqual(len(bucket_starts(date(2026, 3, 1), date(2026, 3, 7), DAY)), 7)
+
+    def test_backfill_groups_by_local_hour(self):
+        start = datetime(2026, 3, 2, 5, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 3, 5, tzinfo=timezone.utc)
+        sql = compile_pg(restaurant_rollup_select(HOUR, start, end, uuid.uuid4()))
+        self.assertRegex(sql, r"timezone\(\S+, date_trunc\(\S+, timezone\(\S+, orders.placed_at")
+        self.assertIn("count(*) FILTER (WHERE anon_1.status = %(status_1)s)", sql)
+        self.assertIn("GROUP BY anon_1.restaurant_id, anon_1.bucket_start", sql)
+
+    def test_report_fills_empty_buckets_and_nets_cancellations(self):
+        rows = [
+            (datetime(2026, 3, 2, 5, tzinfo=timezone.utc), 4, 2, 1, 10000, 2500),
+        ]
+        items = [(uuid.uuid4(), "Pho", 3, 4200)]
+
+        class FakeQuery:
+            def __init__(self, result):
+                self.result = result
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self
+
+            def all(self):
+                return self.result
+
+        results = iter([rows, items])
+        with mock.patch.object(
+            db.session,
+            "query",
+            side_effect=lambda *args: FakeQuery(next(results)),
+        ):
+            report = sales_report("r1", date(2026, 3, 1), date(2026, 3, 2), DAY)
+        self.assertEqual([bucket["orders"] for bucket in report["buckets"]], [0, 4])
+        self.assertEqual(report["totals"]["net_cents"], 7500)
+        self.assertEqual(report["totals"]["average_ticket_cents"], 2500)
+        self.assertEqual(report["top_items"][0]["name"], "Pho")
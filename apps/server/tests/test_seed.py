@@ -0,0 +1,90 @@
+import os
+import sys
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import RatingTarget  # noqa: E402
+from scripts import seed  # noqa: E402
+
+OWNER = uuid.UUID(int=1)
+
+
+def compile_pg(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+class BulkSeedTests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+
+    def bulk_seed(self, scale: int, chunk_size: int) -> dict[str, list[dict]]:
+        written: dict[str, list[dict]] = {}
+        connection = mock.MagicMock()
+        connection.execute.side_effect = lambda stmt, rows: written.setdefault(
+            stmt.table.name, []
+        ).extend(rows)
+        engine = mock.MagicMock()
+        engine.dialect.name = "sqlite"
+        engine.begin.return_value.__enter__.return_value = connection
+        with (
+            mock.patch.object(type(db), "engine", new_callable=mock.PropertyMock) as prop,
+            mock.patch.object(seed, "_get_or_create_user", return_value=SimpleNamespace(id=OWNER)),
+            mock.patch.object(db.session, "get", return_value=None),
+            mock.patch.object(db.session, "commit"),
+            mock.patch("builtins.print"),
+        ):
+            prop.return_value = engine
+            seed._seed_bulk_in_context(scale, workers=1, seed=0, chunk_size=chunk_size)
+        return written
+
+    def listing_sql(self, sort: str) -> str:
+        captured = []
+
+        def capture(query):
+            captured.append(compile_pg(query.statement))
+            return []
+
+        with mock.patch.object(Query, "all", autospec=True, side_effect=capture):
+            response = self.app.test_client().get(f"/api/v1/restaurants?sort={sort}")
+        self.assertEqual(response.status_code, 200)
+        return captured[0]
+
+    def test_bulk_restaurants_are_listed_by_rating(self):
+        written = self.bulk_seed(scale=5, chunk_size=2)
+        restaurant_ids = {row["id"] for row in written["restaurants"]}
+        self.assertEqual(len(restaurant_ids), 5)
+        self.assertIn(
+            "JOIN rating_aggregates ON rating_aggregates.target_id = restaurants.id",
+            self.listing_sql("rating"),
+        )
+        aggregates = written["rating_aggregates"]
+        self.assertEqual({row["target_id"] for row in aggregates}, restaurant_ids)
+        self.assertEqual({row["target_type"] for row in aggregates}, {RatingTarget.RESTAURANT})
+        self.assertEqual({(row["ratings_count"], row["stars_sum"]) for row in aggregates}, {(0, 0)})
+
+    def test_bulk_restaurants_are_listed_by_popularity(self):
+        written = self.bulk_seed(scale=3, chunk_size=2)
+        restaurant_ids = {row["id"] for row in written["restaurants"]}
+        for sort in ("popular", "trending"):
+            self.assertIn(
+                "JOIN restaurant_popularity "
+                "ON restaurant_popularity.restaurant_id = restaurants.id",
+                self.listing_sql(sort),
+            )
+        popularity = written["restaurant_popularity"]
+        self.assertEqual({row["restaurant_id"] for row in popularity}, restaurant_ids)
+        self.assertEqual(len(popularity), 3)
@@ -0,0 +1,75 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+from flask import has_app_context
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.services import tracking  # noqa: E402
+from app.services.tracking import TrackingHub  # noqa: E402
+
+
+class FakeLocations:
+    def __init__(self):
+        self.calls = 0
+        self.position = {"latitude": 40.7, "longitude": -74.0, "recorded_at": "t0"}
+        self._lock = threading.Lock()
+
+    def __call__(self, courier_id):
+        with self._lock:
+            self.calls += 1
+            return dict(self.position)
+
+
+class TrackingHubTests(unittest.TestCase):
+    def test_viewers_of_one_task_share_a_poller(self):
+        locations = FakeLocations()
+        hub = TrackingHub(locations, interval=0.02)
+        first = hub.subscribe("task-1", "courier-1")
+        second = hub.subscribe("task-1", "courier-1")
+        self.assertEqual(first.wait(1)["recorded_at"], "t0")
+        self.assertEqual(second.wait(1)["recorded_at"], "t0")
+        self.assertEqual(hub.viewers("task-1"), 2)
+
+        locations.position = dict(locations.position, recorded_at="t1")
+        self.assertEqual(first.wait(1)["recorded_at"], "t1")
+        self.assertEqual(second.wait(1)["recorded_at"], "t1")
+        # One read per interval regardless of viewers.
+        time.sleep(0.1)
+        self.assertLess(locations.calls, 12)
+
+        first.close()
+        second.close()
+        self.assertEqual(hub.viewers("task-1"), 0)
+        time.sleep(0.05)
+        calls = locations.calls
+        time.sleep(0.1)
+        self.assertEqual(locations.calls, calls)
+
+    def test_unchanged_position_is_not_pushed_again(self):
+        locations = FakeLocations()
+        hub = TrackingHub(locations, interval=0.01)
+        subscription = hub.subscribe("task-2", "courier-2", dict(locations.position))
+        self.assertEqual(subscription.wait(0.5)["recorded_at"], "t0")
+        self.assertIsNone(subscription.wait(0.05))
+        subscription.close()
+
+    def test_hub_falls_back_to_the_latest_location_row(self):
+        app = create_app()
+        with mock.patch.object(tracking, "_hub", None), app.app_context():
+            hub = tracking.get_hub()
+
+        def latest_location(courier_id):
+            # Pollers run outside any request, so the loader brings its own app context.
+            self.assertTrue(has_app_context())
+            return {"courier_id": courier_id}
+
+        with mock.patch.object(tracking, "latest_location", side_effect=latest_location):
+            self.assertEqual(hub._loader("courier-3"), {"courier_id": "courier-3"})